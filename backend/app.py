@@ -1,10 +1,83 @@
-from flask import Flask, jsonify, request, Response, stream_with_context
+import contextlib
+import logging
+import time
+
+from flask import Flask, jsonify, request, Response, stream_with_context, g
 from flask_cors import CORS # were probably gonna need this for some reason
 
-from utils.background_check import rs, face_search_formatted, deep_search, analyze_with_claude
+from utils.background_check import (rs, face_search_formatted, coalesced_deep_search, analyze_with_claude,
+                                    stream_analysis_with_claude, upstream_limiter, page_hedger, deep_search_flights,
+                                    evidence_fingerprint, ANALYSIS_MODES, SUMMARY_MODES)
+from utils.compression import BodyTooLarge, UnsupportedEncoding, compress_response, decode_body
+from utils.metrics import analyses_reused, http_request_duration, render_prometheus
+from utils.rate_limiter import priority_scope
+from utils.resilience import circuit_breakers
+from utils.scheduler import SchedulerRejected, pipeline_scheduler, tenant_scope
+from utils.serialization import install_json_provider
+from utils.tracing import (bind_request_id, collect_spans, current_request_id, log_event, request_scope,
+                           unbind_request_id)
 
 app = Flask(__name__)
 CORS(app)
+install_json_provider(app)
+
+def _is_truthy(value):
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'on')
+
+@contextlib.contextmanager
+def _caller_scope():
+    # Priority class and tenant (database owner) for the scheduler and rate limiter
+    with priority_scope(request.headers.get('X-Priority')), tenant_scope(request.headers.get('X-Tenant-Id')):
+        yield
+
+def _sse(event, data):
+    # One server-sent event
+    return f"event: {event}\ndata: {app.json.dumps(data)}\n\n"
+
+def _json_body():
+    # JSON request body, decoded per its Content-Encoding; None when missing or not JSON
+    if not request.is_json:
+        return None
+    data = decode_body(request.get_data(), request.headers.get('Content-Encoding'))
+    try:
+        return app.json.loads(data) if data else None
+    except ValueError:
+        return None
+
+def _rejected(e):
+    # Queue full or waited too long: ask the caller to come back shortly
+    return jsonify({"error": str(e), "reason": e.reason}), 503, {'Retry-After': '5'}
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    # Reuse the caller's request id if it sent one so logs line up end to end
+    g.request_id_token = bind_request_id(request.headers.get('X-Request-Id'))
+
+@app.after_request
+def record_request_duration(response):
+    if 'request_start' in g:
+        elapsed = time.perf_counter() - g.request_start
+        http_request_duration.observe(
+            elapsed,
+            endpoint=request.endpoint or 'unknown',
+            status=response.status_code
+        )
+        log_event("request_finished", method=request.method, path=request.path,
+                  status=response.status_code, duration_ms=round(elapsed * 1000, 1))
+    response.headers['X-Request-Id'] = current_request_id() or ''
+    return response
+
+@app.after_request
+def compress_large_response(response):
+    # Registered after record_request_duration, so it runs first and is timed
+    return compress_response(response, request.headers.get('Accept-Encoding'))
+
+@app.teardown_request
+def release_request_id(exc=None):
+    token = g.pop('request_id_token', None)
+    if token is not None:
+        unbind_request_id(token)
 
 @app.route('/')
 def home():
@@ -14,6 +87,30 @@ def home():
 def health_check():
     return jsonify({"status": "healthy"}), 200
 
+@app.route('/rate-limits', methods=['GET'])
+def rate_limits():
+    # Queue depth and daily quota usage per upstream API
+    return jsonify(upstream_limiter.stats()), 200
+
+@app.route('/resilience', methods=['GET'])
+def resilience():
+    # Circuit breaker state per upstream and page fetch hedging
+    return jsonify({
+        "circuit_breakers": circuit_breakers.stats(),
+        "hedging": {"page": page_hedger.stats()},
+        "coalescing": {"deep_search": deep_search_flights.stats()}
+    }), 200
+
+@app.route('/scheduler', methods=['GET'])
+def scheduler():
+    # Pipeline slots in use and queued requests by priority
+    return jsonify(pipeline_scheduler.stats()), 200
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    # Prometheus text exposition format
+    return Response(render_prometheus(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/rs', methods=['POST'])
 def rs_query():
     # 1. parse & validate JSON body
@@ -26,7 +123,8 @@ def rs_query():
 
     try:
         # 2. call your background_check.rs function
-        results = rs(text, num_results=num_results)
+        with _caller_scope(), pipeline_scheduler.slot():
+            results = rs(text, num_results=num_results)
 
         # 3. wrap in a top-level key if you like
         return jsonify({"results": results}), 200
@@ -37,6 +135,8 @@ def rs_query():
         #         yield json.dumps(item) + "\n"
         # return Response(stream_with_context(generate()),
         #                 mimetype="application/x-ndjson")
+    except SchedulerRejected as e:
+        return _rejected(e)
     except Exception as e:
         # 4. catch HTTP-errors from requests or whatever
         return jsonify({"error": str(e)}), 500
@@ -61,10 +161,13 @@ def face_search_query():
         image_data = file.read()
         
         # Perform face search (always returns top 3 most similar results)
-        results = face_search_formatted(image_data)
+        with _caller_scope(), pipeline_scheduler.slot():
+            results = face_search_formatted(image_data)
         
         return jsonify({"results": results}), 200
         
+    except SchedulerRejected as e:
+        return _rejected(e)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -77,7 +180,18 @@ def deep_search_endpoint():
     Can accept:
     - Just text query (form data: 'text')
     - Just image (form data: 'image')
-    - Both text and image
+    - Name for a court records lookup (form data: 'first_name', 'last_name',
+      optional 'middle_name', 'county', 'date_of_birth' as MM/DD/YYYY)
+    - Optional applicant attributes ('email', 'city', 'zip') that, with the
+      name, filter out pages about someone else before summarization
+    - Optional 'time_budget' in seconds; when it runs out the summaries
+      finished so far are returned with "partial": true
+    - Optional 'baseline': a previous result as JSON; links found again unchanged
+      reuse its summaries instead of being fetched and summarized again
+    - Any combination of the above
+    
+    Identical requests arriving while one is running share its results.
+    Requests are queued by X-Priority and X-Tenant-Id (503 when the queue is full).
     """
     
     # Get text query if provided
@@ -95,25 +209,63 @@ def deep_search_endpoint():
             else:
                 return jsonify({"error": "Invalid image file type. Supported formats: png, jpg, jpeg, gif, bmp, webp"}), 400
     
+    # Name fields for the court records lookup
+    court_query = None
+    if request.form.get('last_name', '').strip():
+        court_query = {
+            field: request.form.get(field, '').strip()
+            for field in ('first_name', 'last_name', 'middle_name', 'county', 'date_of_birth')
+        }
+    
     # Validate that at least one search method is provided
-    if not text_query and not image_data:
-        return jsonify({"error": "Must provide either 'text' query or 'image' file (or both)"}), 400
+    if not text_query and not image_data and not court_query:
+        return jsonify({"error": "Must provide a 'text' query, an 'image' file or a 'last_name' (or a combination)"}), 400
     
     # Get optional parameters
     num_text_results = request.form.get('num_text_results', 10, type=int)
     if num_text_results > 20:  # Cap to prevent abuse
         num_text_results = 20
+    debug = _is_truthy(request.form.get('debug', ''))
+    summary_mode = request.form.get('summary_mode') or None
+    if summary_mode and summary_mode not in SUMMARY_MODES:
+        return jsonify({"error": f"summary_mode must be one of: {', '.join(SUMMARY_MODES)}"}), 400
+    fetch_top_k = request.form.get('fetch_top_k', None, type=int)
+    # Known applicant attributes for relevance filtering
+    applicant = {field: request.form.get(field, '').strip() for field in ('email', 'city', 'zip')}
+    # Total time budget in seconds; partial results come back when it runs out
+    time_budget = request.form.get('time_budget', None, type=float)
+    if time_budget is not None and time_budget < 0:
+        return jsonify({"error": "time_budget must be a non-negative number of seconds"}), 400
+    # Previous deep search result (e.g. the stored raw_json) for an incremental re-screen
+    baseline = None
+    if request.form.get('baseline', '').strip():
+        try:
+            baseline = app.json.loads(request.form['baseline'])
+        except ValueError:
+            return jsonify({"error": "baseline must be a JSON deep search result"}), 400
+        if not isinstance(baseline, dict) or not isinstance(baseline.get('summaries'), list):
+            return jsonify({"error": "baseline must be a JSON deep search result"}), 400
     
     try:
         # Perform comprehensive deep search
-        results = deep_search(
-            image_data=image_data,
-            text_query=text_query if text_query else None,
-            num_text_results=num_text_results
-        )
+        with _caller_scope():
+            results = coalesced_deep_search(
+                image_data=image_data,
+                text_query=text_query if text_query else None,
+                num_text_results=num_text_results,
+                debug=debug,
+                court_query=court_query,
+                summary_mode=summary_mode,
+                fetch_top_k=fetch_top_k,
+                applicant=applicant,
+                time_budget=time_budget,
+                baseline=baseline
+            )
         
         return jsonify(results), 200
         
+    except SchedulerRejected as e:
+        return _rejected(e)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -122,13 +274,31 @@ def analyze_summaries_endpoint():
     """
     Analyze deep search summaries using Claude Sonnet 4 based on user prompt.
     
-    Expects JSON body with:
+    Expects JSON body (optionally compressed, with Content-Encoding gzip or
+    deflate) with:
     - prompt: User's analysis question/request
     - summaries_data: JSON output from deep_search_endpoint
+    - debug (optional): return JSON {"analysis", "debug"} with a timing breakdown
+    - previous_summaries, previous_analysis, previous_prompt, previous_mode
+      (optional): the summaries_data, analysis, prompt and mode (default
+      "score") of an earlier run; if the prompt and mode are the same and the
+      evidence hasn't changed, previous_analysis is returned without calling Claude
+    - mode (optional): "score" (default) for the score alone, or "explain" for
+      the score on the first line followed by an explanation
+    - stream (optional): "sse" to relay the analysis as server-sent events
+      ("delta" events with {"text"}, then "done" with {"analysis"} or "error"),
+      or "text" (or true) for chunked plain text
     """
     
-    # Parse JSON body
-    payload = request.get_json(silent=True)
+    # Parse JSON body (optionally gzip/deflate compressed, per Content-Encoding)
+    try:
+        payload = _json_body()
+    except UnsupportedEncoding as e:
+        return jsonify({"error": str(e)}), 415
+    except BodyTooLarge as e:
+        return jsonify({"error": str(e)}), 413
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     if not payload:
         return jsonify({"error": "Request must include JSON body"}), 400
     
@@ -149,15 +319,101 @@ def analyze_summaries_endpoint():
     if not isinstance(summaries_data, dict) or "summaries" not in summaries_data:
         return jsonify({"error": "summaries_data must be a valid deep search result object"}), 400
     
+    mode = payload.get("mode") or "score"
+    if mode not in ANALYSIS_MODES:
+        return jsonify({"error": f"mode must be one of: {', '.join(ANALYSIS_MODES)}"}), 400
+    stream = payload.get("stream") or None
+    if stream is True or stream == "true":
+        stream = "text"
+    if stream not in (None, "sse", "text"):
+        return jsonify({"error": "stream must be 'sse' or 'text'"}), 400
+    debug = _is_truthy(payload.get('debug', False))
+    
+    previous_summaries = payload.get("previous_summaries")
+    previous_analysis = payload.get("previous_analysis")
+    # The analysis only stands for the same question asked the same way
+    reused = (
+        isinstance(previous_summaries, dict) and isinstance(previous_analysis, str) and previous_analysis != ""
+        and str(payload.get("previous_prompt") or "").strip() == prompt
+        and (payload.get("previous_mode") or "score") == mode
+        and evidence_fingerprint(previous_summaries.get("summaries")) == evidence_fingerprint(summaries_data["summaries"])
+    )
+    
+    if stream:
+        return _stream_analysis(prompt, summaries_data, mode, stream, reused, previous_analysis, debug)
+    
     try:
-        # Analyze with Claude
-        analysis = analyze_with_claude(prompt, summaries_data)
+        with _caller_scope(), collect_spans() as spans:
+            if reused:
+                # Same evidence as last time: the previous analysis still stands
+                analysis = previous_analysis
+                analyses_reused.inc()
+                log_event("claude_analysis_reused")
+            else:
+                # Analyze with Claude
+                with pipeline_scheduler.slot():
+                    analysis = analyze_with_claude(prompt, summaries_data, mode=mode)
+        
+        if debug:
+            return jsonify({
+                "analysis": analysis,
+                "debug": {"request_id": current_request_id(), "reused": reused, **spans.fields}
+            }), 200
         
         # Return only the text response from Claude
         return analysis, 200, {'Content-Type': 'text/plain'}
         
+    except SchedulerRejected as e:
+        return _rejected(e)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def _stream_analysis(prompt, summaries_data, mode, stream, reused, previous_analysis, debug):
+    """Relay Claude's analysis as it is generated, as SSE or chunked plain text."""
+    tenant = None
+    if not reused:
+        # Take the pipeline slot up front so a full queue is still a plain 503
+        try:
+            with _caller_scope():
+                tenant = pipeline_scheduler.acquire()
+        except SchedulerRejected as e:
+            return _rejected(e)
+    
+    # The generator runs after the view returns, outside this request's context variables
+    request_id = current_request_id()
+    
+    def generate():
+        parts = []
+        with request_scope(request_id), _caller_scope(), collect_spans() as spans:
+            try:
+                if reused:
+                    analyses_reused.inc()
+                    log_event("claude_analysis_reused")
+                    chunks = [previous_analysis]
+                else:
+                    chunks = stream_analysis_with_claude(prompt, summaries_data, mode=mode)
+                for text in chunks:
+                    parts.append(text)
+                    yield _sse("delta", {"text": text}) if stream == "sse" else text
+            except Exception as e:
+                # Headers are already sent; report the failure in-band
+                log_event("claude_stream_failed", level=logging.WARNING, error=str(e))
+                if stream == "sse":
+                    yield _sse("error", {"error": str(e)})
+                return
+        if stream == "sse":
+            done = {"analysis": "".join(parts)}
+            if debug:
+                done["debug"] = {"request_id": request_id, "reused": reused, **spans.fields}
+            yield _sse("done", done)
+    
+    mimetype = 'text/event-stream' if stream == "sse" else 'text/plain'
+    response = Response(stream_with_context(generate()), mimetype=mimetype,
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    if tenant is not None:
+        # Runs when the response is closed, even if the client went away before the first chunk
+        response.call_on_close(lambda: pipeline_scheduler.release(tenant))
+    return response
+
 if __name__ == '__main__':
     app.run(debug=True, port=5001)
\ No newline at end of file
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark of the Flask API against local stand-in upstreams.
+
+Starts the stand-ins from benchmarks/stubs.py, runs app.py in a subprocess
+pointed at them, then drives /rs, /face-search, /deep-search and
+/analyze-summaries at several concurrency levels and writes a JSON +
+Markdown report.
+
+Usage (from the backend directory):
+  python -m benchmarks.harness
+  python -m benchmarks.harness --concurrency 1,4,16 --requests 40 --endpoints deep-search
+  python -m benchmarks.harness --latency gemini=2000 --failure-rate pages=0.1
+  python -m benchmarks.harness --compare benchmarks/results/<previous>.json
+"""
+import argparse
+import concurrent.futures
+import datetime
+import json
+import math
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+
+import requests
+
+from benchmarks.stubs import FIXTURES_DIR, UpstreamStubs, parse_stub_options
+
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+SAMPLE_IMAGES = [
+    "1690840924837.jpg",
+    "43784A17-8685-4C01-B284-2BF1A7CCC6B8_1_105_c.jpeg",
+    "e66f7e50-a5a8-11ef-bfe2-2bf0019b3b67.jpg",
+]
+ENDPOINTS = ("rs", "face-search", "deep-search", "analyze-summaries")
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize_latencies(latencies_ms):
+    values = sorted(latencies_ms)
+    if not values:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "mean_ms": None, "max_ms": None}
+    return {
+        "p50_ms": round(percentile(values, 50), 1),
+        "p95_ms": round(percentile(values, 95), 1),
+        "p99_ms": round(percentile(values, 99), 1),
+        "mean_ms": round(sum(values) / len(values), 1),
+        "max_ms": round(values[-1], 1),
+    }
+
+
+def _free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def benchmark_env(stubs, warm_cache=False, respect_rate_limits=False):
+    """Environment for the API process: stand-in URLs, fake keys, tuned limits."""
+    env = dict(os.environ)
+    env.update(stubs.env())
+    env["LOG-LEVEL"] = "WARNING"
+    if not warm_cache:
+        # Stored ETags would turn every repeat fetch into a 304 and skip summarization
+        env["PAGE-CACHE-TTL"] = "0"
+        env["PAGE-VALIDATOR-TTL"] = "0"
+    if not respect_rate_limits:
+        for prefix in ("GOOGLE-SEARCH", "FACECHECK", "GEMINI", "ANTHROPIC"):
+            env[f"{prefix}-QPS"] = "100000"
+            env[f"{prefix}-BURST"] = "100000"
+            env[f"{prefix}-DAILY-QUOTA"] = "0"
+    return env
+
+
+class ApiServer:
+    """Runs app.py in a subprocess (threaded Werkzeug server) for the duration of a run."""
+
+    def __init__(self, env, port=None):
+        self.env = env
+        self.port = port or _free_port()
+        self.process = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    @property
+    def pid(self):
+        return self.process.pid if self.process else None
+
+    def start(self, timeout=30):
+        code = (
+            "from app import app; "
+            f"app.run(host='127.0.0.1', port={self.port}, threaded=True, debug=False, use_reloader=False)"
+        )
+        self.process = subprocess.Popen(
+            [sys.executable, "-c", code], cwd=BACKEND_DIR, env=self.env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError("API server exited during startup")
+            try:
+                if requests.get(self.url + "/health", timeout=1).status_code == 200:
+                    return self
+            except requests.RequestException:
+                pass
+            time.sleep(0.2)
+        self.stop()
+        raise RuntimeError("API server did not become healthy in time")
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+def load_payloads():
+    """Request payloads shared by the benchmark and the load test."""
+    with open(os.path.join(FIXTURES_DIR, "analyze_request.json"), "r", encoding="utf-8") as f:
+        analyze_body = json.load(f)
+    images = []
+    for name in SAMPLE_IMAGES:
+        path = os.path.join(BACKEND_DIR, name)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                images.append((name, f.read()))
+    return {"analyze": analyze_body, "images": images}
+
+
+def send_request(session, base_url, endpoint, payloads, text_query="Jordan Avery", index=0, timeout=300):
+    """Send one request to an endpoint. Returns the response."""
+    if endpoint == "rs":
+        return session.post(f"{base_url}/rs", json={"text": text_query, "num_results": 10}, timeout=timeout)
+    if endpoint == "face-search":
+        name, data = payloads["images"][index % len(payloads["images"])]
+        return session.post(f"{base_url}/face-search", files={"image": (name, data)}, timeout=timeout)
+    if endpoint == "deep-search":
+        return session.post(f"{base_url}/deep-search",
+                            data={"text": text_query, "num_text_results": 10}, timeout=timeout)
+    if endpoint == "analyze-summaries":
+        return session.post(f"{base_url}/analyze-summaries", json=payloads["analyze"], timeout=timeout)
+    raise ValueError(f"Unknown endpoint '{endpoint}'")
+
+
+def run_level(base_url, endpoint, concurrency, num_requests, payloads):
+    """Fire num_requests at one endpoint with the given concurrency."""
+    latencies = []
+    errors = 0
+
+    def worker(index):
+        with requests.Session() as session:
+            start = time.perf_counter()
+            try:
+                response = send_request(session, base_url, endpoint, payloads, index=index)
+                ok = response.status_code == 200
+            except requests.RequestException:
+                ok = False
+            return (time.perf_counter() - start) * 1000, ok
+
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for latency_ms, ok in pool.map(worker, range(num_requests)):
+            latencies.append(latency_ms)
+            errors += 0 if ok else 1
+    duration = time.perf_counter() - start
+
+    return {
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "requests": num_requests,
+        "errors": errors,
+        "error_rate": round(errors / num_requests, 4) if num_requests else 0,
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(num_requests / duration, 2) if duration else None,
+        **summarize_latencies(latencies),
+    }
+
+
+def render_markdown(report, baseline=None):
+    lines = [
+        f"# Benchmark report ({report['meta']['timestamp']})",
+        "",
+        f"- commit: `{report['meta']['git_commit']}`",
+        f"- python: {report['meta']['python']}",
+        f"- requests per level: {report['meta']['requests_per_level']}",
+        "",
+        "| endpoint | concurrency | rps | p50 ms | p95 ms | p99 ms | error rate |"
+        + (" Δ p95 | Δ rps |" if baseline else ""),
+        "|---|---|---|---|---|---|---|" + ("---|---|" if baseline else ""),
+    ]
+    previous = {}
+    if baseline:
+        previous = {(r["endpoint"], r["concurrency"]): r for r in baseline.get("results", [])}
+    for r in report["results"]:
+        row = (f"| {r['endpoint']} | {r['concurrency']} | {r['throughput_rps']} | {r['p50_ms']} | "
+               f"{r['p95_ms']} | {r['p99_ms']} | {r['error_rate']:.2%} |")
+        if baseline:
+            old = previous.get((r["endpoint"], r["concurrency"]))
+            if old and old.get("p95_ms") and r["p95_ms"] is not None:
+                row += f" {(r['p95_ms'] - old['p95_ms']) / old['p95_ms']:+.1%} |"
+            else:
+                row += " n/a |"
+            if old and old.get("throughput_rps") and r["throughput_rps"] is not None:
+                row += f" {(r['throughput_rps'] - old['throughput_rps']) / old['throughput_rps']:+.1%} |"
+            else:
+                row += " n/a |"
+        lines.append(row)
+    lines += ["", "Upstream requests served by stand-ins:", ""]
+    for name, count in report["upstream_requests"].items():
+        lines.append(f"- {name}: {count}")
+    return "\n".join(lines) + "\n"
+
+
+def write_report(report, output=None, baseline=None, prefix="benchmark"):
+    """Write <output>.json and <output>.md; returns the JSON path."""
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"{prefix}-{stamp}")
+    output = output[:-5] if output.endswith(".json") else output
+    with open(output + ".json", "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    with open(output + ".md", "w", encoding="utf-8") as f:
+        f.write(render_markdown(report, baseline))
+    return output + ".json"
+
+
+def build_meta(args, stubs):
+    return {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "requests_per_level": getattr(args, "requests", None),
+        "warm_cache": args.warm_cache,
+        "respect_rate_limits": args.respect_rate_limits,
+        "stubs": stubs.config_summary(),
+    }
+
+
+def add_stub_arguments(parser):
+    """CLI options shared with the load test."""
+    parser.add_argument("--latency", action="append", metavar="UPSTREAM=MS",
+                        help="Stand-in latency, e.g. gemini=1200 (repeatable)")
+    parser.add_argument("--jitter", action="append", metavar="UPSTREAM=MS",
+                        help="Stand-in latency jitter, e.g. pages=100 (repeatable)")
+    parser.add_argument("--failure-rate", action="append", metavar="UPSTREAM=RATE",
+                        help="Fraction of stand-in requests that fail, e.g. pages=0.05 (repeatable)")
+    parser.add_argument("--zero-latency", action="store_true",
+                        help="Start from 0 ms stand-in latency instead of realistic defaults")
+    parser.add_argument("--warm-cache", action="store_true",
+                        help="Keep the page summary cache and page validators enabled (default: disabled)")
+    parser.add_argument("--respect-rate-limits", action="store_true",
+                        help="Keep the configured upstream rate limits (default: lifted)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the Bouncer API")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS),
+                        help=f"Comma-separated endpoints (default: {','.join(ENDPOINTS)})")
+    parser.add_argument("--concurrency", default="1,4,8",
+                        help="Comma-separated concurrency levels (default: 1,4,8)")
+    parser.add_argument("--requests", type=int, default=20, help="Requests per endpoint and level (default: 20)")
+    parser.add_argument("--output", help="Report path without extension (default: benchmarks/results/benchmark-<time>)")
+    parser.add_argument("--compare", help="Previous report JSON to compare against")
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    endpoints = [e.strip() for e in args.endpoints.split(",") if e.strip()]
+    for endpoint in endpoints:
+        if endpoint not in ENDPOINTS:
+            parser.error(f"Unknown endpoint '{endpoint}'")
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+
+    stubs = UpstreamStubs(parse_stub_options(
+        args.latency, args.jitter, args.failure_rate, use_defaults=not args.zero_latency)).start()
+    server = ApiServer(benchmark_env(stubs, args.warm_cache, args.respect_rate_limits))
+    payloads = load_payloads()
+    results = []
+    try:
+        server.start()
+        for endpoint in endpoints:
+            for level in levels:
+                print(f"{endpoint} @ concurrency {level} ...", flush=True)
+                result = run_level(server.url, endpoint, level, args.requests, payloads)
+                print(f"  {result['throughput_rps']} req/s, p50 {result['p50_ms']} ms, "
+                      f"p95 {result['p95_ms']} ms, p99 {result['p99_ms']} ms, "
+                      f"errors {result['errors']}/{result['requests']}")
+                results.append(result)
+    finally:
+        server.stop()
+        stubs.stop()
+
+    report = {"meta": build_meta(args, stubs), "results": results, "upstream_requests": stubs.request_counts()}
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    path = write_report(report, args.output, baseline)
+    print(f"\nReport written to {path} (+ .md)")
+
+
+if __name__ == "__main__":
+    main()
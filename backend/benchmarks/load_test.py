@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Load-test driver for capacity planning.
+
+Replays a weighted mix of /rs, /face-search, /deep-search and
+/analyze-summaries (text queries plus the sample JPEGs in backend/) against
+one or more API worker processes backed by the stand-in upstreams, sweeping
+concurrency until tail latency or error rate breaks the given limits.
+Reports throughput, p50/p95/p99 and error rate per level and endpoint, and
+the resident memory of every worker.
+
+Usage (from the backend directory):
+  python -m benchmarks.load_test
+  python -m benchmarks.load_test --concurrency 1,2,4,8,16,32 --duration 30 --workers 2
+  python -m benchmarks.load_test --mix deep-search=3,analyze-summaries=1 --max-p99-ms 60000
+"""
+import argparse
+import datetime
+import itertools
+import json
+import os
+import random
+import threading
+import time
+
+import requests
+
+from benchmarks.harness import (
+    ENDPOINTS, RESULTS_DIR, ApiServer, add_stub_arguments, benchmark_env, build_meta,
+    load_payloads, send_request, summarize_latencies,
+)
+from benchmarks.stubs import UpstreamStubs, parse_stub_options
+
+
+DEFAULT_MIX = "rs=2,face-search=1,deep-search=4,analyze-summaries=3"
+
+# Applicant-style queries, shaped like the ones calculate-risk sends
+TEXT_QUERIES = [
+    '"Jordan Avery" OR "javery@example.com"',
+    '"Priya Natarajan" OR "priya.n@example.org"',
+    '"Marcus Bell" OR "mbell1987@example.net"',
+    '"Elena Sokolova" OR "elena.sokolova@example.com"',
+    '"Daniel O\'Connor" OR "doconnor@example.com"',
+    '"Wei Zhang" OR "wzhang@example.edu"',
+    '"Fatima Al-Sayed" OR "fatima.alsayed@example.com"',
+    '"Chris Johnson" OR "chrisj@example.com"',
+]
+
+
+def parse_mix(value):
+    """Parse "endpoint=weight,..." into a list of (endpoint, weight)."""
+    mix = []
+    for part in value.split(","):
+        if not part.strip():
+            continue
+        endpoint, _, weight = part.partition("=")
+        endpoint = endpoint.strip()
+        if endpoint not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint '{endpoint}'")
+        mix.append((endpoint, float(weight or 1)))
+    return mix
+
+
+def process_rss_mb(pid):
+    """Resident set size of a process in MB (Linux /proc, falling back to psutil)."""
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024.0, 1)
+    except OSError:
+        pass
+    try:
+        import psutil  # optional
+
+        return round(psutil.Process(pid).memory_info().rss / (1024.0 * 1024.0), 1)
+    except Exception:
+        return None
+
+
+class MemorySampler(threading.Thread):
+    """Samples the RSS of every worker process while a level runs."""
+
+    def __init__(self, pids, interval=0.5):
+        super().__init__(daemon=True)
+        self.pids = pids
+        self.interval = interval
+        self.peak = {pid: None for pid in pids}
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            for pid in self.pids:
+                rss = process_rss_mb(pid)
+                if rss is not None and (self.peak[pid] is None or rss > self.peak[pid]):
+                    self.peak[pid] = rss
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def run_level(servers, concurrency, duration, mix, payloads, seed):
+    """Closed-loop load: `concurrency` clients send requests for `duration` seconds."""
+    endpoints = [endpoint for endpoint, _ in mix]
+    weights = [weight for _, weight in mix]
+    server_cycle = itertools.cycle([server.url for server in servers])
+    cycle_lock = threading.Lock()
+    samples = []  # (endpoint, latency_ms, ok)
+    samples_lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def client(client_id):
+        rng = random.Random(seed + client_id)
+        with requests.Session() as session:
+            index = 0
+            while time.monotonic() < stop_at:
+                endpoint = rng.choices(endpoints, weights)[0]
+                with cycle_lock:
+                    base_url = next(server_cycle)
+                start = time.perf_counter()
+                try:
+                    response = send_request(session, base_url, endpoint, payloads,
+                                            text_query=rng.choice(TEXT_QUERIES), index=index)
+                    ok = response.status_code == 200
+                except requests.RequestException:
+                    ok = False
+                with samples_lock:
+                    samples.append((endpoint, (time.perf_counter() - start) * 1000, ok))
+                index += 1
+
+    sampler = MemorySampler([server.pid for server in servers])
+    sampler.start()
+    started = time.perf_counter()
+    clients = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    sampler.stop()
+
+    def stats(rows):
+        errors = sum(1 for _, _, ok in rows if not ok)
+        return {
+            "requests": len(rows),
+            "errors": errors,
+            "error_rate": round(errors / len(rows), 4) if rows else 0,
+            "throughput_rps": round(len(rows) / elapsed, 2) if elapsed else None,
+            **summarize_latencies([latency for _, latency, _ in rows]),
+        }
+
+    memory = [sampler.peak[server.pid] for server in servers]
+    known = [m for m in memory if m is not None]
+    return {
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 2),
+        **stats(samples),
+        "endpoints": {
+            endpoint: stats([row for row in samples if row[0] == endpoint])
+            for endpoint in endpoints
+        },
+        "worker_peak_rss_mb": memory,
+        "max_worker_rss_mb": max(known) if known else None,
+    }
+
+
+def find_breakdown(levels, max_p99_ms, max_error_rate, min_gain):
+    """
+    Return (last healthy level, first level that broke, reason).
+    A level breaks when p99 or error rate exceed the limits, or when
+    throughput stops growing by at least `min_gain` over the previous level.
+    """
+    healthy = None
+    previous = None
+    for level in levels:
+        reason = None
+        if level["error_rate"] > max_error_rate:
+            reason = f"error rate {level['error_rate']:.1%} > {max_error_rate:.1%}"
+        elif level["p99_ms"] is not None and level["p99_ms"] > max_p99_ms:
+            reason = f"p99 {level['p99_ms']} ms > {max_p99_ms} ms"
+        elif previous and previous["throughput_rps"] and level["throughput_rps"] is not None \
+                and level["throughput_rps"] < previous["throughput_rps"] * (1 + min_gain):
+            reason = (f"throughput plateaued ({previous['throughput_rps']} -> "
+                      f"{level['throughput_rps']} req/s)")
+        if reason:
+            return healthy, level, reason
+        healthy = level
+        previous = level
+    return healthy, None, None
+
+
+def render_markdown(report):
+    meta = report["meta"]
+    lines = [
+        f"# Load test report ({meta['timestamp']})",
+        "",
+        f"- commit: `{meta['git_commit']}`",
+        f"- workers: {meta['workers']}, {meta['duration_s']} s per level",
+        f"- mix: {meta['mix']}",
+        "",
+        "| concurrency | rps | p50 ms | p95 ms | p99 ms | error rate | max worker RSS MB |",
+        "|---|---|---|---|---|---|---|",
+    ]
+    for level in report["levels"]:
+        lines.append(
+            f"| {level['concurrency']} | {level['throughput_rps']} | {level['p50_ms']} | {level['p95_ms']} | "
+            f"{level['p99_ms']} | {level['error_rate']:.2%} | {level['max_worker_rss_mb']} |")
+
+    lines += ["", "## Per endpoint", ""]
+    for level in report["levels"]:
+        lines.append(f"### concurrency {level['concurrency']}")
+        lines.append("")
+        lines.append("| endpoint | requests | p50 ms | p95 ms | p99 ms | error rate |")
+        lines.append("|---|---|---|---|---|---|")
+        for endpoint, s in level["endpoints"].items():
+            error_rate = f"{s['error_rate']:.2%}" if s["requests"] else "n/a"
+            lines.append(f"| {endpoint} | {s['requests']} | {s['p50_ms']} | {s['p95_ms']} | {s['p99_ms']} | {error_rate} |")
+        lines.append("")
+
+    capacity = report["capacity"]
+    lines += ["## Capacity", ""]
+    if capacity["sustainable_concurrency"] is None:
+        lines.append("No level met the limits.")
+    else:
+        lines.append(f"- sustainable concurrency: {capacity['sustainable_concurrency']} "
+                     f"({capacity['sustainable_rps']} req/s, {capacity['rps_per_worker']} req/s per worker)")
+    if capacity["breaks_at"] is not None:
+        lines.append(f"- breaks at concurrency {capacity['breaks_at']}: {capacity['reason']}")
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrency sweep load test for the Bouncer API")
+    parser.add_argument("--concurrency", default="1,2,4,8,16", help="Comma-separated levels (default: 1,2,4,8,16)")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds per level (default: 20)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Endpoint weights (default: {DEFAULT_MIX})")
+    parser.add_argument("--workers", type=int, default=1, help="API worker processes to spread load over (default: 1)")
+    parser.add_argument("--max-p99-ms", type=float, default=30000, help="p99 limit before a level counts as broken")
+    parser.add_argument("--max-error-rate", type=float, default=0.01, help="Error rate limit (default: 0.01)")
+    parser.add_argument("--min-throughput-gain", type=float, default=0.05,
+                        help="Minimum throughput gain per level before it counts as a plateau (default: 0.05)")
+    parser.add_argument("--keep-going", action="store_true", help="Run every level even after a breakdown")
+    parser.add_argument("--seed", type=int, default=1234, help="Random seed for the request mix")
+    parser.add_argument("--output", help="Report path without extension (default: benchmarks/results/loadtest-<time>)")
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+
+    stubs = UpstreamStubs(parse_stub_options(
+        args.latency, args.jitter, args.failure_rate, use_defaults=not args.zero_latency)).start()
+    env = benchmark_env(stubs, args.warm_cache, args.respect_rate_limits)
+    servers = [ApiServer(env) for _ in range(args.workers)]
+    payloads = load_payloads()
+    results = []
+    try:
+        for server in servers:
+            server.start()
+        idle_rss = [process_rss_mb(server.pid) for server in servers]
+        for level in levels:
+            print(f"concurrency {level} for {args.duration:g}s ...", flush=True)
+            result = run_level(servers, level, args.duration, mix, payloads, args.seed)
+            results.append(result)
+            print(f"  {result['throughput_rps']} req/s, p50 {result['p50_ms']} ms, p95 {result['p95_ms']} ms, "
+                  f"p99 {result['p99_ms']} ms, errors {result['error_rate']:.2%}, "
+                  f"max worker RSS {result['max_worker_rss_mb']} MB")
+            _, broken, reason = find_breakdown(results, args.max_p99_ms, args.max_error_rate, args.min_throughput_gain)
+            if broken and not args.keep_going:
+                print(f"  stopping: {reason}")
+                break
+    finally:
+        for server in servers:
+            server.stop()
+        stubs.stop()
+
+    healthy, broken, reason = find_breakdown(results, args.max_p99_ms, args.max_error_rate, args.min_throughput_gain)
+    meta = build_meta(args, stubs)
+    meta.update({
+        "workers": args.workers,
+        "duration_s": args.duration,
+        "mix": args.mix,
+        "idle_worker_rss_mb": idle_rss,
+        "limits": {"max_p99_ms": args.max_p99_ms, "max_error_rate": args.max_error_rate},
+    })
+    report = {
+        "meta": meta,
+        "levels": results,
+        "capacity": {
+            "sustainable_concurrency": healthy["concurrency"] if healthy else None,
+            "sustainable_rps": healthy["throughput_rps"] if healthy else None,
+            "rps_per_worker": round(healthy["throughput_rps"] / args.workers, 2) if healthy else None,
+            "breaks_at": broken["concurrency"] if broken else None,
+            "reason": reason,
+        },
+        "upstream_requests": stubs.request_counts(),
+    }
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, "loadtest-" + datetime.datetime.now().strftime("%Y%m%d-%H%M%S"))
+    with open(output + ".json", "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    with open(output + ".md", "w", encoding="utf-8") as f:
+        f.write(render_markdown(report))
+    print(f"\nReport written to {output}.json (+ .md)")
+
+
+if __name__ == "__main__":
+    main()
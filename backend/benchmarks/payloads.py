@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Serialization and transfer benchmark for deep search payloads.
+
+Builds deep_search results of several sizes from the recorded
+/analyze-summaries fixture, then times each way of shipping them:
+encoding and decoding with the standard library json module and with orjson,
+compressing and decompressing with gzip and brotli (when installed), and the
+transfer time of the resulting bytes at the given link speeds. The
+"before" row is stdlib JSON sent uncompressed, as the API did before
+JSON-ENCODER and response compression.
+
+Usage (from the backend directory):
+  python -m benchmarks.payloads
+  python -m benchmarks.payloads --results 20,200,1000 --bandwidth-mbps 5,50 --repeat 30
+"""
+import argparse
+import datetime
+import gzip
+import json
+import os
+import platform
+import statistics
+import time
+import zlib
+
+from benchmarks.harness import RESULTS_DIR, _git_commit
+from benchmarks.stubs import FIXTURES_DIR
+from utils.compression import BROTLI_AVAILABLE, BROTLI_QUALITY, GZIP_LEVEL
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if BROTLI_AVAILABLE:
+    import brotli
+
+
+def build_payload(num_results):
+    """A deep_search result with num_results summaries, cycling the fixture's"""
+    with open(os.path.join(FIXTURES_DIR, "analyze_request.json"), "r", encoding="utf-8") as f:
+        fixture = json.load(f)
+    summaries = fixture["summaries_data"]["summaries"]
+    scaled = []
+    for index in range(num_results):
+        result = dict(summaries[index % len(summaries)])
+        result["link"] = f"{result['link']}?page={index}"
+        result["summary"] = f"{result['summary']} (result {index})"
+        scaled.append(result)
+    return {**fixture["summaries_data"], "summaries": scaled}
+
+
+def median_ms(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def encoders():
+    """name -> (dumps to bytes, loads from bytes)"""
+    found = {
+        # What jsonify used before: compact separators, sorted keys, ASCII escapes
+        "stdlib": (lambda obj: json.dumps(obj, separators=(",", ":"), sort_keys=True).encode("utf-8"), json.loads),
+    }
+    if orjson is not None:
+        found["orjson"] = (lambda obj: orjson.dumps(obj, option=orjson.OPT_SORT_KEYS), orjson.loads)
+    return found
+
+
+def codecs():
+    """name -> (compress, decompress)"""
+    found = {
+        "identity": (lambda data: data, lambda data: data),
+        "gzip": (lambda data: gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0),
+                 lambda data: zlib.decompress(data, 16 + zlib.MAX_WBITS)),
+    }
+    if BROTLI_AVAILABLE:
+        found["br"] = (lambda data: brotli.compress(data, quality=BROTLI_QUALITY), brotli.decompress)
+    return found
+
+
+def measure(num_results, bandwidths_mbps, repeat):
+    payload = build_payload(num_results)
+    rows = []
+    for encoder, (dumps, loads) in encoders().items():
+        body = dumps(payload)
+        encode_ms = median_ms(lambda: dumps(payload), repeat)
+        decode_ms = median_ms(lambda: loads(body), repeat)
+        for codec, (compress, decompress) in codecs().items():
+            wire = compress(body)
+            compress_ms = median_ms(lambda: compress(body), repeat)
+            decompress_ms = median_ms(lambda: decompress(wire), repeat)
+            row = {
+                "results": num_results,
+                "encoder": encoder,
+                "encoding": codec,
+                "json_bytes": len(body),
+                "wire_bytes": len(wire),
+                "encode_ms": round(encode_ms, 3),
+                "decode_ms": round(decode_ms, 3),
+                "compress_ms": round(compress_ms, 3),
+                "decompress_ms": round(decompress_ms, 3),
+            }
+            for mbps in bandwidths_mbps:
+                transfer_ms = len(wire) * 8 / (mbps * 1_000_000) * 1000
+                row[f"total_ms@{mbps}mbps"] = round(
+                    encode_ms + compress_ms + transfer_ms + decompress_ms + decode_ms, 3)
+            rows.append(row)
+    return rows
+
+
+def render_markdown(report):
+    bandwidths = report["meta"]["bandwidth_mbps"]
+    lines = [
+        f"# Payload benchmark ({report['meta']['timestamp']})",
+        "",
+        f"- commit: `{report['meta']['git_commit']}`",
+        f"- python: {report['meta']['python']}, orjson: {report['meta']['orjson']}, "
+        f"brotli: {report['meta']['brotli']}",
+        f"- median of {report['meta']['repeat']} runs; total = encode + compress + transfer + decompress + decode",
+        "",
+        "| results | encoder | encoding | JSON KB | wire KB | encode ms | decode ms | compress ms | decompress ms | "
+        + " | ".join(f"total ms @ {mbps} Mbit/s" for mbps in bandwidths) + " |",
+        "|---|---|---|---|---|---|---|---|---|" + "---|" * len(bandwidths),
+    ]
+    for r in report["results"]:
+        lines.append(
+            f"| {r['results']} | {r['encoder']} | {r['encoding']} | {r['json_bytes'] / 1024:.1f} | "
+            f"{r['wire_bytes'] / 1024:.1f} | {r['encode_ms']} | {r['decode_ms']} | {r['compress_ms']} | "
+            f"{r['decompress_ms']} | " + " | ".join(str(r[f"total_ms@{mbps}mbps"]) for mbps in bandwidths) + " |")
+    lines += ["", "Before (stdlib, identity) vs best after:", ""]
+    for size in report["meta"]["result_counts"]:
+        rows = [r for r in report["results"] if r["results"] == size]
+        before = next(r for r in rows if r["encoder"] == "stdlib" and r["encoding"] == "identity")
+        for mbps in bandwidths:
+            key = f"total_ms@{mbps}mbps"
+            best = min(rows, key=lambda r: r[key])
+            lines.append(f"- {size} results @ {mbps} Mbit/s: {before[key]} ms -> {best[key]} ms "
+                         f"({best['encoder']} + {best['encoding']}, {best[key] / before[key] - 1:+.0%})")
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serialization and transfer benchmark for deep search payloads")
+    parser.add_argument("--results", default="20,100,500",
+                        help="Comma-separated summary counts per payload (default: 20,100,500)")
+    parser.add_argument("--bandwidth-mbps", default="10,100",
+                        help="Comma-separated link speeds for transfer time (default: 10,100)")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs per measurement; the median is kept (default: 20)")
+    parser.add_argument("--output", help="Report path without extension (default: benchmarks/results/payloads-<time>)")
+    args = parser.parse_args()
+
+    sizes = [int(n) for n in args.results.split(",") if n.strip()]
+    bandwidths = [float(b) if "." in b else int(b) for b in args.bandwidth_mbps.split(",") if b.strip()]
+    results = []
+    for size in sizes:
+        print(f"{size} results ...", flush=True)
+        results.extend(measure(size, bandwidths, args.repeat))
+
+    report = {
+        "meta": {
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "orjson": getattr(orjson, "__version__", None),
+            "brotli": BROTLI_AVAILABLE,
+            "result_counts": sizes,
+            "bandwidth_mbps": bandwidths,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, "payloads-" + datetime.datetime.now().strftime("%Y%m%d-%H%M%S"))
+    output = output[:-5] if output.endswith(".json") else output
+    with open(output + ".json", "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    markdown = render_markdown(report)
+    with open(output + ".md", "w", encoding="utf-8") as f:
+        f.write(markdown)
+    print("\n" + markdown)
+    print(f"Report written to {output}.json (+ .md)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,360 @@
+"""
+Local stand-in servers for the upstream APIs, used by the benchmark and
+load-test scripts so they run without network access or API keys.
+
+Each upstream gets its own HTTP server on 127.0.0.1 with configurable
+latency, jitter and failure rate. Responses come from the recorded
+fixtures in benchmarks/fixtures/.
+"""
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+UPSTREAMS = ("custom_search", "facecheck", "pages", "gemini", "anthropic")
+
+# Rough real-world defaults (ms) so relative stage costs look like production
+DEFAULT_LATENCY_MS = {
+    "custom_search": 300,
+    "facecheck": 150,
+    "pages": 250,
+    "gemini": 900,
+    "anthropic": 1500,
+}
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+class StubConfig:
+    """Latency and failure behaviour of one stand-in upstream."""
+
+    def __init__(self, latency_ms=0, jitter_ms=0, failure_rate=0.0, failure_status=500):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+
+    def delay(self):
+        jitter = random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0
+        seconds = max(0.0, (self.latency_ms + jitter) / 1000.0)
+        if seconds:
+            time.sleep(seconds)
+
+    def should_fail(self):
+        return self.failure_rate > 0 and random.random() < self.failure_rate
+
+    def to_dict(self):
+        return {
+            "latency_ms": self.latency_ms,
+            "jitter_ms": self.jitter_ms,
+            "failure_rate": self.failure_rate,
+            "failure_status": self.failure_status,
+        }
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    stub = None  # set on the per-server subclass
+
+    def log_message(self, format, *args):
+        pass  # keep benchmark output clean
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send(self, status, body, content_type="application/json", headers=None):
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self):
+        body = self._read_body()
+        stub = self.stub
+        stub.count_request()
+        stub.config.delay()
+        if stub.config.should_fail():
+            status = stub.config.failure_status
+            self._send(status, json.dumps({"error": {"code": status, "message": "stub failure"}}))
+            return
+        stub.respond(self, body)
+
+    do_GET = _handle
+    do_POST = _handle
+
+
+class UpstreamStub:
+    """Base class: one HTTP server impersonating one upstream."""
+
+    name = None
+
+    def __init__(self, config, fixtures):
+        self.config = config
+        self.fixtures = fixtures
+        self.requests = 0
+        self._lock = threading.Lock()
+        handler = type(f"{self.name}_handler", (_StubHandler,), {"stub": self})
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def count_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def respond(self, handler, body):
+        raise NotImplementedError
+
+
+class CustomSearchStub(UpstreamStub):
+    name = "custom_search"
+
+    def respond(self, handler, body):
+        query = parse_qs(urlparse(handler.path).query)
+        num = int(query.get("num", ["10"])[0])
+        data = json.loads(self.fixtures.render("custom_search.json"))
+        data["items"] = data["items"][:num]
+        handler._send(200, json.dumps(data))
+
+
+class FacecheckStub(UpstreamStub):
+    name = "facecheck"
+    polls_until_done = 2
+
+    def __init__(self, config, fixtures):
+        super().__init__(config, fixtures)
+        self._polls = {}
+        self._next_id = 0
+
+    def respond(self, handler, body):
+        path = urlparse(handler.path).path
+        if path.endswith("/upload_pic"):
+            with self._lock:
+                self._next_id += 1
+                search_id = str(self._next_id)
+            handler._send(200, self.fixtures.render("facecheck_upload.json").replace("{search_id}", search_id))
+            return
+
+        id_search = json.loads(body or b"{}").get("id_search")
+        with self._lock:
+            polls = self._polls[id_search] = self._polls.get(id_search, 0) + 1
+        if polls < self.polls_until_done:
+            handler._send(200, self.fixtures.render("facecheck_search_progress.json"))
+        else:
+            with self._lock:
+                self._polls.pop(id_search, None)
+            handler._send(200, self.fixtures.render("facecheck_search_done.json"))
+
+
+class PageStub(UpstreamStub):
+    """
+    Serves the fixture page for every path, with the path in the title and a
+    path-seeded article so different links are not near-duplicates of each
+    other. Query strings are ignored, so URL variants return the same page.
+    Responses carry an ETag and honour If-None-Match.
+    """
+
+    name = "pages"
+    article_words = 300
+
+    def __init__(self, config, fixtures):
+        super().__init__(config, fixtures)
+        self._vocabulary = sorted(set(re.findall(r"[a-z]{3,}", fixtures.render("page.html").lower())))
+
+    def respond(self, handler, body):
+        path = urlparse(handler.path).path
+        rng = random.Random(path)
+        article = " ".join(rng.choice(self._vocabulary) for _ in range(self.article_words))
+        html = self.fixtures.render("page.html").replace(
+            "<title>Jordan Avery - Profile</title>", f"<title>Jordan Avery - {path}</title>").replace(
+            "<body>", f"<body>\n<article><p>{article}</p></article>", 1)
+        # Pages never change, so a matching validator always gets a 304
+        etag = '"%s"' % hashlib.sha1(html.encode("utf-8")).hexdigest()[:16]
+        if handler.headers.get("If-None-Match") == etag:
+            handler._send(304, b"", content_type="text/html; charset=utf-8", headers={"ETag": etag})
+            return
+        handler._send(200, html, content_type="text/html; charset=utf-8", headers={"ETag": etag})
+
+
+class GeminiStub(UpstreamStub):
+    name = "gemini"
+    _path = re.compile(r"/v1beta/models/[^/:]+:generateContent")
+
+    def respond(self, handler, body):
+        if not self._path.search(urlparse(handler.path).path):
+            handler._send(404, json.dumps({"error": {"code": 404, "message": "unknown method"}}))
+            return
+        handler._send(200, self.fixtures.render("gemini_generate.json"))
+
+
+class AnthropicStub(UpstreamStub):
+    name = "anthropic"
+
+    stream_chunk_chars = 8
+
+    def respond(self, handler, body):
+        request = json.loads(body or b"{}")
+        message = json.loads(self.fixtures.render("anthropic_message.json"))
+        message["model"] = request.get("model", message["model"])
+        if "explain" in json.dumps(request.get("messages", [])):
+            # Explanation mode: a longer answer, which is what streaming is for
+            message["content"][0]["text"] += ("\nNo adverse records appear in the results; every summary "
+                                              "describes the same Baltimore software engineer.")
+            message["usage"]["output_tokens"] = 40
+        if request.get("stream"):
+            handler._send(200, self._event_stream(message), content_type="text/event-stream")
+            return
+        handler._send(200, json.dumps(message))
+
+    def _event_stream(self, message):
+        """The message as Messages API stream events, text split into small deltas."""
+        text = message["content"][0]["text"]
+        usage = message["usage"]
+        start = dict(message, content=[], stop_reason=None, usage=dict(usage, output_tokens=0))
+        events = [
+            ("message_start", {"type": "message_start", "message": start}),
+            ("content_block_start", {"type": "content_block_start", "index": 0,
+                                     "content_block": {"type": "text", "text": ""}}),
+        ]
+        for i in range(0, len(text), self.stream_chunk_chars):
+            events.append(("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                                   "delta": {"type": "text_delta",
+                                                             "text": text[i:i + self.stream_chunk_chars]}}))
+        events += [
+            ("content_block_stop", {"type": "content_block_stop", "index": 0}),
+            ("message_delta", {"type": "message_delta",
+                               "delta": {"stop_reason": message["stop_reason"], "stop_sequence": None},
+                               "usage": {"output_tokens": usage["output_tokens"]}}),
+            ("message_stop", {"type": "message_stop"}),
+        ]
+        return "".join(f"event: {name}\ndata: {json.dumps(data)}\n\n" for name, data in events)
+
+
+class Fixtures:
+    """Loads fixture files once and fills in the page host URL."""
+
+    def __init__(self):
+        self.page_host = ""
+        self._cache = {}
+
+    def render(self, name):
+        if name not in self._cache:
+            self._cache[name] = load_fixture(name)
+        return self._cache[name].replace("{page_host}", self.page_host)
+
+
+STUB_CLASSES = {
+    "custom_search": CustomSearchStub,
+    "facecheck": FacecheckStub,
+    "pages": PageStub,
+    "gemini": GeminiStub,
+    "anthropic": AnthropicStub,
+}
+
+
+class UpstreamStubs:
+    """
+    Starts every stand-in upstream and exposes the environment variables
+    that point the backend at them.
+
+    Example:
+        stubs = UpstreamStubs({"gemini": StubConfig(latency_ms=900)}).start()
+        os.environ.update(stubs.env())
+    """
+
+    def __init__(self, configs=None):
+        configs = configs or {}
+        self.fixtures = Fixtures()
+        self.stubs = {
+            name: cls(configs.get(name, StubConfig()), self.fixtures)
+            for name, cls in STUB_CLASSES.items()
+        }
+        self.fixtures.page_host = self.stubs["pages"].url
+
+    def start(self):
+        for stub in self.stubs.values():
+            stub.start()
+        return self
+
+    def stop(self):
+        for stub in self.stubs.values():
+            stub.stop()
+
+    def env(self):
+        return {
+            "CUSTOM-SEARCH-URL": self.stubs["custom_search"].url + "/customsearch/v1",
+            "FACECHECK-URL": self.stubs["facecheck"].url,
+            "GEMINI-API-ENDPOINT": self.stubs["gemini"].url,
+            "ANTHROPIC-BASE-URL": self.stubs["anthropic"].url,
+            "CUSTOM-SEARCH-API": "bench-key",
+            "SEARCH-ENGINE-ID": "bench-cx",
+            "GEMINI-API": "bench-key",
+            "CLAUDE-API-KEY": "bench-key",
+            "FACECHECK-API-TOKEN": "bench-token",
+        }
+
+    def request_counts(self):
+        return {name: stub.requests for name, stub in self.stubs.items()}
+
+    def config_summary(self):
+        return {name: stub.config.to_dict() for name, stub in self.stubs.items()}
+
+
+def parse_stub_options(latencies=None, jitters=None, failure_rates=None, use_defaults=True):
+    """
+    Build per-upstream StubConfigs from "name=value" CLI options.
+
+    Example:
+        parse_stub_options(["gemini=1200"], ["gemini=300"], ["pages=0.05"])
+    """
+    def to_map(pairs, cast):
+        result = {}
+        for pair in pairs or []:
+            name, _, value = pair.partition("=")
+            if name not in UPSTREAMS:
+                raise ValueError(f"Unknown upstream '{name}'. Choose from: {', '.join(UPSTREAMS)}")
+            result[name] = cast(value)
+        return result
+
+    latency = to_map(latencies, float)
+    jitter = to_map(jitters, float)
+    failures = to_map(failure_rates, float)
+    configs = {}
+    for name in UPSTREAMS:
+        base = DEFAULT_LATENCY_MS[name] if use_defaults else 0
+        configs[name] = StubConfig(
+            latency_ms=latency.get(name, base),
+            jitter_ms=jitter.get(name, base * 0.2),
+            failure_rate=failures.get(name, 0.0),
+        )
+    return configs
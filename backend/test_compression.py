@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Tests for request body decoding and encoding negotiation (utils/compression.py).
+Usage:
+  python -m pytest test_compression.py
+  python test_compression.py
+"""
+
+import gzip
+import zlib
+
+from utils import compression
+from utils.compression import BodyTooLarge, UnsupportedEncoding, decode_body, negotiate
+
+BODY = b'{"text": "\\"Jordan Avery\\" OR \\"jordan.avery@example.com\\""}' * 20
+
+
+def expect(error, data, encoding):
+    try:
+        decode_body(data, encoding)
+    except error:
+        return
+    assert False, f"{encoding} body did not raise {error.__name__}"
+
+
+def test_decode_gzip_and_deflate():
+    assert decode_body(gzip.compress(BODY), "gzip") == BODY
+    assert decode_body(gzip.compress(BODY), " X-GZIP ") == BODY
+    assert decode_body(zlib.compress(BODY), "deflate") == BODY
+    assert decode_body(BODY, None) == BODY
+    assert decode_body(BODY, "identity") == BODY
+
+
+def test_br_and_unknown_encodings_are_refused():
+    expect(UnsupportedEncoding, b"\x0b\x02\x80hello\x03", "br")
+    expect(UnsupportedEncoding, BODY, "compress")
+
+
+def test_invalid_body():
+    expect(ValueError, b"not gzip at all", "gzip")
+
+
+def test_decompressed_size_is_capped():
+    limit = compression.MAX_DECOMPRESSED_BYTES
+    compression.MAX_DECOMPRESSED_BYTES = len(BODY) - 1
+    try:
+        expect(BodyTooLarge, gzip.compress(BODY), "gzip")
+        compression.MAX_DECOMPRESSED_BYTES = len(BODY)
+        assert decode_body(gzip.compress(BODY), "gzip") == BODY
+    finally:
+        compression.MAX_DECOMPRESSED_BYTES = limit
+
+
+def test_negotiate():
+    assert negotiate("gzip, deflate") == "gzip"
+    assert negotiate("identity") is None
+    assert negotiate("gzip;q=0") is None
+    assert negotiate("*") == compression.response_encodings()[0]
+    assert negotiate(None) is None
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"ok  {name}")
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Tests for URL canonicalization and near-duplicate detection (utils/dedup.py).
+Usage:
+  python -m pytest test_dedup.py
+  python test_dedup.py
+"""
+
+from utils.dedup import NearDuplicateIndex, canonicalize_url, hamming_distance, name_phrases, simhash
+
+ARTICLE = (
+    "The county planning board met on Tuesday evening to review the proposed expansion of the "
+    "riverside park, including a new playground, a boat launch and an extended walking trail along "
+    "the north bank. Residents spoke for and against the plan during a public comment period that ran "
+    "for more than two hours, raising concerns about parking, traffic on the access road and the cost "
+    "of maintaining the new facilities. The board is expected to vote on the final design next month "
+    "after the parks department publishes a revised budget and an environmental review."
+)
+OTHER = (
+    "A local bakery celebrated its fiftieth anniversary this weekend with free pastries, live music "
+    "and a display of photographs from its first years on Main Street. The owners thanked three "
+    "generations of customers and staff, and announced plans to open a second shop across town next "
+    "spring. Proceeds from a raffle held during the celebration will go to the regional food bank, "
+    "which has seen demand rise sharply over the past year according to its director."
+)
+
+UNRELATED = (
+    "The state transportation agency announced that the northbound lanes of the interstate bridge will "
+    "close overnight for resurfacing starting Monday. Drivers should expect detours through the "
+    "downtown exit and delays of up to thirty minutes during the work, which is scheduled to last two "
+    "weeks weather permitting. Commuter buses will follow the detour, and the agency recommends that "
+    "travelers check its website for live updates before leaving home."
+)
+# A page long enough to fingerprint reliably, as extracted pages are
+PAGE = f"{ARTICLE} {OTHER}"
+
+
+def test_canonicalize_url_collapses_variants():
+    assert canonicalize_url("http://m.Example.com/story/amp/?utm_source=x&id=7#top") == "https://example.com/story?id=7"
+    assert canonicalize_url("https://www.example.com/story/?fbclid=abc") == "https://example.com/story"
+    assert canonicalize_url("https://example.com/a?b=2&a=1") == canonicalize_url("https://example.com/a?a=1&b=2")
+
+
+def test_canonicalize_url_keeps_what_changes_the_page():
+    assert canonicalize_url("https://example.com/story?id=7") != canonicalize_url("https://example.com/story?id=8")
+    assert canonicalize_url("https://example.com:8443/x") == "https://example.com:8443/x"
+    assert canonicalize_url("mailto:someone@example.com") == "mailto:someone@example.com"
+
+
+def test_simhash_near_and_far():
+    syndicated = f"Reprinted with permission. {PAGE.replace('Tuesday', 'Wednesday')}"
+    assert simhash(PAGE) == simhash(PAGE)
+    assert hamming_distance(simhash(PAGE), simhash(syndicated)) <= 3
+    assert hamming_distance(simhash(PAGE), simhash(UNRELATED)) > 10
+
+
+def test_simhash_skips_short_text():
+    assert simhash("Jordan Avery profile page") is None
+
+
+def test_name_phrases():
+    assert name_phrases("Jordan Avery met Sam J. Lee in Silver Spring.") == {"Jordan Avery", "Sam J. Lee", "Silver Spring"}
+
+
+def test_index_matches_copies_on_other_hosts():
+    index = NearDuplicateIndex()
+    index.add(simhash(PAGE), "https://news.example.com/a", "summary A", "news.example.com", frozenset())
+    assert index.find(simhash(PAGE), "mirror.example.org", frozenset({"Jordan Avery"})) == (
+        "https://news.example.com/a", "summary A")
+    assert index.find(simhash(UNRELATED), "mirror.example.org", frozenset()) is None
+    assert index.find(None) is None
+
+
+def test_index_same_host_needs_same_names():
+    # Two profile pages on one site share the template but not the person
+    index = NearDuplicateIndex()
+    index.add(simhash(PAGE), "https://people.example.com/1", "summary 1", "people.example.com",
+              frozenset({"Jordan Avery"}))
+    assert index.find(simhash(PAGE), "people.example.com", frozenset({"Sam Lee"})) is None
+    assert index.find(simhash(PAGE), "people.example.com", frozenset({"Jordan Avery"})) == (
+        "https://people.example.com/1", "summary 1")
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"ok  {name}")
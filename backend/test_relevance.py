@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Tests for applicant relevance scoring (utils/relevance.py).
+Usage:
+  python -m pytest test_relevance.py
+  python test_relevance.py
+"""
+
+from utils.relevance import ApplicantProfile, snippet_score
+
+QUERY = '"Jordan Avery" OR "jordan.avery@example.com"'
+
+
+def test_from_request_reads_quoted_name_and_email():
+    profile = ApplicantProfile.from_request(QUERY)
+    assert set(profile.attributes) == {"email", "email_user", "full_name", "last_name"}
+
+
+def test_form_fields_win_over_the_quoted_name():
+    profile = ApplicantProfile.from_request('"Sam Lee"', attributes={"first_name": "Jordan", "last_name": "Avery"})
+    assert profile.score_pages(["Jordan Avery", "Sam Lee"]) == [0.4, 0]
+
+
+def test_scorable_needs_two_independent_attributes():
+    # Email and email user, or full name and last name, say the same thing once
+    assert not ApplicantProfile(first_name="Jordan", last_name="Avery").scorable()
+    assert not ApplicantProfile(email="jordan.avery@example.com").scorable()
+    assert not ApplicantProfile().scorable()
+    assert ApplicantProfile(last_name="Avery", city="Rockville").scorable()
+    assert ApplicantProfile.from_request(QUERY).scorable()
+
+
+def test_score_pages():
+    profile = ApplicantProfile.from_request(QUERY, attributes={"city": "Rockville", "zip": "20850-1234"})
+    scores = profile.score_pages([
+        "Contact: jordan.avery@example.com",
+        "Jordan Avery, 20850",
+        "AVERY, JORDAN of Rockville",
+        "The Avery family reunion",
+        "Nothing about the applicant here",
+    ])
+    assert scores == [1.0, 0.75, 0.65, 0.1, 0]
+
+
+def test_names_only_match_whole_words():
+    profile = ApplicantProfile(first_name="Jordan", last_name="Avery", city="Rockville")
+    assert profile.score_pages(["Jordana Averyson", "jordan averyville"]) == [0, 0]
+
+
+def test_snippet_score():
+    assert snippet_score("jordan.avery@example.com", "Jordan Avery - Profile", "Contact jordan.avery@example.com") == 1.0
+    assert snippet_score("jordan avery", "Sam Lee", "Unrelated") == 0.0
+    assert snippet_score("", "Jordan Avery", "") == 0.0
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"ok  {name}")
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Tests for pipeline admission control (utils/scheduler.py).
+Usage:
+  python -m pytest test_scheduler.py
+  python test_scheduler.py
+"""
+
+import threading
+import time
+
+from utils.rate_limiter import PRIORITY_BATCH, PRIORITY_INTERACTIVE, PRIORITY_NORMAL
+from utils.scheduler import PipelineScheduler, SchedulerRejected
+
+
+def queue(scheduler, priority, tenant, granted, hold=None):
+    """Wait for a slot on another thread, appending (priority, tenant) or the rejection reason to granted"""
+    queued = scheduler.stats()["queued"]
+
+    def run():
+        try:
+            taken = scheduler.acquire(priority=priority, tenant=tenant, timeout=5)
+        except SchedulerRejected as e:
+            granted.append(e.reason)
+            return
+        granted.append((priority, tenant))
+        if hold is not None:
+            hold.wait(5)
+        scheduler.release(taken)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    # Make arrival order deterministic: wait until this waiter is queued (or done)
+    deadline = time.monotonic() + 5
+    while scheduler.stats()["queued"] == queued and thread.is_alive() and not granted and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return thread
+
+
+def test_reserved_slot_only_goes_to_interactive():
+    scheduler = PipelineScheduler(slots=2, reserved_interactive=1)
+    batch = scheduler.acquire(priority=PRIORITY_BATCH, tenant="a")
+    try:
+        scheduler.acquire(priority=PRIORITY_NORMAL, tenant="a", timeout=0.05)
+        assert False, "a normal request took the reserved slot"
+    except SchedulerRejected as e:
+        assert e.reason == "timeout"
+    interactive = scheduler.acquire(priority=PRIORITY_INTERACTIVE, tenant="a", timeout=0.05)
+    assert scheduler.stats()["running"] == 2
+    scheduler.release(interactive)
+    scheduler.release(batch)
+    assert scheduler.stats()["running"] == 0
+
+
+def test_reserved_slots_leave_one_for_everyone():
+    scheduler = PipelineScheduler(slots=1, reserved_interactive=3)
+    assert scheduler.reserved_interactive == 0
+    scheduler.release(scheduler.acquire(priority=PRIORITY_BATCH, timeout=0.05))
+
+
+def test_higher_priority_goes_first():
+    scheduler = PipelineScheduler(slots=1, reserved_interactive=0)
+    held = scheduler.acquire(priority=PRIORITY_NORMAL, tenant="a")
+    granted = []
+    threads = [queue(scheduler, PRIORITY_BATCH, "a", granted),
+               queue(scheduler, PRIORITY_NORMAL, "a", granted),
+               queue(scheduler, PRIORITY_INTERACTIVE, "a", granted)]
+    scheduler.release(held)
+    for thread in threads:
+        thread.join(5)
+    assert granted == [(PRIORITY_INTERACTIVE, "a"), (PRIORITY_NORMAL, "a"), (PRIORITY_BATCH, "a")]
+
+
+def test_tenant_with_fewest_running_goes_first():
+    scheduler = PipelineScheduler(slots=2, reserved_interactive=0)
+    first = scheduler.acquire(tenant="busy")
+    second = scheduler.acquire(tenant="busy")
+    granted = []
+    hold = threading.Event()
+    threads = [queue(scheduler, PRIORITY_NORMAL, "busy", granted, hold),
+               queue(scheduler, PRIORITY_NORMAL, "quiet", granted, hold)]
+    scheduler.release(first)
+    time.sleep(0.05)
+    assert granted == [(PRIORITY_NORMAL, "quiet")]
+    hold.set()
+    scheduler.release(second)
+    for thread in threads:
+        thread.join(5)
+    assert granted == [(PRIORITY_NORMAL, "quiet"), (PRIORITY_NORMAL, "busy")]
+
+
+def test_full_queue_displaces_lower_class():
+    scheduler = PipelineScheduler(slots=1, max_queue=1, reserved_interactive=0)
+    held = scheduler.acquire(priority=PRIORITY_NORMAL, tenant="a")
+    granted = []
+    batch = queue(scheduler, PRIORITY_BATCH, "a", granted)
+    interactive = queue(scheduler, PRIORITY_INTERACTIVE, "a", granted)
+    batch.join(5)
+    assert granted == ["displaced"]
+    scheduler.release(held)
+    interactive.join(5)
+    assert granted == ["displaced", (PRIORITY_INTERACTIVE, "a")]
+
+
+def test_full_queue_rejects_same_or_lower_class():
+    scheduler = PipelineScheduler(slots=1, max_queue=1, reserved_interactive=0)
+    held = scheduler.acquire(priority=PRIORITY_NORMAL, tenant="a")
+    granted = []
+    waiter = queue(scheduler, PRIORITY_NORMAL, "a", granted)
+    for priority in (PRIORITY_NORMAL, PRIORITY_BATCH):
+        try:
+            scheduler.acquire(priority=priority, tenant="a", timeout=1)
+            assert False, "a full queue admitted another waiter"
+        except SchedulerRejected as e:
+            assert e.reason == "queue_full"
+    scheduler.release(held)
+    waiter.join(5)
+    assert granted == [(PRIORITY_NORMAL, "a")]
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"ok  {name}")
@@ -0,0 +1,146 @@
+"""
+Compact evidence context for the Claude analysis prompt.
+
+A deep_search result lists title, link, snippet and summary for every hit,
+and the snippet usually repeats part of the summary. The builder keeps one
+entry per distinct summary, drops fields that repeat others, puts the
+entries most related to the analysis request first, trims each entry to a
+per-result token budget and stops at a total budget, noting how many
+results were left out.
+"""
+import os
+from urllib.parse import urlsplit
+
+from utils.relevance import tokenize
+
+
+RESULT_TOKEN_BUDGET = int(os.getenv("ANALYSIS-RESULT-TOKENS", 150))
+CONTEXT_TOKEN_BUDGET = int(os.getenv("ANALYSIS-CONTEXT-TOKENS", 3000))
+
+# A snippet this much covered by the summary adds nothing
+SNIPPET_OVERLAP_THRESHOLD = 0.8
+
+# Court rows are first-hand records; face matches are the next strongest signal
+SOURCE_RANK = {"court_records": 0, "face_search": 1, "text_search": 2}
+
+# Summaries deep_search writes in place of a real page summary. They are
+# never evidence, and never reused from a re-screening baseline
+PLACEHOLDER_PREFIXES = ("Failed to retrieve summary", "Snippet only", "Low relevance", "No summary generated")
+
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token), good enough for budgeting"""
+    return (len(text) + 3) // 4
+
+
+def _trim(text, tokens):
+    limit = tokens * 4
+    if len(text) <= limit:
+        return text
+    cut = text[:limit].rsplit(" ", 1)[0]
+    return cut.rstrip(",;:.") + "…"
+
+
+def _short_link(link):
+    # Scheme, query and fragment cost tokens without telling Claude anything
+    parts = urlsplit(link or "")
+    if not parts.netloc:
+        return link or ""
+    host = parts.netloc.lower()
+    host = host[4:] if host.startswith("www.") else host
+    return host + parts.path.rstrip("/")
+
+
+def _covered(text, by):
+    """Share of text's tokens that also appear in by"""
+    tokens = set(tokenize(text))
+    if not tokens:
+        return 1.0
+    return len(tokens & set(tokenize(by))) / len(tokens)
+
+
+def _entry_fields(result):
+    # (summary text, snippet worth keeping, whether the page was actually summarized)
+    summary = " ".join(str(result.get("summary") or "").split())
+    snippet = " ".join(str(result.get("snippet") or "").split())
+    summarized = bool(summary) and not summary.startswith(PLACEHOLDER_PREFIXES)
+    if not summarized:
+        # Keep only the snippet: placeholders are "<reason>: <snippet or error>"
+        summary = ""
+    if snippet and summary and _covered(snippet, summary) >= SNIPPET_OVERLAP_THRESHOLD:
+        snippet = ""
+    return summary, snippet, summarized
+
+
+def build_context(summaries, request_text="", result_tokens=None, total_tokens=None):
+    """
+    Render deep_search summaries as a compact numbered evidence list.
+
+    Args:
+        summaries: The "summaries" list of a deep_search result
+        request_text: The user's analysis request, used to rank entries
+        result_tokens: Token budget per entry (default ANALYSIS-RESULT-TOKENS)
+        total_tokens: Token budget for the whole context (default ANALYSIS-CONTEXT-TOKENS)
+
+    Returns:
+        (context text, stats dict with results, merged, omitted and tokens)
+
+    Example:
+        build_context(result["summaries"], "Flag any history of fraud")
+        -> ("[1] court_records | Criminal case 123 (open)\\n...", {"results": 12, ...})
+    """
+    result_tokens = RESULT_TOKEN_BUDGET if result_tokens is None else result_tokens
+    total_tokens = CONTEXT_TOKEN_BUDGET if total_tokens is None else total_tokens
+    request_tokens = set(tokenize(request_text))
+
+    # One entry per distinct summary; syndicated copies just add their link
+    entries = {}
+    merged = 0
+    for position, result in enumerate(summaries or []):
+        if not isinstance(result, dict):
+            continue
+        summary, snippet, summarized = _entry_fields(result)
+        key = summary.lower() if summary else (result.get("link") or position)
+        if key in entries:
+            entries[key]["also"].append(_short_link(result.get("link")))
+            merged += 1
+            continue
+        title = " ".join(str(result.get("title") or "").split())
+        text = " ".join(part for part in (summary, snippet) if part)
+        entries[key] = {
+            "source": result.get("source") or "unknown",
+            # Name-only court matches may be someone else: rank them with the weakest evidence
+            "unverified": result.get("verified") is False,
+            "link": _short_link(result.get("link")),
+            "title": "" if title and _covered(title, text) >= SNIPPET_OVERLAP_THRESHOLD else title,
+            "text": text,
+            "summarized": summarized,
+            "matches": len(request_tokens & set(tokenize(f"{title} {text}"))),
+            "position": position,
+            "also": [],
+        }
+
+    ranked = sorted(entries.values(), key=lambda e: (
+        len(SOURCE_RANK) if e["unverified"] else SOURCE_RANK.get(e["source"], len(SOURCE_RANK)),
+        not e["summarized"], -e["matches"], e["position"]))
+
+    lines = []
+    used = 0
+    for entry in ranked:
+        source = entry["source"] + (" (unverified)" if entry["unverified"] else "")
+        header = " | ".join(part for part in (source, entry["link"], entry["title"]) if part)
+        if entry["also"]:
+            header += f" (also: {', '.join(entry['also'][:3])})"
+        block = f"[{len(lines) + 1}] {header}\n{_trim(entry['text'], result_tokens) or 'No details.'}"
+        cost = estimate_tokens(block)
+        if lines and used + cost > total_tokens:
+            break
+        lines.append(block)
+        used += cost
+
+    omitted = len(ranked) - len(lines)
+    if omitted:
+        lines.append(f"({omitted} lower-ranked results omitted)")
+    context = "\n".join(lines)
+    return context, {"results": len(lines) - (1 if omitted else 0), "merged": merged, "omitted": omitted,
+                     "tokens": estimate_tokens(context)}
@@ -8,7 +8,28 @@ import urllib.request
 import base64
 import tempfile
 import anthropic
+import contextvars
+import hashlib
+import logging
+import zlib
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from urllib.parse import urlsplit
+from google.api_core import exceptions as google_exceptions
 
+from utils.analysis_context import PLACEHOLDER_PREFIXES, build_context, estimate_tokens
+from utils.cache import TTLCache
+from utils.cascade import LOCAL, lead_summary, parse_cascade, parse_score, price_key, record_escalation, record_usage, tiers_for
+from utils.deadline import Deadline, DeadlineExceeded, current_deadline, deadline_scope
+from utils.dedup import NearDuplicateIndex, canonicalize_url, name_phrases, simhash
+from utils.court_records import COURT_SEARCH_TIMEOUT, court_search_enabled, format_court_records, search_court_records
+from utils.metrics import (timed, baseline_links_reused, bytes_downloaded, deadline_exceeded, duplicates_skipped,
+                           page_revalidations, relevance_filtered, stage_duration)
+from utils.rate_limiter import QuotaExceededError, RateLimiter, RateLimitTimeout
+from utils.resilience import CircuitOpenError, HedgedCall, circuit_breakers
+from utils.relevance import ApplicantProfile, snippet_score
+from utils.scheduler import pipeline_scheduler
+from utils.singleflight import SingleFlight
+from utils.tracing import SpanCollector, annotate, collect_spans, current_request_id, log_event
 
 # Load environment variables from .env file
 dotenv.load_dotenv()
@@ -17,17 +38,86 @@ SEARCH_ENGINE_ID = os.getenv("SEARCH-ENGINE-ID")
 GEMINI_API = os.getenv("GEMINI-API")
 CLAUDE_API_KEY = os.getenv("CLAUDE-API-KEY")  # Add your Claude API key to .env file
 
+# Upstream endpoints (overridable so benchmarks can point at local stand-ins)
+CUSTOM_SEARCH_URL = os.getenv("CUSTOM-SEARCH-URL", "https://www.googleapis.com/customsearch/v1")
+FACECHECK_URL = os.getenv("FACECHECK-URL", "https://facecheck.id")
+GEMINI_API_ENDPOINT = os.getenv("GEMINI-API-ENDPOINT")
+ANTHROPIC_BASE_URL = os.getenv("ANTHROPIC-BASE-URL")
+
 # Facecheck.id configuration
 FACECHECK_TESTING_MODE = True
 FACECHECK_APITOKEN = os.getenv("FACECHECK-API-TOKEN")
 
-genai.configure(api_key=GEMINI_API)
+if GEMINI_API_ENDPOINT:
+    genai.configure(api_key=GEMINI_API, transport="rest",
+                    client_options={"api_endpoint": GEMINI_API_ENDPOINT})
+else:
+    genai.configure(api_key=GEMINI_API)
+
+# Shared token buckets / daily quotas for every upstream API we call
+upstream_limiter = RateLimiter.from_env()
+MAX_RATE_LIMIT_RETRIES = 2
+
+# Page summaries keyed by canonical link, so repeat lookups skip the fetch + Gemini call.
+# Entries are _page_record()s: the page's excerpt is kept (compressed) with its summary
+# so a later search can score the page against its own applicant
+PAGE_CACHE_TTL = int(os.getenv("PAGE-CACHE-TTL", 24 * 60 * 60))
+page_summary_cache = TTLCache("page_summary", ttl=PAGE_CACHE_TTL,
+                              max_entries=int(os.getenv("PAGE-CACHE-SIZE", 1000)))
+# ETag / Last-Modified of summarized pages with their summary, kept longer than
+# the summary itself so an expired summary can be revalidated with a conditional GET
+page_validators = TTLCache("page_validators", ttl=int(os.getenv("PAGE-VALIDATOR-TTL", 7 * 24 * 60 * 60)),
+                           max_entries=int(os.getenv("PAGE-VALIDATOR-SIZE", 5000)))
+
+# "full" fetches and summarizes every result; "tiered" scores text results on
+# their title + snippet first and only fetches those above the threshold (at
+# most top-k of them), returning the rest with snippet-only summaries
+SUMMARY_MODES = ("full", "tiered")
+SUMMARY_MODE = os.getenv("SUMMARY-MODE", "full")
+SNIPPET_FETCH_THRESHOLD = float(os.getenv("SNIPPET-FETCH-THRESHOLD", 0.5))
+SNIPPET_FETCH_TOP_K = int(os.getenv("SNIPPET-FETCH-TOP-K", 3))
+
+# Fetched pages scoring below the threshold against the applicant's known
+# attributes are not summarized; "drop" removes them from the results,
+# "deprioritize" keeps them (snippet only) after the relevant ones
+RELEVANCE_THRESHOLD = float(os.getenv("RELEVANCE-THRESHOLD", 0.4))
+RELEVANCE_ACTION = os.getenv("RELEVANCE-ACTION", "deprioritize")
+
+# Default total time budget for deep_search in seconds (0 = no deadline)
+DEEP_SEARCH_BUDGET = float(os.getenv("DEEP-SEARCH-BUDGET", 0))
+
+# Per-call timeouts, so a hung upstream counts as a failure for its circuit breaker
+PAGE_FETCH_TIMEOUT = float(os.getenv("PAGE-FETCH-TIMEOUT", 15))
+GEMINI_TIMEOUT = float(os.getenv("GEMINI-TIMEOUT", 30))
+
+# Concurrent identical deep searches (e.g. an insert trigger plus a manual
+# re-check of the same applicant) share one pipeline run
+COALESCE_DEEP_SEARCH = os.getenv("COALESCE-DEEP-SEARCH", "true").lower() in ("1", "true", "yes", "on")
+deep_search_flights = SingleFlight("deep_search")
+
+# A page fetch still running after this latency percentile of recent fetches
+# gets a backup request; the first to finish wins (0 = no hedging)
+page_hedger = HedgedCall("page", percentile=float(os.getenv("PAGE-HEDGE-PERCENTILE", 0)),
+                         min_samples=int(os.getenv("PAGE-HEDGE-MIN-SAMPLES", 20)))
+
+# Model cascades, cheapest tier first ("model:max_size,...", see utils/cascade.py).
+# Pages are routed by word count: short ones get a local lead-sentence summary,
+# medium ones Flash-Lite, long ones Flash; a summary under SUMMARY-MIN-CHARS
+# moves up a tier. Scores are routed by context tokens, and a score inside
+# ANALYSIS-ESCALATE-BAND (or not a number) is asked again of the next tier
+SUMMARY_CASCADE = parse_cascade(os.getenv(
+    "SUMMARY-CASCADE", "local:80,models/gemini-2.0-flash-lite:1500,models/gemini-2.0-flash"))
+SUMMARY_MIN_CHARS = int(os.getenv("SUMMARY-MIN-CHARS", 40))
+ANALYSIS_CASCADE = parse_cascade(os.getenv(
+    "ANALYSIS-CASCADE", "claude-3-5-haiku-20241022:4000,claude-sonnet-4-20250514"))
+ANALYSIS_ESCALATE_BAND = tuple(float(bound) for bound in os.getenv("ANALYSIS-ESCALATE-BAND", "0.3,0.7").split(","))
+_gemini_models = {}
 
 def rs(text, num_results=10):
     """
     Perform a Google Custom Search for pages containing the given email address.
     """
-    url = "https://www.googleapis.com/customsearch/v1"
+    url = CUSTOM_SEARCH_URL
     params = {
         "key": CUSTOM_SEARCH_API,
         "cx": SEARCH_ENGINE_ID,
@@ -35,9 +125,17 @@ def rs(text, num_results=10):
         "num": num_results
     }
     
-    response = requests.get(url, params=params)
-    response.raise_for_status()
-    data = response.json()
+    with circuit_breakers.guard("google_search"), timed("rs"):
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            upstream_limiter.acquire("google_search", timeout=current_deadline().timeout())
+            response = requests.get(url, params=params, timeout=current_deadline().timeout())
+            if response.status_code != 429 or attempt == MAX_RATE_LIMIT_RETRIES:
+                break
+            # Back off the whole bucket, then queue up again
+            upstream_limiter.penalize("google_search", response.headers.get("Retry-After"))
+        bytes_downloaded.inc(len(response.content), upstream="google_search")
+        response.raise_for_status()
+        data = response.json()
     
     results = []
     for item in data.get("items", []):
@@ -51,139 +149,577 @@ def rs(text, num_results=10):
 import requests
 from bs4 import BeautifulSoup
 
-def deep_search(image_data=None, text_query=None, num_text_results=10):
+def _download_page(url, headers):
+    with timed("page_fetch"):
+        resp = requests.get(url, headers=headers, timeout=current_deadline().timeout(PAGE_FETCH_TIMEOUT))
+        bytes_downloaded.inc(len(resp.content), upstream="page")
+        annotate(bytes=len(resp.content), http_status=resp.status_code)
+        resp.raise_for_status()
+        return resp
+
+def _fetch_page(url, validators=None):
+    """
+    Download a result page, hedging slow fetches if enabled. With validators
+    from an earlier fetch the request is conditional.
+    
+    Returns:
+        (HTML or None if the page is unchanged (304), validators for the next fetch or None)
+    """
+    headers = {}
+    if validators:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+    resp = page_hedger.call(_download_page, url, headers)
+    if headers:
+        page_revalidations.inc(result="not_modified" if resp.status_code == 304 else "modified")
+        if resp.status_code == 304:
+            return None, validators
+    etag, last_modified = resp.headers.get("ETag"), resp.headers.get("Last-Modified")
+    return resp.text, ({"etag": etag, "last_modified": last_modified} if etag or last_modified else None)
+
+def _extract_excerpt(html):
+    """Extract the visible text of a page, trimmed to stay under the context limit."""
+    with timed("html_parse"):
+        soup = BeautifulSoup(html, 'html.parser')
+        text = soup.get_text(separator='\n', strip=True)
+        return '\n'.join(text.splitlines()[:500])  # first ~500 lines to stay under context limit
+
+def _page_record(summary, excerpt):
+    """Cache entry for a summarized page"""
+    return {"summary": summary, "excerpt": zlib.compress(excerpt.encode("utf-8")) if excerpt else None}
+
+def _record_excerpt(record):
+    """The page text stored in a _page_record, or None"""
+    return zlib.decompress(record["excerpt"]).decode("utf-8") if record and record.get("excerpt") else None
+
+def _gemini_model(name):
+    if name not in _gemini_models:
+        _gemini_models[name] = genai.GenerativeModel(name)
+    return _gemini_models[name]
+
+def _gemini_summary(model_name, excerpt):
+    """Ask one Gemini model for a one-paragraph summary of a page excerpt."""
+    # Build a targeted prompt
+    prompt = (
+        "Here is some page content:\n\n"
+        f"{excerpt}\n\n"
+        "Please write a concise, one-paragraph summary of the above."
+    )
+
+    # Generate the summary
+    with circuit_breakers.guard("gemini"):
+        upstream_limiter.acquire("gemini", timeout=current_deadline().timeout())
+        with timed("gemini_summarize", model=price_key(model_name)):
+            response = _gemini_model(model_name).generate_content(
+                prompt, request_options={"timeout": current_deadline().timeout(GEMINI_TIMEOUT)})
+    usage = getattr(response, "usage_metadata", None)
+    record_usage("summarize", model_name, getattr(usage, "prompt_token_count", 0),
+                 getattr(usage, "candidates_token_count", 0))
+    return response.text.strip()
+
+def _summarize_excerpt(excerpt):
     """
-    Perform comprehensive search using both face search and text search,
-    then fetch and summarize all resulting pages.
+    Summarize a page excerpt with the cheapest SUMMARY-CASCADE tier that takes
+    its length, moving up a tier when a model's summary is too short or its
+    call fails. A 429 (ResourceExhausted) or a spent daily quota is raised,
+    not escalated: every tier draws on the same Gemini quota.
+    """
+    tiers = tiers_for(SUMMARY_CASCADE, len(excerpt.split()))
+    for position, tier in enumerate(tiers):
+        last = position == len(tiers) - 1
+        if tier.model == LOCAL:
+            record_usage("summarize", LOCAL)
+            return lead_summary(excerpt)
+        try:
+            summary = _gemini_summary(tier.model, excerpt)
+        except (CircuitOpenError, DeadlineExceeded, RateLimitTimeout, QuotaExceededError,
+                google_exceptions.ResourceExhausted):
+            # Out of Gemini quota or time: the next tier would hit the same limit
+            raise
+        except Exception:
+            if last or current_deadline().expired():
+                raise
+            record_escalation("summarize", tier.model, "error")
+            continue
+        if last or len(summary) >= SUMMARY_MIN_CHARS:
+            return summary
+        record_escalation("summarize", tier.model, "short_output")
+
+def _run_source(name, search, *args):
+    """Run one search source inside its own span collector; a failed source yields no results."""
+    with collect_spans() as spans:
+        try:
+            results = search(*args)
+            log_event(f"{name}_done", results=len(results))
+        except Exception as e:
+            results = []
+            log_event(f"{name}_failed", level=logging.WARNING, error=str(e))
+    return results, spans.fields
+
+def _court_records_source(court_query):
+    cases = search_court_records(
+        court_query['first_name'],
+        court_query['last_name'],
+        middle_name=court_query.get('middle_name', ''),
+        county=court_query.get('county', ''),
+        timeout=current_deadline().timeout(COURT_SEARCH_TIMEOUT)
+    )
+    return format_court_records(cases, date_of_birth=court_query.get('date_of_birth'))
+
+def _select_for_fetch(unique_results, text_query, threshold, top_k):
+    """
+    Canonical links worth a full fetch in tiered mode: every face match (at
+    most three, and the strongest signal we have) plus the text results whose
+    snippet score clears the threshold, best first, capped at top_k (0 = no cap).
+    
+    Returns:
+        (set of canonical links to fetch, {canonical link: snippet score})
+    """
+    scores = {}
+    fetch = set()
+    for canonical, item in unique_results:
+        if item['source'] == 'face_search':
+            fetch.add(canonical)
+        else:
+            scores[canonical] = snippet_score(text_query or "", item.get('title'), item.get('snippet'))
+    ranked = sorted((link for link, score in scores.items() if score >= threshold),
+                    key=lambda link: scores[link], reverse=True)
+    fetch.update(ranked[:top_k] if top_k > 0 else ranked)
+    return fetch, scores
+
+def _normalize_text(value):
+    return " ".join(str(value or "").lower().split())
+
+def _baseline_index(baseline):
+    """{canonical link: entry} of the reusable web page summaries in a previous deep_search result"""
+    index = {}
+    for entry in (baseline or {}).get('summaries') or []:
+        if not isinstance(entry, dict) or entry.get('source') not in ('face_search', 'text_search'):
+            continue
+        summary = entry.get('summary')
+        if entry.get('link') and summary and not summary.startswith(PLACEHOLDER_PREFIXES):
+            index[canonicalize_url(entry['link'])] = entry
+    return index
+
+def _hit_changed(prior, item):
+    # Without a fetch, a new title or snippet is the only sign the page changed
+    return (_normalize_text(prior.get('title')) != _normalize_text(item.get('title'))
+            or _normalize_text(prior.get('snippet')) != _normalize_text(item.get('snippet')))
+
+def evidence_fingerprint(summaries):
+    """
+    Order-independent hash of a set of summary entries (source, canonical link,
+    summary). Two deep_search results with the same fingerprint give Claude
+    the same evidence.
+    
+    Args:
+        summaries: The "summaries" list of a deep_search result
+    """
+    digest = hashlib.sha256()
+    for line in sorted(
+        f"{entry.get('source', '')}\t{canonicalize_url(entry.get('link') or '')}\t{_normalize_text(entry.get('summary'))}"
+        for entry in summaries or [] if isinstance(entry, dict)
+    ):
+        digest.update(line.encode("utf-8"))
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+def deep_search(image_data=None, text_query=None, num_text_results=10, debug=False, court_query=None,
+                summary_mode=None, fetch_top_k=None, applicant=None, time_budget=None, baseline=None,
+                deadline=None):
+    """
+    Perform comprehensive search using face search, text search and court
+    records, then fetch and summarize all resulting pages.
     
     Args:
         image_data: Image data for face search (optional)
         text_query: Text query for regular search (optional)
         num_text_results: Number of text search results to retrieve
+        debug: Include a per-stage / per-link timing breakdown under "debug"
+        court_query: {"first_name", "last_name", "middle_name", "county", "date_of_birth"}
+                     to look up Maryland court cases (optional)
+        summary_mode: "full" or "tiered" (default SUMMARY-MODE)
+        fetch_top_k: Most text results fully fetched in tiered mode (default SNIPPET-FETCH-TOP-K)
+        applicant: Known attributes {"email", "city", "zip", "first_name", "last_name"} used to
+                   filter out pages about other people (optional; court_query names and an
+                   email-like text_query are used too)
+        time_budget: Total seconds the search may take (default DEEP-SEARCH-BUDGET, 0 = none).
+                     Split across discovery, fetch and summarize; when it runs out the
+                     summaries finished so far are returned with "partial": true
+        baseline: A previous deep_search result for the same applicant (optional). Links
+                  found again with the same title and snippet reuse its summary instead of
+                  being fetched and summarized again
+        deadline: Deadline already running for this search (optional); used instead of
+                  starting time_budget now, so time spent queueing for it counts
     
     Returns:
-        Combined summaries from both face search and text search results
+        Combined summaries from all sources
     """
-    model = genai.GenerativeModel('models/gemini-2.0-flash')
+    summary_mode = summary_mode or SUMMARY_MODE
+    if summary_mode not in SUMMARY_MODES:
+        raise ValueError(f"Unknown summary mode '{summary_mode}'. Choose from: {', '.join(SUMMARY_MODES)}")
+    
+    profile = ApplicantProfile.from_request(text_query, court_query, applicant)
+    time_budget = DEEP_SEARCH_BUDGET if time_budget is None else time_budget
+    if deadline is None:
+        deadline = Deadline(time_budget if time_budget > 0 else None)
+    timed_out_stages = []
+    
     all_results = []
+    stage_timings = {}
+    request_start = time.perf_counter()
     
-    # 1. Perform face search if image provided
+    # 1. Run the face search, text search and court lookup concurrently
+    sources = {}
     if image_data:
-        try:
-            face_results = face_search_formatted(image_data)
-            # Add source type to distinguish results
-            for result in face_results:
-                result['source'] = 'face_search'
-                all_results.append(result)
-            print(f"Face search found {len(face_results)} results")
-        except Exception as e:
-            print(f"Face search failed: {e}")
-    
-    # 2. Perform text search if query provided
+        sources['face_search'] = (face_search_formatted, image_data)
     if text_query:
-        try:
-            text_results = rs(text_query, num_results=num_text_results)
+        sources['text_search'] = (rs, text_query, num_text_results)
+    if court_query and court_query.get('last_name') and court_search_enabled():
+        sources['court_records'] = (_court_records_source, court_query)
+    
+    source_results = {}
+    if sources:
+        pool = ThreadPoolExecutor(max_workers=len(sources))
+        with deadline_scope(deadline.stage("discovery")) as stage_deadline:
+            try:
+                # copy_context carries the request id, priority, tracing and deadline into each thread
+                futures = {
+                    name: pool.submit(contextvars.copy_context().run, _run_source, name, *spec)
+                    for name, spec in sources.items()
+                }
+                for name, future in futures.items():
+                    try:
+                        source_results[name], stage_timings[name] = future.result(timeout=stage_deadline.remaining())
+                    except FutureTimeoutError:
+                        # The source's own upstream timeouts end it shortly; don't wait for it
+                        stage_timings[name] = {"status": "deadline_exceeded"}
+                        log_event(f"{name}_failed", level=logging.WARNING, error="Time budget exhausted")
+                        if "discovery" not in timed_out_stages:
+                            timed_out_stages.append("discovery")
+            finally:
+                pool.shutdown(wait=False, cancel_futures=True)
+    
+    # Face and text hits are web pages to summarize; court rows are already compact
+    for name in ('face_search', 'text_search'):
+        for result in source_results.get(name, []):
             # Add source type to distinguish results
-            for result in text_results:
-                result['source'] = 'text_search'
-                all_results.append(result)
-            print(f"Text search found {len(text_results)} results")
-        except Exception as e:
-            print(f"Text search failed: {e}")
+            result['source'] = name
+            all_results.append(result)
+    court_entries = source_results.get('court_records', [])
     
-    if not all_results:
-        return {"error": "No results found from either search method"}
+    if not all_results and not court_entries:
+        if timed_out_stages:
+            deadline_exceeded.inc(stage="discovery")
+            return {"error": "No results found within the time budget", "partial": True}
+        return {"error": "No results found from any search method"}
     
-    # 3. Remove duplicate links
+    # 2. Remove duplicate links, comparing canonical URLs so http/https,
+    # tracking parameters, trailing slashes and AMP/mobile variants collapse
     seen_links = set()
     unique_results = []
     for item in all_results:
-        if item['link'] not in seen_links:
-            seen_links.add(item['link'])
-            unique_results.append(item)
+        canonical = canonicalize_url(item['link'])
+        if canonical in seen_links:
+            duplicates_skipped.inc(kind="url")
+            continue
+        seen_links.add(canonical)
+        unique_results.append((canonical, item))
+    
+    if summary_mode == "tiered":
+        top_k = SNIPPET_FETCH_TOP_K if fetch_top_k is None else fetch_top_k
+        fetch_links, snippet_scores = _select_for_fetch(unique_results, text_query, SNIPPET_FETCH_THRESHOLD, top_k)
+    else:
+        fetch_links, snippet_scores = {canonical for canonical, _ in unique_results}, {}
     
-    print(f"Processing {len(unique_results)} unique links for deep search...")
+    log_event("deep_search_started", links=len(unique_results), fetching=len(fetch_links), mode=summary_mode)
     
-    # 4. Perform deep search on all unique results
+    # Links from the baseline whose summaries can be reused if the search hit is unchanged
+    baseline_pages = _baseline_index(baseline)
+    
+    # 3. Fetch and extract the pages that need a full summary
+    pages = []
+    with deadline_scope(deadline.stage("fetch")) as stage_deadline:
+        for canonical, item in unique_results:
+            page = {"canonical": canonical, "item": item, "spans": SpanCollector(), "summary": None, "excerpt": None,
+                    "relevance_text": None, "error": None, "low_relevance": False, "pending": False,
+                    "from_baseline": False, "validators": None}
+            with collect_spans(page["spans"]) as spans:
+                try:
+                    prior = baseline_pages.get(canonical)
+                    if prior is not None and not _hit_changed(prior, item):
+                        page["summary"] = prior["summary"]
+                        page["from_baseline"] = True
+                        # The page text if another search still has it cached, else what the baseline says
+                        page["relevance_text"] = (_record_excerpt(page_summary_cache.peek(canonical))
+                                                  or _record_excerpt(page_validators.peek(canonical))
+                                                  or f"{prior.get('title', '')}\n{prior.get('snippet', '')}\n{prior['summary']}")
+                        spans.annotate(tier="baseline")
+                    else:
+                        record = page_summary_cache.get(canonical)
+                        if record is not None:
+                            page["summary"], page["relevance_text"] = record["summary"], _record_excerpt(record)
+                        spans.annotate(cache="hit" if record is not None else "miss")
+                    if canonical in snippet_scores:
+                        spans.annotate(snippet_score=snippet_scores[canonical])
+                    if page["summary"] is None and canonical not in fetch_links:
+                        # Shallow tier: the search snippet stands in for the page
+                        page["summary"] = f"Snippet only (page not fetched): {item.get('snippet') or item['title']}"
+                        spans.annotate(tier="snippet")
+                    elif page["summary"] is None:
+                        stage_deadline.check()
+                        known = page_validators.get(canonical)
+                        html, page["validators"] = _fetch_page(item['link'], known)
+                        if html is None:
+                            # 304: unchanged since it was summarized, so extend the old summary
+                            page["summary"], page["relevance_text"] = known["summary"], _record_excerpt(known)
+                            page_summary_cache.set(canonical, _page_record(known["summary"], page["relevance_text"]))
+                            page_validators.set(canonical, known)
+                            spans.annotate(revalidated=True)
+                        else:
+                            page["excerpt"] = page["relevance_text"] = _extract_excerpt(html)
+                except Exception as e:
+                    if stage_deadline.expired():
+                        page["pending"] = True
+                    else:
+                        page["error"] = e
+            pages.append(page)
+        if any(page["pending"] for page in pages):
+            timed_out_stages.append("fetch")
+    
+    # 4. Score the fetched, cached and reused pages against what we know about
+    # the applicant, in one batch, and keep pages about someone else away from
+    # Gemini and Claude (the cache is shared with other applicants' searches).
+    # Face matches are about the applicant by construction, whatever their text
+    scored = [page for page in pages
+              if page["relevance_text"] is not None and page["item"].get("source") != "face_search"]
+    if profile.scorable() and scored:
+        with collect_spans() as spans, timed("relevance_score"):
+            scores = profile.score_pages([page["relevance_text"] for page in scored])
+        stage_timings['relevance'] = {"pages": len(scored), **spans.fields}
+        for page, score in zip(scored, scores):
+            page["spans"].annotate(relevance=score)
+            if score < RELEVANCE_THRESHOLD:
+                page["excerpt"] = None
+                page["low_relevance"] = True
+                page["summary"] = ("Low relevance to the applicant (page not summarized): "
+                                   f"{page['item'].get('snippet') or page['item']['title']}")
+                page["spans"].annotate(tier="low_relevance")
+                relevance_filtered.inc(action=RELEVANCE_ACTION)
+    
+    # 5. Summarize the rest, reusing the summary of near-duplicate pages
     summaries = []
-    for i, item in enumerate(unique_results, 1):
-        try:
-            print(f"Processing link {i}/{len(unique_results)}: {item['link']}")
+    low_relevance = []
+    link_timings = []
+    seen_pages = NearDuplicateIndex()
+    with deadline_scope(deadline.stage("summarize")) as stage_deadline:
+        for i, page in enumerate(pages, 1):
+            item = page["item"]
+            with collect_spans(page["spans"]) as spans:
+                if page["excerpt"] is not None:
+                    try:
+                        fingerprint = simhash(page["excerpt"])
+                        host, names = urlsplit(page["canonical"]).hostname, name_phrases(page["excerpt"])
+                        duplicate = seen_pages.find(fingerprint, host, names)
+                        if duplicate is not None:
+                            # Syndicated/mirrored copy of a page already summarized in this request
+                            duplicate_of, page["summary"] = duplicate
+                            duplicates_skipped.inc(kind="content")
+                            spans.annotate(duplicate_of=duplicate_of)
+                        else:
+                            stage_deadline.check()
+                            page["summary"] = _summarize_excerpt(page["excerpt"]) or "No summary generated"
+                            seen_pages.add(fingerprint, item['link'], page["summary"], host, names)
+                        record = _page_record(page["summary"], page["excerpt"])
+                        page_summary_cache.set(page["canonical"], record)
+                        if page["validators"]:
+                            page_validators.set(page["canonical"], {**page["validators"], **record})
+                    except CircuitOpenError:
+                        # Gemini is failing; fall back to the snippet rather than an error (not cached)
+                        page["summary"] = f"Snippet only (summarizer unavailable): {item.get('snippet') or item['title']}"
+                        spans.annotate(tier="circuit_open")
+                    except Exception as e:
+                        if stage_deadline.expired():
+                            page["pending"] = True
+                            if "summarize" not in timed_out_stages:
+                                timed_out_stages.append("summarize")
+                        else:
+                            page["error"] = e
+                
+                if page["pending"]:
+                    # Out of time before this page was finished; left out of the results
+                    spans.annotate(status="deadline_exceeded")
+                elif page["error"] is not None:
+                    if isinstance(page["error"], google_exceptions.ResourceExhausted):
+                        upstream_limiter.penalize("gemini")
+                    summary = f"Failed to retrieve summary: {str(page['error'])}"
+                    spans.annotate(status="error", error=str(page["error"]))
+                else:
+                    summary = page["summary"]
+                    spans.annotate(status="ok")
             
-            # Download the page
-            resp = requests.get(item['link'], timeout=15)
-            resp.raise_for_status()
-
-            # Extract visible text
-            soup = BeautifulSoup(resp.text, 'html.parser')
-            text = soup.get_text(separator='\n', strip=True)
-            excerpt = '\n'.join(text.splitlines()[:500])  # first ~500 lines to stay under context limit
-
-            # Build a targeted prompt
-            prompt = (
-                "Here is some page content:\n\n"
-                f"{excerpt}\n\n"
-                "Please write a concise, one-paragraph summary of the above."
-            )
-
-            # Generate the summary
-            response = model.generate_content(prompt)
-            summary = response.text.strip()
-
-            summaries.append({
-                "title": item['title'],
-                "link": item['link'],
-                "snippet": item.get('snippet', ''),
-                "source": item['source'],
-                "summary": summary or "No summary generated"
-            })
+            log_event("link_processed", index=i, total=len(pages), link=item['link'], **spans.fields)
+            link_timings.append({"link": item['link'], **spans.fields})
+            if page["pending"]:
+                continue
             
-        except Exception as e:
-            print(f"Failed to process {item['link']}: {e}")
-            summaries.append({
+            entry = {
                 "title": item['title'],
                 "link": item['link'],
                 "snippet": item.get('snippet', ''),
                 "source": item['source'],
-                "summary": f"Failed to retrieve summary: {str(e)}"
-            })
+                "summary": summary
+            }
+            if not page["low_relevance"]:
+                summaries.append(entry)
+            elif RELEVANCE_ACTION == "deprioritize":
+                low_relevance.append(entry)
 
-    return {
+    # Deprioritized pages go last so they are the first to be cut downstream
+    summaries.extend(low_relevance)
+
+    # 6. Court records go in as-is, without a page fetch or Gemini call
+    summaries.extend(court_entries)
+
+    results = {
         "total_results": len(summaries),
         "face_search_count": len([s for s in summaries if s['source'] == 'face_search']),
         "text_search_count": len([s for s in summaries if s['source'] == 'text_search']),
-        "summaries": summaries
+        "court_records_count": len(court_entries),
+        "summaries": summaries,
+        "partial": bool(timed_out_stages),
+        "evidence_fingerprint": evidence_fingerprint(summaries)
     }
+    if baseline_pages:
+        current = {page["canonical"] for page in pages}
+        reused = sum(1 for page in pages if page["from_baseline"])
+        results["incremental"] = {
+            "reused": reused,
+            "processed": len(pages) - reused,
+            "removed": sum(1 for canonical in baseline_pages if canonical not in current)
+        }
+        baseline_links_reused.inc(reused)
+    if timed_out_stages:
+        pending_links = sum(1 for page in pages if page["pending"])
+        results["pending_links"] = pending_links
+        results["timed_out_stages"] = timed_out_stages
+        for stage in timed_out_stages:
+            deadline_exceeded.inc(stage=stage)
+        log_event("deep_search_partial", level=logging.WARNING, stages=timed_out_stages,
+                  pending_links=pending_links, budget_s=time_budget)
+    total_ms = round((time.perf_counter() - request_start) * 1000, 1)
+    log_event("deep_search_done", links=len(summaries), total_ms=total_ms)
+
+    if debug:
+        results["debug"] = {
+            "request_id": current_request_id(),
+            "total_ms": total_ms,
+            "stages": stage_timings,
+            "links": link_timings
+        }
+    return results
+
+def deep_search_key(image_data=None, text_query=None, num_text_results=10, court_query=None,
+                    summary_mode=None, fetch_top_k=None, applicant=None, baseline=None):
+    """
+    Identity of a deep search for coalescing: the normalized text query, a
+    hash of the image, the result count and every option that changes the
+    output. Case and whitespace differences in the inputs don't matter.
+    """
+    def normalized_fields(fields):
+        return tuple(sorted((k, _normalize_text(v)) for k, v in (fields or {}).items() if _normalize_text(v)))
+
+    return (
+        _normalize_text(text_query),
+        hashlib.sha256(image_data).hexdigest() if image_data else None,
+        num_text_results,
+        normalized_fields(court_query),
+        summary_mode or SUMMARY_MODE,
+        SNIPPET_FETCH_TOP_K if fetch_top_k is None else fetch_top_k,
+        normalized_fields(applicant),
+        evidence_fingerprint(baseline.get('summaries')) if baseline else None,
+    )
+
+def coalesced_deep_search(image_data=None, text_query=None, num_text_results=10, debug=False,
+                          time_budget=None, **options):
+    """
+    deep_search(), but a call identical to one already running waits for that
+    run and returns its results (marked "coalesced": true) instead of starting
+    a second pipeline. A waiting call gives up after its own time budget.
+    
+    The run holds a pipeline scheduler slot; calls waiting on it don't. The
+    time budget starts before the slot is queued for, so the wait counts
+    against it and can't outlast it.
+    
+    Takes the same arguments as deep_search().
+    """
+    budget = DEEP_SEARCH_BUDGET if time_budget is None else time_budget
+    deadline = Deadline(budget if budget > 0 else None)
+    
+    if not COALESCE_DEEP_SEARCH:
+        with deadline_scope(deadline), pipeline_scheduler.slot():
+            return deep_search(image_data=image_data, text_query=text_query, num_text_results=num_text_results,
+                               debug=debug, time_budget=budget, deadline=deadline, **options)
+    
+    def run():
+        # Always build the debug block so any waiter can have it
+        with deadline_scope(deadline), pipeline_scheduler.slot():
+            return deep_search(image_data=image_data, text_query=text_query, num_text_results=num_text_results,
+                               debug=True, time_budget=budget, deadline=deadline, **options)
+    
+    key = deep_search_key(image_data, text_query, num_text_results, **options)
+    try:
+        results, shared = deep_search_flights.do(key, run, timeout=budget if budget > 0 else None)
+    except DeadlineExceeded:
+        deadline_exceeded.inc(stage="coalesced_wait")
+        return {"error": "No results found within the time budget", "partial": True, "coalesced": True}
+    
+    results = dict(results)
+    if shared:
+        results["coalesced"] = True
+    if not debug:
+        results.pop("debug", None)
+    return results
 
 def search_by_face(image_file_path):
     """
     Perform reverse image search using facecheck.id
     """
     if FACECHECK_TESTING_MODE:
-        print('****** TESTING MODE search, results are inaccurate, and queue wait is long, but credits are NOT deducted ******')
+        log_event("facecheck_testing_mode", level=logging.WARNING,
+                  message="results are inaccurate, and queue wait is long, but credits are NOT deducted")
 
-    site = 'https://facecheck.id'
+    site = FACECHECK_URL
     headers = {'accept': 'application/json', 'Authorization': FACECHECK_APITOKEN}
     
-    with open(image_file_path, 'rb') as f:
+    with open(image_file_path, 'rb') as f, circuit_breakers.guard("facecheck"):
         files = {'images': f, 'id_search': None}
-        response = requests.post(site + '/api/upload_pic', headers=headers, files=files).json()
-
-    if response['error']:
-        raise Exception(f"{response['error']} ({response['code']})")
+        upstream_limiter.acquire("facecheck", timeout=current_deadline().timeout())
+        with timed("facecheck_upload"):
+            response = requests.post(site + '/api/upload_pic', headers=headers, files=files,
+                                     timeout=current_deadline().timeout()).json()
+        if response['error']:
+            raise Exception(f"{response['error']} ({response['code']})")
 
     id_search = response['id_search']
-    print(response['message'] + ' id_search=' + id_search)
+    log_event("facecheck_uploaded", message=response['message'], id_search=id_search)
     json_data = {'id_search': id_search, 'with_progress': True, 'status_only': False, 'demo': FACECHECK_TESTING_MODE}
 
     while True:
-        response = requests.post(site + '/api/search', headers=headers, json=json_data).json()
-        if response['error']:
-            raise Exception(f"{response['error']} ({response['code']})")
+        with circuit_breakers.guard("facecheck"):
+            upstream_limiter.acquire("facecheck", timeout=current_deadline().timeout())
+            with timed("facecheck_poll"):
+                response = requests.post(site + '/api/search', headers=headers, json=json_data,
+                                         timeout=current_deadline().timeout()).json()
+            if response['error']:
+                raise Exception(f"{response['error']} ({response['code']})")
         if response['output']:
             return response['output']['items']
-        print(f'{response["message"]} progress: {response["progress"]}%')
-        time.sleep(1)
+        log_event("facecheck_progress", message=response["message"], progress=response["progress"])
+        # Stop polling once the request's time budget is spent
+        time.sleep(current_deadline().timeout(1))
 
 def face_search_formatted(image_data, num_results=3):
     """
@@ -220,62 +756,157 @@ def face_search_formatted(image_data, num_results=3):
         if os.path.exists(temp_file_path):
             os.unlink(temp_file_path)
 
-def analyze_with_claude(prompt, summaries_data):
-    """
-    Analyze the deep search summaries using Claude Sonnet 4 based on user prompt.
-    
-    Args:
-        prompt (str): User's analysis prompt/question
-        summaries_data (dict): JSON output from deep_search function
-    
-    Returns:
-        str: Claude's analysis text response
-    """
+# "score" asks Claude for the trust score alone; "explain" for the score on the
+# first line followed by a short explanation
+ANALYSIS_MODES = ("score", "explain")
+ANALYSIS_INSTRUCTIONS = {
+    "score": "Only output a floating point number rounded to 2 decimal places between 0 and 1 and no other text.",
+    "explain": ("On the first line, output only a floating point number rounded to 2 decimal places between 0 and 1. "
+                "Then, on the following lines, briefly explain which results drove the score."),
+}
+
+def _claude_client():
     if not CLAUDE_API_KEY:
         raise Exception("Claude API key not found. Please set CLAUDE-API-KEY in your .env file")
+    return anthropic.Anthropic(api_key=CLAUDE_API_KEY, base_url=ANTHROPIC_BASE_URL)
+
+def _analysis_request(prompt, summaries_data, mode="score"):
+    """Keyword arguments for client.messages.create/stream for one analysis."""
+    if mode not in ANALYSIS_MODES:
+        raise ValueError(f"Unknown analysis mode '{mode}'. Choose from: {', '.join(ANALYSIS_MODES)}")
     
-    # Initialize Claude client
-    client = anthropic.Anthropic(api_key=CLAUDE_API_KEY)
-    
-    # Prepare the context from summaries
-    context = ""
-    
-    for i, result in enumerate(summaries_data.get('summaries', []), 1):
-        context += f"""
-Result {i} (Source: {result.get('source', 'unknown')}):
-- Title: {result.get('title', 'N/A')}
-- Link: {result.get('link', 'N/A')}
-- Original Snippet: {result.get('snippet', 'N/A')}
-- AI Summary: {result.get('summary', 'N/A')}
----
-"""
+    # Deduplicated, ranked and trimmed to the token budgets
+    context, stats = build_context(summaries_data.get('summaries', []), prompt)
+    annotate(context_results=stats["results"], context_omitted=stats["omitted"], context_tokens=stats["tokens"])
     
     # Create the full prompt for Claude
     full_prompt = f"""
-You are an expert analyst reviewing the trustworthiness of a person based on the search results where 0 is least trustworthy and 1 is most trustworthy. Only output a floating point number rounded to 2 decimal places between 0 and 1 and no other text.
+You are an expert analyst reviewing the trustworthiness of a person based on the search results where 0 is least trustworthy and 1 is most trustworthy. {ANALYSIS_INSTRUCTIONS[mode]}
 As for strict guidelines, you must base your output number on the User's Analysis Request based on what the user deems more risky and less risky pieces of information. 
+
+Search results (source | link | title, then what the page says):
 {context}
 
 User's Analysis Request:
 {prompt}
 """
     
+    return {
+        "model": ANALYSIS_CASCADE[-1].model,  # top tier; analyze_with_claude() may start lower
+        "max_tokens": 4000,
+        "temperature": 0.1,  # Low temperature for more focused analysis
+        "messages": [
+            {
+                "role": "user",
+                "content": full_prompt
+            }
+        ]
+    }
+
+def _record_claude_usage(response, mode):
+    record_usage(mode, response.model, response.usage.input_tokens, response.usage.output_tokens)
+    annotate(model=response.model,
+             input_tokens=response.usage.input_tokens,
+             output_tokens=response.usage.output_tokens)
+    log_event("claude_analysis_done", input_tokens=response.usage.input_tokens,
+              output_tokens=response.usage.output_tokens)
+
+def _score_escalation(text):
+    """Why a lower tier's score should be asked again of the next tier, or None to keep it"""
+    score = parse_score(text)
+    if score is None:
+        return "unparseable"
+    low, high = ANALYSIS_ESCALATE_BAND
+    return "uncertain" if low < score < high else None
+
+def analyze_with_claude(prompt, summaries_data, mode="score"):
+    """
+    Analyze the deep search summaries with Claude based on user prompt.
+    
+    Scores go through ANALYSIS-CASCADE: the cheapest model that takes the
+    context answers first, and only ambiguous answers reach the larger model.
+    Explanations always come from the top tier.
+    
+    Args:
+        prompt (str): User's analysis prompt/question
+        summaries_data (dict): JSON output from deep_search function
+        mode (str): "score" (default) or "explain"
+    
+    Returns:
+        str: Claude's analysis text response
+    """
+    client = _claude_client()
+    request = _analysis_request(prompt, summaries_data, mode)
+    if mode == "score":
+        tiers = tiers_for(ANALYSIS_CASCADE, estimate_tokens(request["messages"][0]["content"]))
+    else:
+        tiers = ANALYSIS_CASCADE[-1:]
+    
     try:
-        # Call Claude Sonnet 4
-        response = client.messages.create(
-            model="claude-sonnet-4-20250514",  # Claude Sonnet 4
-            max_tokens=4000,
-            temperature=0.1,  # Low temperature for more focused analysis
-            messages=[
-                {
-                    "role": "user",
-                    "content": full_prompt
-                }
-            ]
-        )
+        for position, tier in enumerate(tiers):
+            last = position == len(tiers) - 1
+            try:
+                with circuit_breakers.guard("anthropic"):
+                    upstream_limiter.acquire("anthropic")
+                    with timed("claude_analyze", model=tier.model):
+                        response = client.messages.create(**{**request, "model": tier.model})
+            except (CircuitOpenError, RateLimitTimeout, anthropic.RateLimitError):
+                raise
+            except Exception:
+                if last:
+                    raise
+                record_escalation(mode, tier.model, "error")
+                continue
+            _record_claude_usage(response, mode)
+            text = response.content[0].text
+            reason = None if last else _score_escalation(text)
+            if reason is None:
+                return text
+            record_escalation(mode, tier.model, reason)
+            log_event("analysis_escalated", model=tier.model, reason=reason, answer=text[:20])
         
-        return response.content[0].text
+    except anthropic.RateLimitError as e:
+        upstream_limiter.penalize("anthropic", e.response.headers.get("retry-after"))
+        raise Exception(f"Claude API error: {str(e)}")
+    except Exception as e:
+        raise Exception(f"Claude API error: {str(e)}")
+
+def stream_analysis_with_claude(prompt, summaries_data, mode="score"):
+    """
+    Like analyze_with_claude(), but yields the analysis text as Claude
+    generates it.
+    
+    A score is a single number, so it runs through the cascade and is
+    yielded whole; explanations stream from the top tier.
+    
+    Yields:
+        str: Text deltas, in order; joined they are the full analysis
+    """
+    if mode == "score":
+        yield analyze_with_claude(prompt, summaries_data, mode)
+        return
+    client = _claude_client()
+    request = _analysis_request(prompt, summaries_data, mode)
+    
+    try:
+        with circuit_breakers.guard("anthropic"):
+            upstream_limiter.acquire("anthropic")
+            start = time.perf_counter()
+            first_token = True
+            with timed("claude_analyze", model=request["model"]), client.messages.stream(**request) as stream:
+                for text in stream.text_stream:
+                    if first_token:
+                        first_token = False
+                        waited = time.perf_counter() - start
+                        stage_duration.observe(waited, stage="claude_first_token")
+                        annotate(first_token_ms=round(waited * 1000, 1))
+                    yield text
+                response = stream.get_final_message()
+        _record_claude_usage(response, mode)
         
+    except anthropic.RateLimitError as e:
+        upstream_limiter.penalize("anthropic", e.response.headers.get("retry-after"))
+        raise Exception(f"Claude API error: {str(e)}")
     except Exception as e:
         raise Exception(f"Claude API error: {str(e)}")
 
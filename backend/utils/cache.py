@@ -0,0 +1,61 @@
+"""
+Small thread-safe TTL cache used to avoid re-summarizing pages we have
+already processed recently.
+"""
+import collections
+import threading
+import time
+
+from utils.metrics import cache_requests
+
+
+class TTLCache:
+    """
+    LRU cache whose entries expire after `ttl` seconds.
+
+    Hits and misses are counted in bouncer_cache_requests_total under `name`.
+    """
+
+    def __init__(self, name, ttl, max_entries=1000):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = collections.OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                cache_requests.inc(cache=self.name, result="miss")
+                return default
+            self._entries.move_to_end(key)
+            cache_requests.inc(cache=self.name, result="hit")
+            return entry[1]
+
+    def peek(self, key, default=None):
+        """Like get(), but not counted as a lookup and without refreshing the entry's LRU position"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                return default
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,121 @@
+"""
+Model cascades: route each summarization or scoring call to the cheapest
+tier that can handle it, and escalate when the answer isn't good enough.
+
+A cascade is configured as a comma-separated list of tiers, cheapest first,
+each with the largest input it takes ("model:max_size"; the last tier has
+no limit), e.g. "local:60,gemini-2.0-flash-lite:800,gemini-2.0-flash".
+"local" is a heuristic that runs without any model call.
+
+Calls, tokens and estimated cost are counted per task and model so the
+/metrics endpoint shows how the work (and spend) splits across tiers.
+"""
+import re
+
+from utils.metrics import model_calls, model_cost_usd, model_escalations, model_tokens
+from utils.tracing import annotate
+
+
+LOCAL = "local"
+
+# List prices in USD per million (input, output) tokens, for cost estimates
+MODEL_PRICES = {
+    "gemini-2.0-flash": (0.10, 0.40),
+    "gemini-2.0-flash-lite": (0.075, 0.30),
+    "claude-3-5-haiku-20241022": (0.80, 4.00),
+    "claude-sonnet-4-20250514": (3.00, 15.00),
+}
+
+_SCORE = re.compile(r"(?<![\d.])(0(?:\.\d+)?|1(?:\.0+)?)(?![\d.])")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+class Tier:
+    """One step of a cascade: a model name and the largest input it takes (None = any)."""
+
+    def __init__(self, model, max_size=None):
+        self.model = model
+        self.max_size = max_size
+
+    def __repr__(self):
+        return f"Tier({self.model!r}, max_size={self.max_size})"
+
+    def accepts(self, size):
+        return self.max_size is None or size <= self.max_size
+
+
+def parse_cascade(spec):
+    """
+    Parse "model:max_size,...,model" into tiers. Every tier but the last needs
+    a max_size; the last one takes whatever is left.
+
+    Raises:
+        ValueError: Empty spec, or a bad max_size
+    """
+    tiers = []
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        model, _, size = part.rpartition(":")
+        if not size.strip().isdigit():
+            model, size = part, ""
+        tiers.append(Tier(model.strip(), int(size) if size else None))
+    if not tiers:
+        raise ValueError("A model cascade needs at least one tier")
+    if any(tier.max_size is None for tier in tiers[:-1]):
+        raise ValueError(f"Every tier but the last needs a max size: {spec!r}")
+    tiers[-1].max_size = None
+    return tiers
+
+
+def tiers_for(tiers, size):
+    """The tiers worth trying for an input of this size, cheapest first"""
+    for index, tier in enumerate(tiers):
+        if tier.accepts(size):
+            return tiers[index:]
+    return tiers[-1:]
+
+
+def price_key(model):
+    # "models/gemini-2.0-flash" -> "gemini-2.0-flash"
+    return model.rsplit("/", 1)[-1]
+
+
+def record_usage(task, model, input_tokens=0, output_tokens=0):
+    """Count one model call with its tokens and estimated cost."""
+    model = price_key(model)
+    model_calls.inc(task=task, model=model)
+    model_tokens.inc(input_tokens or 0, task=task, model=model, kind="input")
+    model_tokens.inc(output_tokens or 0, task=task, model=model, kind="output")
+    prices = MODEL_PRICES.get(model)
+    if prices:
+        cost = ((input_tokens or 0) * prices[0] + (output_tokens or 0) * prices[1]) / 1_000_000
+        model_cost_usd.inc(cost, task=task, model=model)
+    annotate(**{f"{task}_model": model})
+
+
+def record_escalation(task, from_model, reason):
+    model_escalations.inc(task=task, model=price_key(from_model), reason=reason)
+
+
+def lead_summary(text, max_words=60):
+    """
+    Local stand-in for a model summary of a short page: its opening
+    sentences, up to max_words words.
+    """
+    words = " ".join(text.split()).split(" ")
+    if len(words) <= max_words:
+        return " ".join(words).strip()
+    summary = []
+    for sentence in _SENTENCE_END.split(" ".join(words[:max_words])):
+        summary.append(sentence)
+        if sentence.endswith((".", "!", "?")) and len(" ".join(summary).split()) >= max_words // 2:
+            break
+    return " ".join(summary).strip()
+
+
+def parse_score(text):
+    """The first number between 0 and 1 in a scoring answer, or None"""
+    match = _SCORE.search(text or "")
+    return float(match.group(1)) if match else None
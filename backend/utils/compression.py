@@ -0,0 +1,130 @@
+"""
+Content-Encoding for large API payloads.
+
+Responses: JSON and text bodies of at least COMPRESS-MIN-BYTES are
+compressed with the best encoding the caller lists in Accept-Encoding:
+brotli ("br", only when the brotli package is installed), then gzip.
+Streamed responses (SSE, chunked analyses) are left alone so each chunk
+still reaches the caller as soon as it is written.
+
+Requests: a body sent with Content-Encoding gzip or deflate is
+decompressed before it is parsed, up to MAX-DECOMPRESSED-BYTES so a small
+compressed body can't expand into an unbounded one. br request bodies are
+refused: the brotli package can't stop decompressing at a size limit.
+"""
+import gzip
+import os
+import zlib
+
+from utils.metrics import response_bytes, timed
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+COMPRESS_RESPONSES = os.getenv("COMPRESS-RESPONSES", "true").lower() in ("1", "true", "yes", "on")
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS-MIN-BYTES", 1024))
+GZIP_LEVEL = int(os.getenv("GZIP-LEVEL", 6))
+BROTLI_QUALITY = int(os.getenv("BROTLI-QUALITY", 5))
+MAX_DECOMPRESSED_BYTES = int(os.getenv("MAX-DECOMPRESSED-BYTES", 20 * 1024 * 1024))
+
+COMPRESSIBLE_MIMETYPES = ("application/json", "text/plain", "text/html", "text/markdown")
+
+
+class UnsupportedEncoding(ValueError):
+    """A request body's Content-Encoding isn't one we can decode."""
+
+
+class BodyTooLarge(ValueError):
+    """A compressed request body expands past MAX-DECOMPRESSED-BYTES."""
+
+
+def response_encodings():
+    """Encodings we can produce, most preferred first"""
+    return ("br", "gzip") if BROTLI_AVAILABLE else ("gzip",)
+
+
+def negotiate(accept_encoding):
+    """
+    Pick a response encoding from an Accept-Encoding header, or None for identity.
+
+    Example:
+        negotiate("gzip;q=0.8, br") -> "br" (with brotli installed)
+    """
+    weights = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        weight = 1.0
+        params = params.strip().replace(" ", "")
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name] = weight
+    candidates = [(weights.get(name, weights.get("*", 0.0)), -position, name)
+                  for position, name in enumerate(response_encodings())]
+    weight, _, name = max(candidates)
+    return name if weight > 0 else None
+
+
+def compress(data, encoding):
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+    raise UnsupportedEncoding(f"Unsupported encoding '{encoding}'")
+
+
+def compress_response(response, accept_encoding):
+    """Compress a Flask response in place when it is worth it and the caller accepts it."""
+    response.vary.add("Accept-Encoding")
+    if (not COMPRESS_RESPONSES or response.is_streamed or response.direct_passthrough
+            or "Content-Encoding" in response.headers or response.status_code < 200
+            or response.status_code in (204, 304) or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_BYTES:
+        return response
+    encoding = negotiate(accept_encoding)
+    if encoding is None:
+        response_bytes.inc(len(data), encoding="identity", kind="sent")
+        return response
+    with timed("response_compress", encoding=encoding):
+        body = compress(data, encoding)
+    response_bytes.inc(len(data), encoding=encoding, kind="raw")
+    response_bytes.inc(len(body), encoding=encoding, kind="sent")
+    response.set_data(body)
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def decode_body(data, content_encoding):
+    """
+    Undo a request body's Content-Encoding.
+
+    Raises:
+        UnsupportedEncoding: Unknown encoding, or br
+        BodyTooLarge: The body expands past MAX-DECOMPRESSED-BYTES
+        ValueError: The body isn't valid for its encoding
+    """
+    encoding = (content_encoding or "identity").strip().lower()
+    if encoding in ("", "identity"):
+        return data
+    try:
+        if encoding in ("gzip", "x-gzip", "deflate"):
+            # wbits: gzip header for gzip, zlib header for deflate; stop one byte past the limit
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS if "gzip" in encoding else zlib.MAX_WBITS)
+            out = decompressor.decompress(data, MAX_DECOMPRESSED_BYTES + 1)
+        else:
+            raise UnsupportedEncoding(f"Unsupported Content-Encoding '{content_encoding}'")
+    except zlib.error as e:
+        raise ValueError(f"Invalid {encoding} request body: {e}")
+    if len(out) > MAX_DECOMPRESSED_BYTES:
+        raise BodyTooLarge(f"Request body expands past {MAX_DECOMPRESSED_BYTES} bytes")
+    return out
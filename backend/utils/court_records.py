@@ -0,0 +1,202 @@
+"""
+Maryland court records as a deep_search source.
+
+Wraps the repo-root scraper (scrape_maryland.py) in one long-lived
+MarylandCourtSearchService in requests mode, so lookups reuse the search
+form state and the polite request spacing across API requests. Court rows
+are turned into compact summary entries directly; they never go through
+Gemini.
+"""
+import contextvars
+import datetime
+import logging
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from utils.cache import TTLCache
+from utils.metrics import timed
+from utils.tracing import annotate, log_event
+
+# scrape_maryland.py and court_store.py live at the repository root
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if REPO_ROOT not in sys.path:
+    sys.path.append(REPO_ROOT)
+
+try:
+    from court_store import CourtCaseStore, search_key
+    from scrape_maryland import MarylandCourtSearchService
+    COURT_SEARCH_AVAILABLE = True
+except ImportError:
+    COURT_SEARCH_AVAILABLE = False
+
+COURT_SEARCH_ENABLED = os.getenv("COURT-SEARCH-ENABLED", "true").lower() in ("1", "true", "yes", "on")
+COURT_SEARCH_BASE_URL = os.getenv("COURT-SEARCH-BASE-URL", "https://casesearch.courts.state.md.us")
+# A cold lookup is ~6 requests (form, search, up to COURT-SEARCH-MAX-PAGES
+# results pages, ...): at 30 rpm that is ~12s, inside the 25s timeout
+COURT_SEARCH_TIMEOUT = float(os.getenv("COURT-SEARCH-TIMEOUT", 25))
+COURT_SEARCH_RPM = float(os.getenv("COURT-SEARCH-RPM", 30))
+# Distinct lookups queued or running at once; more are turned away rather
+# than piling up behind the one-at-a-time scraper after callers gave up
+COURT_SEARCH_MAX_PENDING = int(os.getenv("COURT-SEARCH-MAX-PENDING", 4))
+COURT_SEARCH_MAX_PAGES = int(os.getenv("COURT-SEARCH-MAX-PAGES", 3))
+COURT_STORE_PATH = os.getenv("COURT-STORE-PATH")
+COURT_MAX_RECORDS = int(os.getenv("COURT-MAX-RECORDS", 10))
+
+# Rows per name search; a timed-out lookup still finishes and fills this
+court_records_cache = TTLCache("court_records", ttl=int(os.getenv("COURT-CACHE-TTL", 24 * 60 * 60)),
+                               max_entries=int(os.getenv("COURT-CACHE-SIZE", 500)))
+
+_service = None
+_service_lock = threading.Lock()
+# The scraper keeps one session and form state, so searches run one at a time
+_search_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="court-search")
+# search key -> future of the lookup queued or running for it
+_pending = {}
+_pending_lock = threading.Lock()
+
+
+class CourtSearchTimeout(Exception):
+    pass
+
+
+class CourtSearchBusy(Exception):
+    """Raised instead of queueing a lookup when COURT-SEARCH-MAX-PENDING are already pending."""
+
+
+def court_search_enabled():
+    return COURT_SEARCH_ENABLED and COURT_SEARCH_AVAILABLE
+
+
+def _get_service():
+    global _service
+    with _service_lock:
+        if _service is None:
+            service = MarylandCourtSearchService(
+                use_selenium=False,
+                requests_per_minute=COURT_SEARCH_RPM,
+                store=CourtCaseStore(COURT_STORE_PATH) if COURT_STORE_PATH else None
+            )
+            service.scraper.base_url = COURT_SEARCH_BASE_URL.rstrip('/')
+            service.scraper.search_url = f"{service.scraper.base_url}/casesearch/inquirySearch.jis"
+            _service = service
+        return _service
+
+
+def _search(first_name, last_name, middle_name, county):
+    service = _get_service()
+    with _search_lock:
+        # The service answers from the shared store and only marks complete searches fresh there
+        results = service.search(first_name, last_name, middle_name=middle_name, county=county,
+                                 mode="requests", max_pages=COURT_SEARCH_MAX_PAGES)
+    if results is None:
+        raise Exception("Court case search failed")
+    return results
+
+
+def _lookup(key, first_name, last_name, middle_name, county):
+    try:
+        results = _search(first_name, last_name, middle_name, county)
+        court_records_cache.set(key, results)
+        return results
+    finally:
+        with _pending_lock:
+            _pending.pop(key, None)
+
+
+def _submit(key, first_name, last_name, middle_name, county):
+    """The pending lookup for key, starting one if there is none and the backlog has room"""
+    with _pending_lock:
+        future = _pending.get(key)
+        if future is not None:
+            annotate(coalesced=True)
+            return future
+        if len(_pending) >= COURT_SEARCH_MAX_PENDING:
+            raise CourtSearchBusy(f"{len(_pending)} court searches already pending")
+        ctx = contextvars.copy_context()
+        future = _pending[key] = _executor.submit(ctx.run, _lookup, key, first_name, last_name, middle_name, county)
+        return future
+
+
+def search_court_records(first_name, last_name, middle_name="", county="", timeout=None):
+    """
+    Look up Maryland court cases for a name.
+
+    Args:
+        first_name: Applicant's first name
+        last_name: Applicant's last name (required)
+        middle_name: Optional middle name
+        county: Optional county filter
+        timeout: Seconds to wait (default COURT-SEARCH-TIMEOUT)
+
+    Returns:
+        list: Case rows as parsed from the results table
+
+    Raises:
+        CourtSearchTimeout: The lookup is still running; it keeps going in the
+        background and fills the cache for the next request
+        CourtSearchBusy: Too many lookups pending; nothing was queued
+    """
+    key = search_key(first_name, last_name, middle_name, county)
+    results = court_records_cache.get(key)
+    annotate(cache="hit" if results is not None else "miss")
+    if results is not None:
+        return results
+
+    timeout = COURT_SEARCH_TIMEOUT if timeout is None else timeout
+    with timed("court_search"):
+        # Identical lookups share one pending search
+        future = _submit(key, first_name, last_name, middle_name, county)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            raise CourtSearchTimeout(f"Court search exceeded {timeout:g}s")
+
+
+def _normalize_dob(value):
+    """A date of birth as a date when it parses (MM/DD/YYYY, YYYY-MM-DD, ...), else the trimmed text"""
+    value = (value or "").strip()
+    for fmt in ("%m/%d/%Y", "%Y-%m-%d", "%m-%d-%Y", "%m/%d/%y"):
+        try:
+            return datetime.datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    return value
+
+
+def format_court_records(cases, date_of_birth=None):
+    """
+    Turn case rows into deep_search summary entries. Rows whose date of birth
+    differs from the applicant's (compared as dates, so 4/7/1984 matches
+    04/07/1984) are dropped. Rows that can't be checked (no
+    date of birth on either side) are name matches only: they are marked
+    "verified": False and listed after the verified ones. At most
+    COURT-MAX-RECORDS are kept.
+
+    Returns:
+        list: {"title", "link", "snippet", "source", "summary", "verified"} dicts
+    """
+    entries = []
+    date_of_birth = _normalize_dob(date_of_birth)
+    for case in cases:
+        if date_of_birth and case.get('date_of_birth') and _normalize_dob(case['date_of_birth']) != date_of_birth:
+            continue
+        verified = bool(date_of_birth and case.get('date_of_birth'))
+        entries.append({
+            "title": f"{case.get('case_type', 'Court')} case {case.get('case_number', '')} ({case.get('case_status', 'unknown')})",
+            "link": case.get('detail_url', ''),
+            "snippet": f"{case.get('name', '')}, DOB {case.get('date_of_birth') or 'n/a'}, {case.get('party_type', '')}",
+            "source": "court_records",
+            "summary": ("" if verified else "Name match only, date of birth not verified: ") + (
+                        f"{case.get('party_type', 'Party')} in {case.get('case_caption', '')}; "
+                        f"{case.get('court', '')}, filed {case.get('filing_date', 'n/a')}, "
+                        f"status {case.get('case_status', 'unknown')}."),
+            "verified": verified,
+        })
+    entries.sort(key=lambda entry: not entry["verified"])  # stable: verified rows first
+    entries = entries[:COURT_MAX_RECORDS]
+    log_event("court_records_formatted", level=logging.DEBUG, cases=len(cases), kept=len(entries),
+              unverified=sum(not entry["verified"] for entry in entries))
+    return entries
@@ -0,0 +1,105 @@
+"""
+Time budgets for a whole request, split across its stages.
+
+A caller of /deep-search can pass a total budget. deep_search binds a
+Deadline for the request and gives each stage (discovery, fetch, summarize)
+its share of whatever time is left when the stage starts, so a stage that
+finishes early hands its unused time to the next one. Upstream calls read
+the current deadline to cap their own timeouts; a stage that runs out stops
+starting new work and the request returns what it has finished so far.
+"""
+import contextlib
+import contextvars
+import time
+
+
+# Share of the remaining budget each stage gets when it starts
+STAGE_SHARES = {
+    "discovery": 0.4,
+    "fetch": 0.3,
+    "summarize": 0.3,
+}
+
+# Deadline of the work running in the current request/thread
+_current_deadline = contextvars.ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """Raised when there is no time left in the current budget."""
+
+
+class Deadline:
+    """
+    A point in time work has to finish by. Deadline(None) never expires, so
+    callers don't need to special-case requests without a budget.
+
+    Example:
+        deadline = Deadline(10)
+        fetch = deadline.stage("fetch")  # 3s: fetch's share of the 10s left
+        requests.get(url, timeout=fetch.timeout(15))
+    """
+
+    def __init__(self, seconds=None, expires_at=None):
+        if expires_at is None and seconds is not None:
+            expires_at = time.monotonic() + max(0.0, seconds)
+        self.expires_at = expires_at
+
+    def __repr__(self):
+        remaining = self.remaining()
+        return "Deadline(unbounded)" if remaining is None else f"Deadline({remaining:.3f}s left)"
+
+    def remaining(self):
+        """Seconds left (never negative), or None when unbounded"""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    def timeout(self, cap=None):
+        """
+        Timeout for one blocking call: the time left, capped at cap.
+
+        Raises:
+            DeadlineExceeded: No time left
+        """
+        remaining = self.remaining()
+        if remaining is None:
+            return cap
+        if remaining <= 0:
+            raise DeadlineExceeded("Time budget exhausted")
+        return remaining if cap is None else min(cap, remaining)
+
+    def check(self):
+        """Raise DeadlineExceeded if the deadline has passed."""
+        if self.expired():
+            raise DeadlineExceeded("Time budget exhausted")
+
+    def stage(self, name, shares=STAGE_SHARES):
+        """
+        Sub-deadline for a stage: its share of the time left, relative to the
+        stages that have not started yet (this one and the ones after it).
+        """
+        remaining = self.remaining()
+        if remaining is None:
+            return Deadline()
+        names = list(shares)
+        pending = sum(shares[n] for n in names[names.index(name):])
+        share = shares[name] / pending if pending else 1.0
+        return Deadline(remaining * share)
+
+
+def current_deadline():
+    """Deadline of the work running in the current context (unbounded by default)."""
+    return _current_deadline.get() or Deadline()
+
+
+@contextlib.contextmanager
+def deadline_scope(deadline):
+    """Bound the upstream calls made inside the block by the given deadline."""
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
@@ -0,0 +1,139 @@
+"""
+URL canonicalization and near-duplicate text detection for deep_search.
+
+Search and face-match results often point at the same article through
+different URLs (http vs https, tracking parameters, AMP or mobile hosts) or
+at syndicated copies on other sites. Links are canonicalized before fetching,
+and extracted page text is fingerprinted with a 64-bit simhash so a copy can
+reuse the summary of the page it duplicates instead of another Gemini call.
+"""
+import hashlib
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+
+# Query parameters that only track the click, never change the page
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "gbraid", "wbraid", "msclkid", "yclid", "igshid", "mc_cid", "mc_eid",
+    "ref_src", "ref_url", "referrer", "si", "spm", "_ga", "_gl", "cmpid", "s_cid", "ocid",
+    "amp", "outputtype",
+}
+TRACKING_PREFIXES = ("utm_", "hsa_", "pk_", "mtm_")
+
+# Host prefixes that serve the same content as the bare domain
+MIRROR_HOST_PREFIXES = ("www.", "m.", "mobile.", "amp.")
+
+_AMP_DIR = re.compile(r"/amp/?$", re.IGNORECASE)
+_AMP_SUFFIX = re.compile(r"\.amp(\.html?)?$", re.IGNORECASE)
+_WORD = re.compile(r"\w+")
+# Runs of two or more capitalized words: people, places, organizations
+_NAME_PHRASE = re.compile(r"\b[A-Z][a-z'’-]+(?:\s+[A-Z]\.?)?(?:\s+[A-Z][a-z'’-]+)+\b")
+
+# Max differing bits out of 64 to count as the same text. Pages about
+# different people sharing one site's boilerplate have measured 6 apart
+NEAR_DUPLICATE_DISTANCE = 3
+MIN_FINGERPRINT_WORDS = 50  # shorter texts are too easy to collide
+
+
+def canonicalize_url(url):
+    """
+    Normalize a link so variants of the same page compare equal.
+
+    Example:
+        canonicalize_url("http://m.Example.com/story/amp/?utm_source=x&id=7#top")
+        -> "https://example.com/story?id=7"
+    """
+    try:
+        parts = urlsplit(url.strip())
+    except (AttributeError, ValueError):
+        return url
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        return url
+
+    host = parts.hostname.lower()
+    for prefix in MIRROR_HOST_PREFIXES:
+        if host.startswith(prefix) and host.count(".") > 1:
+            host = host[len(prefix):]
+            break
+    # Default ports are dropped along with the scheme difference
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+
+    path = re.sub(r"/{2,}", "/", parts.path or "/")
+    path = _AMP_SUFFIX.sub(r"\1", _AMP_DIR.sub("", path)) or "/"
+    if len(path) > 1:
+        path = path.rstrip("/")
+
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    )
+    return urlunsplit(("https", host, path, urlencode(query), ""))
+
+
+def _feature_hash(feature):
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def simhash(text, shingle_size=3, min_words=MIN_FINGERPRINT_WORDS):
+    """
+    64-bit simhash over word shingles, or None if the text has fewer than
+    min_words words. Texts that share most of their shingles end up a few
+    bits apart; unrelated texts differ in ~32 bits.
+    """
+    words = _WORD.findall(text.lower())
+    if not words or len(words) < max(min_words, shingle_size):
+        return None
+    shingles = [" ".join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)]
+
+    # Column-wise bit counts over fixed-width bit strings keep the per-bit
+    # loop in C; a bit is set when most shingle hashes have it set
+    features = set(shingles)
+    columns = zip(*(format(_feature_hash(f), "064b") for f in features))
+    half = len(features) / 2
+    bits = "".join("1" if column.count("1") > half else "0" for column in columns)
+    return int(bits, 2)
+
+
+def name_phrases(text):
+    """Capitalized multi-word phrases in a text (names of people, places, ...)"""
+    return frozenset(" ".join(match.split()) for match in _NAME_PHRASE.findall(text or ""))
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count("1")
+
+
+class NearDuplicateIndex:
+    """
+    Fingerprints of the pages seen in one request, each with a payload
+    (the page's summary). Linear scan; a request has tens of pages at most.
+
+    Two pages on the same host can be close only because they share the
+    site's template, so there they must also name the same people (same
+    name_phrases) to count as duplicates.
+    """
+
+    def __init__(self, max_distance=NEAR_DUPLICATE_DISTANCE):
+        self.max_distance = max_distance
+        self._entries = []  # (fingerprint, key, payload, host, names)
+
+    def find(self, fingerprint, host=None, names=None):
+        """(key, payload) of the closest page within max_distance, or None"""
+        if fingerprint is None:
+            return None
+        best = None
+        for known, key, payload, known_host, known_names in self._entries:
+            if host is not None and host == known_host and names != known_names:
+                continue
+            distance = hamming_distance(fingerprint, known)
+            if distance <= self.max_distance and (best is None or distance < best[0]):
+                best = (distance, key, payload)
+        return best[1:] if best else None
+
+    def add(self, fingerprint, key, payload, host=None, names=None):
+        if fingerprint is not None:
+            self._entries.append((fingerprint, key, payload, host, names))
+
+    def __len__(self):
+        return len(self._entries)
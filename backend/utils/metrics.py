@@ -0,0 +1,247 @@
+"""
+In-process counters and latency histograms, rendered in the Prometheus
+text exposition format for the /metrics endpoint.
+"""
+import contextlib
+import threading
+import time
+
+from utils.tracing import record_span
+
+
+# Latency buckets in seconds, wide enough for 60s+ deep searches
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+
+def _label_key(labels):
+    return tuple(sorted((labels or {}).items()))
+
+
+def _format_labels(key, extra=None):
+    pairs = list(key) + list(extra or [])
+    if not pairs:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in pairs
+    )
+    return "{" + body + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """Monotonically increasing value, optionally split by labels."""
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(_label_key(labels), 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram of observed values (seconds by default)."""
+
+    def __init__(self, name, documentation, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label key -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def snapshot(self, **labels):
+        """Return (bucket counts, sum, count) for one label set."""
+        with self._lock:
+            series = self._series.get(_label_key(labels))
+            if series is None:
+                return [0] * len(self.buckets), 0.0, 0
+            return list(series[:-2]), series[-2], series[-1]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series[:-2]):
+                    le = [("le", _format_value(bound))]
+                    lines.append(f"{self.name}_bucket{_format_labels(key, le)} {count}")
+                lines.append(f"{self.name}_bucket{_format_labels(key, [('le', '+Inf')])} {series[-1]}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(series[-2])}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {series[-1]}")
+        return lines
+
+
+class Registry:
+    """Holds every metric so they can be rendered together."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name, documentation):
+        return self._register(name, lambda: Counter(name, documentation))
+
+    def histogram(self, name, documentation, buckets=DEFAULT_BUCKETS):
+        return self._register(name, lambda: Histogram(name, documentation, buckets))
+
+    def _register(self, name, factory):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = factory()
+            return self._metrics[name]
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+stage_duration = registry.histogram(
+    "bouncer_stage_duration_seconds",
+    "Time spent in each pipeline stage (rs, facecheck_poll, page_fetch, html_parse, gemini_summarize, claude_analyze).",
+)
+stage_errors = registry.counter(
+    "bouncer_stage_errors_total",
+    "Exceptions raised inside each pipeline stage.",
+)
+cache_requests = registry.counter(
+    "bouncer_cache_requests_total",
+    "Cache lookups by cache name and result (hit/miss).",
+)
+bytes_downloaded = registry.counter(
+    "bouncer_bytes_downloaded_total",
+    "Response body bytes downloaded from upstreams and result pages.",
+)
+duplicates_skipped = registry.counter(
+    "bouncer_duplicates_skipped_total",
+    "Results not fetched (kind=url) or not summarized (kind=content) because they duplicated another result.",
+)
+relevance_filtered = registry.counter(
+    "bouncer_relevance_filtered_total",
+    "Fetched pages not summarized because they scored below the applicant relevance threshold.",
+)
+deadline_exceeded = registry.counter(
+    "bouncer_deadline_exceeded_total",
+    "deep_search stages cut short because the request's time budget ran out.",
+)
+circuit_breaker_transitions = registry.counter(
+    "bouncer_circuit_breaker_transitions_total",
+    "Upstream circuit breaker state changes, by the state entered.",
+)
+circuit_breaker_rejections = registry.counter(
+    "bouncer_circuit_breaker_rejections_total",
+    "Upstream calls failed fast because the upstream's circuit breaker was open.",
+)
+hedged_requests = registry.counter(
+    "bouncer_hedged_requests_total",
+    "Calls that started a backup request, by which attempt finished first.",
+)
+coalesced_requests = registry.counter(
+    "bouncer_coalesced_requests_total",
+    "Requests that waited for an identical in-flight run instead of starting their own.",
+)
+baseline_links_reused = registry.counter(
+    "bouncer_baseline_links_reused_total",
+    "Re-screening links whose summary was reused from the caller's baseline instead of fetched again.",
+)
+analyses_reused = registry.counter(
+    "bouncer_analyses_reused_total",
+    "Claude analyses skipped because the evidence matched the caller's previous analysis.",
+)
+page_revalidations = registry.counter(
+    "bouncer_page_revalidations_total",
+    "Conditional page fetches for expired summaries, by whether the page had changed.",
+)
+scheduler_rejections = registry.counter(
+    "bouncer_scheduler_rejections_total",
+    "Pipeline requests turned away by the scheduler queue, by priority and reason.",
+)
+model_calls = registry.counter(
+    "bouncer_model_calls_total",
+    "Summarization and scoring calls answered by each model tier (model=local: no model call).",
+)
+model_tokens = registry.counter(
+    "bouncer_model_tokens_total",
+    "Input and output tokens used by each model tier.",
+)
+model_cost_usd = registry.counter(
+    "bouncer_model_cost_usd_total",
+    "Estimated model spend in USD from list prices, by task and model.",
+)
+model_escalations = registry.counter(
+    "bouncer_model_escalations_total",
+    "Calls passed on to the next model tier, by the tier that gave up and why.",
+)
+response_bytes = registry.counter(
+    "bouncer_response_bytes_total",
+    "Compressible response body bytes by Content-Encoding, before (kind=raw) and after (kind=sent) compression.",
+)
+http_request_duration = registry.histogram(
+    "bouncer_http_request_duration_seconds",
+    "Flask request latency by endpoint and status code.",
+)
+
+
+@contextlib.contextmanager
+def timed(stage, **labels):
+    """
+    Time a pipeline stage and count it as an error if it raises.
+
+    Example:
+        with timed("page_fetch"):
+            resp = requests.get(url)
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        stage_errors.inc(stage=stage, **labels)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        stage_duration.observe(elapsed, stage=stage, **labels)
+        record_span(stage, elapsed)
+
+
+def render_prometheus():
+    """Text exposition of all registered metrics."""
+    return registry.render()
@@ -0,0 +1,351 @@
+"""
+Token-bucket rate limiting and daily quota accounting for upstream APIs.
+
+Every upstream we call (Google Custom Search, facecheck.id, Gemini, Anthropic)
+gets its own bucket. Callers block in a priority queue until a token is
+available instead of firing the request and eating a 429.
+
+Bucket state lives in a backend:
+- LocalBackend: in-process state, good for a single Flask worker
+- RedisBackend: shared state so several workers/instances respect one limit
+"""
+import contextlib
+import contextvars
+import datetime
+import heapq
+import itertools
+import os
+import threading
+import time
+
+from utils.metrics import stage_duration
+from utils.tracing import record_span
+
+
+# Priority classes (lower value is served first)
+PRIORITY_INTERACTIVE = 0
+PRIORITY_NORMAL = 1
+PRIORITY_BATCH = 2
+
+PRIORITY_NAMES = {
+    "interactive": PRIORITY_INTERACTIVE,
+    "normal": PRIORITY_NORMAL,
+    "batch": PRIORITY_BATCH,
+}
+
+# Priority of the work running in the current request/thread
+_current_priority = contextvars.ContextVar("upstream_priority", default=PRIORITY_NORMAL)
+
+# Default limits per upstream: (requests per second, burst size, daily quota or 0 for none)
+DEFAULT_LIMITS = {
+    "google_search": (1.0, 5, 10000),
+    "facecheck": (1.0, 2, 0),
+    "gemini": (10.0, 10, 0),
+    "anthropic": (0.8, 4, 0),
+}
+
+
+class QuotaExceededError(Exception):
+    """Raised when the daily quota for an upstream has been used up."""
+
+
+class RateLimitTimeout(Exception):
+    """Raised when a caller gave up waiting for a token."""
+
+
+def parse_priority(value, default=PRIORITY_NORMAL):
+    """
+    Convert a priority name ("interactive", "normal", "batch") or number into
+    a priority value. Unknown values fall back to the default.
+    """
+    if value is None or value == "":
+        return default
+    if isinstance(value, int):
+        return value
+    value = str(value).strip().lower()
+    if value in PRIORITY_NAMES:
+        return PRIORITY_NAMES[value]
+    try:
+        return int(value)
+    except ValueError:
+        return default
+
+
+def current_priority():
+    """Priority of the work running in the current context."""
+    return _current_priority.get()
+
+
+@contextlib.contextmanager
+def priority_scope(priority):
+    """Run upstream calls made inside the block with the given priority."""
+    token = _current_priority.set(parse_priority(priority))
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+def _today():
+    return datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%d")
+
+
+class UpstreamLimit:
+    """Rate and quota settings for a single upstream."""
+
+    def __init__(self, name, rate, burst, daily_quota=0):
+        self.name = name
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self.daily_quota = int(daily_quota or 0)
+
+    def __repr__(self):
+        return (f"UpstreamLimit({self.name!r}, rate={self.rate}, "
+                f"burst={self.burst}, daily_quota={self.daily_quota})")
+
+
+class LocalBackend:
+    """Keeps bucket and quota state in this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}   # name -> [tokens, last_refill, blocked_until]
+        self._usage = {}     # name -> (day, count)
+
+    def try_acquire(self, limit, tokens=1):
+        """
+        Try to take tokens from the bucket.
+
+        Returns:
+            float: 0 if the tokens were granted, otherwise seconds to wait
+        """
+        now = time.monotonic()
+        with self._lock:
+            day, used = self._usage.get(limit.name, (_today(), 0))
+            if day != _today():
+                day, used = _today(), 0
+            if limit.daily_quota and used + tokens > limit.daily_quota:
+                raise QuotaExceededError(
+                    f"Daily quota of {limit.daily_quota} requests for {limit.name} exhausted")
+
+            bucket = self._buckets.setdefault(limit.name, [float(limit.burst), now, 0.0])
+            if bucket[2] > now:
+                return bucket[2] - now
+
+            bucket[0] = min(limit.burst, bucket[0] + (now - bucket[1]) * limit.rate)
+            bucket[1] = now
+            if bucket[0] >= tokens:
+                bucket[0] -= tokens
+                self._usage[limit.name] = (day, used + tokens)
+                return 0.0
+            return (tokens - bucket[0]) / limit.rate if limit.rate > 0 else 1.0
+
+    def penalize(self, limit, seconds):
+        """Block the bucket for a while, e.g. after the upstream answered 429."""
+        with self._lock:
+            now = time.monotonic()
+            bucket = self._buckets.setdefault(limit.name, [float(limit.burst), now, 0.0])
+            bucket[0] = 0.0
+            bucket[1] = now
+            bucket[2] = max(bucket[2], now + seconds)
+
+    def usage(self, limit):
+        with self._lock:
+            day, used = self._usage.get(limit.name, (_today(), 0))
+            return used if day == _today() else 0
+
+
+class RedisBackend:
+    """
+    Keeps bucket and quota state in Redis so every worker shares one budget.
+    Requires the optional `redis` package.
+    """
+
+    # KEYS: bucket key, quota key, block key
+    # ARGV: rate, burst, tokens, now, daily quota
+    _ACQUIRE_SCRIPT = """
+local blocked = tonumber(redis.call('GET', KEYS[3]) or '0')
+local now = tonumber(ARGV[4])
+if blocked > now then
+  return {0, tostring(blocked - now)}
+end
+local quota = tonumber(ARGV[5])
+local used = tonumber(redis.call('GET', KEYS[2]) or '0')
+if quota > 0 and used + tonumber(ARGV[3]) > quota then
+  return {-1, '0'}
+end
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1] or ARGV[2])
+local ts = tonumber(state[2] or ARGV[4])
+tokens = math.min(burst, tokens + (now - ts) * rate)
+local wanted = tonumber(ARGV[3])
+if tokens >= wanted then
+  tokens = tokens - wanted
+  redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+  redis.call('EXPIRE', KEYS[1], 3600)
+  redis.call('INCRBY', KEYS[2], wanted)
+  redis.call('EXPIRE', KEYS[2], 172800)
+  return {1, '0'}
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], 3600)
+return {0, tostring((wanted - tokens) / rate)}
+"""
+
+    def __init__(self, url, prefix="bouncer:ratelimit"):
+        import redis  # optional dependency
+
+        self._redis = redis.Redis.from_url(url)
+        self._prefix = prefix
+        self._acquire = self._redis.register_script(self._ACQUIRE_SCRIPT)
+
+    def _keys(self, limit):
+        base = f"{self._prefix}:{limit.name}"
+        return [f"{base}:bucket", f"{base}:quota:{_today()}", f"{base}:blocked"]
+
+    def try_acquire(self, limit, tokens=1):
+        granted, wait = self._acquire(
+            keys=self._keys(limit),
+            args=[limit.rate, limit.burst, tokens, time.time(), limit.daily_quota],
+        )
+        if int(granted) == -1:
+            raise QuotaExceededError(
+                f"Daily quota of {limit.daily_quota} requests for {limit.name} exhausted")
+        return 0.0 if int(granted) == 1 else float(wait)
+
+    def penalize(self, limit, seconds):
+        bucket_key, _, block_key = self._keys(limit)
+        pipe = self._redis.pipeline()
+        pipe.hset(bucket_key, mapping={"tokens": 0, "ts": time.time()})
+        pipe.set(block_key, time.time() + seconds, ex=max(1, int(seconds) + 1))
+        pipe.execute()
+
+    def usage(self, limit):
+        return int(self._redis.get(self._keys(limit)[1]) or 0)
+
+
+class RateLimiter:
+    """
+    Per-upstream token buckets with priority queuing.
+
+    Waiters for the same upstream are served strictly by (priority, arrival),
+    so interactive work is not stuck behind a batch of background checks.
+    """
+
+    def __init__(self, limits, backend=None):
+        self.limits = {limit.name: limit for limit in limits}
+        self.backend = backend or LocalBackend()
+        self._queues = {name: [] for name in self.limits}
+        self._conditions = {name: threading.Condition() for name in self.limits}
+        self._sequence = itertools.count()
+
+    @classmethod
+    def from_env(cls):
+        """
+        Build a limiter from environment variables, e.g.
+        GEMINI-QPS, GEMINI-BURST, GEMINI-DAILY-QUOTA and
+        RATE-LIMIT-BACKEND=local (default) or a redis:// URL.
+        """
+        limits = []
+        for name, (rate, burst, quota) in DEFAULT_LIMITS.items():
+            prefix = name.upper().replace("_", "-")
+            limits.append(UpstreamLimit(
+                name,
+                rate=float(os.getenv(f"{prefix}-QPS", rate)),
+                burst=int(os.getenv(f"{prefix}-BURST", burst)),
+                daily_quota=int(os.getenv(f"{prefix}-DAILY-QUOTA", quota)),
+            ))
+
+        backend_url = os.getenv("RATE-LIMIT-BACKEND", "local")
+        if backend_url.startswith(("redis://", "rediss://", "unix://")):
+            backend = RedisBackend(backend_url)
+        else:
+            backend = LocalBackend()
+        return cls(limits, backend=backend)
+
+    def acquire(self, upstream, priority=None, tokens=1, timeout=None):
+        """
+        Block until a token for the upstream is available.
+
+        Args:
+            upstream: Upstream name, e.g. "gemini"
+            priority: Priority value; defaults to the current context's priority
+            tokens: Number of tokens to take
+            timeout: Maximum seconds to wait (None waits indefinitely)
+
+        Raises:
+            QuotaExceededError: The daily quota is used up
+            RateLimitTimeout: No token became available within the timeout
+        """
+        limit = self.limits.get(upstream)
+        if limit is None:
+            return
+
+        priority = current_priority() if priority is None else parse_priority(priority)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        condition = self._conditions[upstream]
+        queue = self._queues[upstream]
+        ticket = (priority, next(self._sequence))
+        start = time.perf_counter()
+
+        with condition:
+            heapq.heappush(queue, ticket)
+            try:
+                while True:
+                    wait = None
+                    if queue[0] == ticket:
+                        wait = self.backend.try_acquire(limit, tokens)
+                        if wait == 0:
+                            heapq.heappop(queue)
+                            condition.notify_all()
+                            waited = time.perf_counter() - start
+                            stage_duration.observe(waited, stage="rate_limit_wait", upstream=upstream)
+                            record_span(f"{upstream}_rate_limit_wait", waited)
+                            return
+
+                    if deadline is not None:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise RateLimitTimeout(f"Timed out waiting for {upstream} rate limit")
+                        wait = remaining if wait is None else min(wait, remaining)
+                    condition.wait(timeout=wait)
+            except BaseException:
+                if ticket in queue:
+                    queue.remove(ticket)
+                    heapq.heapify(queue)
+                    condition.notify_all()
+                raise
+
+    @contextlib.contextmanager
+    def limit(self, upstream, priority=None, tokens=1, timeout=None):
+        """Context manager form of acquire()."""
+        self.acquire(upstream, priority=priority, tokens=tokens, timeout=timeout)
+        yield
+
+    def penalize(self, upstream, retry_after=None):
+        """Pause an upstream after it told us to back off (HTTP 429)."""
+        limit = self.limits.get(upstream)
+        if limit is None:
+            return
+        try:
+            seconds = float(retry_after) if retry_after else 1.0 / max(limit.rate, 0.01)
+        except (TypeError, ValueError):
+            seconds = 1.0 / max(limit.rate, 0.01)
+        self.backend.penalize(limit, seconds)
+        with self._conditions[upstream]:
+            self._conditions[upstream].notify_all()
+
+    def stats(self):
+        """Current queue depth and quota usage for every upstream."""
+        stats = {}
+        for name, limit in self.limits.items():
+            stats[name] = {
+                "qps": limit.rate,
+                "burst": limit.burst,
+                "daily_quota": limit.daily_quota or None,
+                "used_today": self.backend.usage(limit),
+                "waiting": len(self._queues[name]),
+            }
+        return stats
@@ -0,0 +1,149 @@
+"""
+Cheap lexical relevance checks used to decide how much work a search
+result deserves before any page is fetched or summarized.
+"""
+import re
+
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    """Lowercase word tokens, dropping single characters ('j', 's', ...)"""
+    return [token for token in _TOKEN.findall((text or "").lower()) if len(token) > 1]
+
+
+def snippet_score(query, title, snippet):
+    """
+    Score a search hit from its title and snippet alone, between 0 and 1:
+    the share of query tokens that appear, plus a bonus when the whole query
+    appears verbatim (e.g. the full email address or "first last").
+
+    Example:
+        snippet_score("jordan.avery@example.com", "Jordan Avery - Profile", "Contact jordan.avery@example.com")
+        -> 1.0
+    """
+    query_tokens = set(tokenize(query))
+    if not query_tokens:
+        return 0.0
+    text = f"{title or ''} {snippet or ''}".lower()
+    overlap = len(query_tokens & set(tokenize(text))) / len(query_tokens)
+    if query.strip().lower() in text:
+        overlap += 0.25
+    return round(min(1.0, overlap), 3)
+
+
+# How much finding each applicant attribute in a page counts toward its
+# relevance (scores are capped at 1). An email is close to proof; a name
+# alone is shared by many people, so it only just clears the default threshold.
+ATTRIBUTE_WEIGHTS = {
+    "email": 1.0,
+    "email_user": 0.5,
+    "full_name": 0.4,
+    "last_name": 0.1,
+    "zip": 0.35,
+    "city": 0.25,
+}
+# Attributes that say the same thing count once toward MIN_PROFILE_ATTRIBUTES
+ATTRIBUTE_GROUPS = {
+    "email": "email",
+    "email_user": "email",
+    "full_name": "name",
+    "last_name": "name",
+    "zip": "location",
+    "city": "location",
+}
+# A profile needs this many independent attributes (email, name, location)
+# before a page missing some of them can fairly be called irrelevant
+MIN_PROFILE_ATTRIBUTES = 2
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+_QUOTED = re.compile(r'"([^"]+)"')
+
+
+class ApplicantProfile:
+    """
+    Known attributes of the person being screened, compiled into a single
+    pattern so a batch of pages is scored with one regex pass per page.
+
+    Example:
+        profile = ApplicantProfile(first_name="Jordan", last_name="Avery", city="Rockville")
+        profile.score_pages([page_text_1, page_text_2])  # -> [0.75, 0.0]
+    """
+
+    def __init__(self, first_name="", last_name="", email="", city="", zip_code=""):
+        first_name, last_name = (first_name or "").strip(), (last_name or "").strip()
+        email = (email or "").strip()
+        terms = {}  # attribute -> phrases that count as a hit
+        if email:
+            terms["email"] = [email]
+            user = email.split("@", 1)[0]
+            if len(user) >= 4:
+                terms["email_user"] = [user]
+        if first_name and last_name:
+            terms["full_name"] = [f"{first_name} {last_name}", f"{last_name}, {first_name}"]
+        if last_name:
+            terms["last_name"] = [last_name]
+        if city:
+            terms["city"] = [city.strip()]
+        if zip_code:
+            terms["zip"] = [zip_code.strip()[:5]]
+
+        self.attributes = list(terms)
+        self._pattern = None
+        if terms:
+            # One named group per attribute; lookarounds stand in for \b so
+            # phrases with punctuation (emails, "Avery, Jordan") still match
+            groups = []
+            for attribute, phrases in terms.items():
+                alternatives = "|".join(r"\s+".join(re.escape(part) for part in phrase.lower().split())
+                                        for phrase in phrases)
+                groups.append(f"(?P<{attribute}>(?<![\\w@.])(?:{alternatives})(?![\\w@]))")
+            self._pattern = re.compile("|".join(groups))
+
+    @classmethod
+    def from_request(cls, text_query=None, court_query=None, attributes=None):
+        """
+        Build a profile from the deep_search inputs. An email in the text query
+        counts as the email, and a quoted multi-word phrase without one as the
+        name, as in the queries calculate-risk sends:
+
+            '"John Smith" OR "john.smith@example.com"' -> John / Smith, john.smith@example.com
+        """
+        court_query = court_query or {}
+        attributes = attributes or {}
+        email = attributes.get("email", "")
+        if not email and text_query:
+            match = _EMAIL.search(text_query)
+            email = match.group(0) if match else ""
+        first_name = attributes.get("first_name") or court_query.get("first_name", "")
+        last_name = attributes.get("last_name") or court_query.get("last_name", "")
+        if not last_name and text_query:
+            for phrase in _QUOTED.findall(text_query):
+                words = phrase.split()
+                if len(words) >= 2 and "@" not in phrase:
+                    first_name, last_name = words[0], words[-1]
+                    break
+        return cls(
+            first_name=first_name,
+            last_name=last_name,
+            email=email,
+            city=attributes.get("city", ""),
+            zip_code=attributes.get("zip", ""),
+        )
+
+    def __bool__(self):
+        return self._pattern is not None
+
+    def scorable(self):
+        """Whether there are enough independent attributes to judge a page by"""
+        return len({ATTRIBUTE_GROUPS[a] for a in self.attributes}) >= MIN_PROFILE_ATTRIBUTES
+
+    def matches(self, text):
+        """Attributes found in one page's text"""
+        if self._pattern is None:
+            return set()
+        return {match.lastgroup for match in self._pattern.finditer((text or "").lower())}
+
+    def score_pages(self, texts):
+        """Relevance (0-1) of each page to the applicant, in input order"""
+        return [round(min(1.0, sum(ATTRIBUTE_WEIGHTS[a] for a in self.matches(text))), 3) for text in texts]
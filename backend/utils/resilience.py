@@ -0,0 +1,308 @@
+"""
+Circuit breakers and hedged requests for upstream calls.
+
+- CircuitBreaker: after CIRCUIT-FAILURE-THRESHOLD consecutive failures or
+  timeouts an upstream is "open" and calls fail fast with CircuitOpenError
+  instead of each waiting out its timeout. After CIRCUIT-RECOVERY-TIMEOUT
+  seconds one probe call is let through ("half_open"); its outcome closes
+  the breaker or opens it again.
+- HedgedCall: when a call has been running longer than a latency
+  percentile of recent calls, a second identical call is started and
+  whichever finishes first wins. Used for result page fetches, where one
+  slow host shouldn't hold up the whole request.
+
+State for both is exposed at /resilience.
+"""
+import collections
+import contextlib
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+from utils.deadline import DeadlineExceeded, current_deadline
+from utils.metrics import circuit_breaker_rejections, circuit_breaker_transitions, hedged_requests
+from utils.rate_limiter import QuotaExceededError, RateLimitTimeout
+from utils.tracing import annotate, collect_spans, log_event
+
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT-FAILURE-THRESHOLD", 5))
+CIRCUIT_RECOVERY_TIMEOUT = float(os.getenv("CIRCUIT-RECOVERY-TIMEOUT", 30))
+
+# Our own limits running out says nothing about the upstream's health
+NOT_UPSTREAM_FAILURES = (DeadlineExceeded, RateLimitTimeout, QuotaExceededError)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure breaker for one upstream.
+
+    Example:
+        breaker = CircuitBreaker("gemini")
+        with breaker.guard():
+            response = model.generate_content(prompt)
+    """
+
+    def __init__(self, name, failure_threshold=CIRCUIT_FAILURE_THRESHOLD,
+                 recovery_timeout=CIRCUIT_RECOVERY_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.last_error = None
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def _transition(self, state):
+        # Caller holds the lock
+        self.state = state
+        self.opened_at = time.monotonic() if state == OPEN else None
+        circuit_breaker_transitions.inc(upstream=self.name, state=state)
+        log_event("circuit_breaker_transition", upstream=self.name, state=state,
+                  failures=self.consecutive_failures, error=self.last_error)
+
+    def allow(self):
+        """Whether a call may go ahead now; in half-open, only one probe at a time."""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.recovery_timeout:
+                self._transition(HALF_OPEN)
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+            if self.state != CLOSED:
+                self._transition(CLOSED)
+
+    def record_failure(self, error=None):
+        with self._lock:
+            self.consecutive_failures += 1
+            self.last_error = str(error) if error is not None else None
+            self._probe_in_flight = False
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.consecutive_failures >= self.failure_threshold):
+                self._transition(OPEN)
+
+    def release(self):
+        """Give back a half-open probe slot without an outcome (the call never reached the upstream)."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    @contextlib.contextmanager
+    def guard(self):
+        """
+        Run the block as one call to the upstream.
+
+        Raises:
+            CircuitOpenError: The breaker is open; the block is not run
+        """
+        if not self.allow():
+            circuit_breaker_rejections.inc(upstream=self.name)
+            raise CircuitOpenError(f"{self.name} is unavailable (circuit open)")
+        try:
+            yield
+        except NOT_UPSTREAM_FAILURES:
+            self.release()
+            raise
+        except Exception as e:
+            # A timeout cut short by the request's own budget isn't the upstream's fault
+            if current_deadline().expired():
+                self.release()
+            else:
+                self.record_failure(e)
+            raise
+        except BaseException:
+            # e.g. GeneratorExit when a streamed response is abandoned
+            self.release()
+            raise
+        self.record_success()
+
+    def stats(self):
+        with self._lock:
+            retry_in = None
+            if self.state == OPEN:
+                retry_in = round(max(0.0, self.recovery_timeout - (time.monotonic() - self.opened_at)), 1)
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "failure_threshold": self.failure_threshold,
+                "retry_in_s": retry_in,
+                "last_error": self.last_error,
+            }
+
+
+class CircuitBreakers:
+    """One breaker per upstream, created on first use."""
+
+    def __init__(self):
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, upstream):
+        with self._lock:
+            breaker = self._breakers.get(upstream)
+            if breaker is None:
+                breaker = self._breakers[upstream] = CircuitBreaker(upstream)
+            return breaker
+
+    def guard(self, upstream):
+        return self.get(upstream).guard()
+
+    def stats(self):
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {name: breaker.stats() for name, breaker in sorted(breakers.items())}
+
+
+class HedgedCall:
+    """
+    Runs calls to one upstream, starting a backup copy when the first attempt
+    is slower than the given percentile of recent latencies. Disabled when
+    percentile is 0, and until min_samples latencies have been seen.
+
+    Every attempt's latency is recorded when it finishes, including the one
+    that lost the race; recording only winners would skew the percentile
+    toward fast responses and hedge ever earlier.
+
+    The first attempt gets its own thread, so hedging never caps how many
+    calls run at once; the caller's thread stays free to return as soon as
+    either attempt finishes. Backups run on a pool of max_workers threads,
+    and are skipped (not queued) while it is busy.
+
+    Example:
+        hedger = HedgedCall("page", percentile=95)
+        html = hedger.call(download, url)
+    """
+
+    def __init__(self, name, percentile=0, min_samples=20, window=200, max_workers=8):
+        self.name = name
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self._latencies = collections.deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._max_workers = max_workers
+        self._backup_slots = threading.BoundedSemaphore(max_workers)
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def record(self, seconds):
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def hedge_delay(self):
+        """Seconds to wait before starting the backup call, or None if hedging is off"""
+        with self._lock:
+            if not self.percentile or len(self._latencies) < self.min_samples:
+                return None
+            ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+        return ordered[index]
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self._max_workers,
+                                                    thread_name_prefix=f"hedge-{self.name}")
+            return self._executor
+
+    def _start_primary(self, fn, args):
+        future = Future()
+        ctx = contextvars.copy_context()
+
+        def run():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                future.set_result(ctx.run(self._attempt, fn, args))
+            except BaseException as e:
+                future.set_exception(e)
+
+        threading.Thread(target=run, name=f"hedge-{self.name}-primary", daemon=True).start()
+        return future
+
+    def _start_backup(self, fn, args):
+        """The backup attempt's future, or None when every backup worker is busy"""
+        if not self._backup_slots.acquire(blocking=False):
+            return None
+        # copy_context per attempt: a Context can only be entered by one thread at a time
+        future = self._pool().submit(contextvars.copy_context().run, self._attempt, fn, args)
+        future.add_done_callback(lambda _: self._backup_slots.release())
+        return future
+
+    def _attempt(self, fn, args):
+        # Each attempt collects its own spans; only the winner's reach the caller
+        with collect_spans() as spans:
+            start = time.perf_counter()
+            result = fn(*args)
+            self.record(time.perf_counter() - start)
+        spans.fields.pop("total_ms", None)
+        return result, spans.fields
+
+    def call(self, fn, *args):
+        delay = self.hedge_delay()
+        remaining = current_deadline().remaining()
+        if delay is None or (remaining is not None and remaining <= delay):
+            start = time.perf_counter()
+            result = fn(*args)
+            self.record(time.perf_counter() - start)
+            return result
+
+        attempts = [self._start_primary(fn, args)]
+        done, _ = wait(attempts, timeout=delay)
+        backup = None if done else self._start_backup(fn, args)
+        if backup is not None:
+            attempts.append(backup)
+            with self._lock:
+                self.hedged += 1
+
+        pending = set(attempts)
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    result, fields = future.result()
+                except Exception as e:
+                    error = error or e
+                    continue
+                winner = "primary" if future is attempts[0] else "hedge"
+                if len(attempts) > 1:
+                    hedged_requests.inc(upstream=self.name, winner=winner)
+                    annotate(hedged=True, hedge_winner=winner)
+                    if winner == "hedge":
+                        with self._lock:
+                            self.hedge_wins += 1
+                annotate(**fields)
+                return result
+        raise error
+
+    def stats(self):
+        delay = self.hedge_delay()
+        with self._lock:
+            return {
+                "percentile": self.percentile,
+                "samples": len(self._latencies),
+                "hedge_delay_ms": None if delay is None else round(delay * 1000, 1),
+                "hedged": self.hedged,
+                "hedge_wins": self.hedge_wins,
+            }
+
+
+circuit_breakers = CircuitBreakers()
@@ -0,0 +1,209 @@
+"""
+Admission control for the search / summarize / analyze pipeline.
+
+Each Flask request running a pipeline holds one of MAX-CONCURRENT-PIPELINES
+slots. Requests beyond that wait in a bounded queue and are admitted by:
+
+1. Priority class (X-Priority: interactive < normal < batch). The last
+   INTERACTIVE-RESERVED-SLOTS slots only go to interactive requests, so a
+   burst of batch screenings can't take every slot.
+2. Fair share between tenants (X-Tenant-Id, the database owner): within a
+   class, the tenant with the fewest pipelines running goes first.
+3. Arrival order.
+
+When the queue is full, a new request displaces the newest waiter of a lower
+class, or is rejected if there is none. Rejected or timed-out requests get
+a SchedulerRejected error, which the app turns into a 503.
+"""
+import contextlib
+import contextvars
+import itertools
+import os
+import threading
+import time
+from collections import Counter
+
+from utils.deadline import current_deadline
+from utils.metrics import scheduler_rejections, stage_duration
+from utils.rate_limiter import PRIORITY_INTERACTIVE, current_priority
+from utils.tracing import log_event, record_span
+
+
+DEFAULT_TENANT = "default"
+
+# Tenant (database owner) of the work running in the current request/thread
+_current_tenant = contextvars.ContextVar("tenant", default=DEFAULT_TENANT)
+
+
+class SchedulerRejected(Exception):
+    """Raised when a request is turned away by the queue (full or waited too long)."""
+
+    def __init__(self, message, reason):
+        super().__init__(message)
+        self.reason = reason
+
+
+def current_tenant():
+    """Tenant of the work running in the current context."""
+    return _current_tenant.get()
+
+
+@contextlib.contextmanager
+def tenant_scope(tenant):
+    """Attribute pipeline slots taken inside the block to the given tenant."""
+    token = _current_tenant.set((tenant or "").strip() or DEFAULT_TENANT)
+    try:
+        yield
+    finally:
+        _current_tenant.reset(token)
+
+
+class _Waiter:
+    __slots__ = ("priority", "tenant", "seq", "granted", "rejected")
+
+    def __init__(self, priority, tenant, seq):
+        self.priority = priority
+        self.tenant = tenant
+        self.seq = seq
+        self.granted = False
+        self.rejected = False
+
+
+class PipelineScheduler:
+    """
+    Priority- and tenant-aware concurrency limit with a bounded wait queue.
+
+    Example:
+        with priority_scope("batch"), tenant_scope("owner-42"):
+            with pipeline_scheduler.slot():
+                results = deep_search(...)
+    """
+
+    def __init__(self, slots=4, max_queue=50, reserved_interactive=1, queue_timeout=120.0):
+        self.slots = max(1, slots)
+        self.max_queue = max_queue
+        # Always leave at least one slot that any class may use
+        self.reserved_interactive = min(max(0, reserved_interactive), self.slots - 1)
+        self.queue_timeout = queue_timeout
+        self._condition = threading.Condition()
+        self._waiters = []
+        self._running = Counter()  # tenant -> pipelines running
+        self._active = 0
+        self._sequence = itertools.count()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            slots=int(os.getenv("MAX-CONCURRENT-PIPELINES", 4)),
+            max_queue=int(os.getenv("PIPELINE-QUEUE-DEPTH", 50)),
+            reserved_interactive=int(os.getenv("INTERACTIVE-RESERVED-SLOTS", 1)),
+            queue_timeout=float(os.getenv("PIPELINE-QUEUE-TIMEOUT", 120)),
+        )
+
+    def _can_run(self, priority):
+        limit = self.slots if priority <= PRIORITY_INTERACTIVE else self.slots - self.reserved_interactive
+        return self._active < limit
+
+    def _dispatch(self):
+        # Caller holds the lock: hand free slots to the best eligible waiters
+        granted = False
+        while self._waiters:
+            eligible = [w for w in self._waiters if self._can_run(w.priority)]
+            if not eligible:
+                break
+            waiter = min(eligible, key=lambda w: (w.priority, self._running[w.tenant], w.seq))
+            self._waiters.remove(waiter)
+            waiter.granted = True
+            self._active += 1
+            self._running[waiter.tenant] += 1
+            granted = True
+        if granted:
+            self._condition.notify_all()
+
+    def _reject(self, waiter, reason):
+        waiter.rejected = True
+        scheduler_rejections.inc(priority=waiter.priority, reason=reason)
+        log_event("pipeline_rejected", priority=waiter.priority, tenant=waiter.tenant, reason=reason,
+                  queued=len(self._waiters), running=self._active)
+
+    def acquire(self, priority=None, tenant=None, timeout=None):
+        """
+        Wait for a pipeline slot.
+
+        Args:
+            priority: Priority value; defaults to the current context's priority
+            tenant: Tenant id; defaults to the current context's tenant
+            timeout: Maximum seconds to queue (default PIPELINE-QUEUE-TIMEOUT,
+                     capped by the request's time budget)
+
+        Returns:
+            The tenant the slot was taken for, to pass to release()
+
+        Raises:
+            SchedulerRejected: The queue is full, or no slot came up in time
+        """
+        priority = current_priority() if priority is None else priority
+        tenant = current_tenant() if tenant is None else tenant
+        timeout = current_deadline().remaining() if timeout is None else timeout
+        timeout = self.queue_timeout if timeout is None else min(timeout, self.queue_timeout)
+        waiter = _Waiter(priority, tenant, next(self._sequence))
+        start = time.perf_counter()
+
+        with self._condition:
+            if len(self._waiters) >= self.max_queue:
+                # Shed the newest waiter of the lowest class, if it ranks below this request
+                victim = max(self._waiters, key=lambda w: (w.priority, w.seq), default=None)
+                if victim is None or victim.priority <= priority:
+                    self._reject(waiter, "queue_full")
+                    raise SchedulerRejected("Pipeline queue is full", "queue_full")
+                self._waiters.remove(victim)
+                self._reject(victim, "displaced")
+                self._condition.notify_all()
+            self._waiters.append(waiter)
+            self._dispatch()
+            self._condition.wait_for(lambda: waiter.granted or waiter.rejected, timeout=timeout)
+            if not waiter.granted:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                if not waiter.rejected:
+                    self._reject(waiter, "timeout")
+                    raise SchedulerRejected(f"No pipeline slot within {timeout:g}s", "timeout")
+                raise SchedulerRejected("Displaced from the pipeline queue by higher-priority work", "displaced")
+
+        waited = time.perf_counter() - start
+        stage_duration.observe(waited, stage="pipeline_queue_wait", priority=priority)
+        record_span("pipeline_queue_wait", waited)
+        return tenant
+
+    def release(self, tenant):
+        with self._condition:
+            self._active -= 1
+            self._running[tenant] -= 1
+            if self._running[tenant] <= 0:
+                del self._running[tenant]
+            self._dispatch()
+
+    @contextlib.contextmanager
+    def slot(self, priority=None, tenant=None, timeout=None):
+        """Hold a pipeline slot for the duration of the block."""
+        tenant = self.acquire(priority=priority, tenant=tenant, timeout=timeout)
+        try:
+            yield
+        finally:
+            self.release(tenant)
+
+    def stats(self):
+        with self._condition:
+            queued = Counter(w.priority for w in self._waiters)
+            return {
+                "slots": self.slots,
+                "reserved_interactive": self.reserved_interactive,
+                "running": self._active,
+                "running_by_tenant": dict(self._running),
+                "queued": len(self._waiters),
+                "queued_by_priority": {str(p): n for p, n in sorted(queued.items())},
+                "max_queue": self.max_queue,
+            }
+
+
+pipeline_scheduler = PipelineScheduler.from_env()
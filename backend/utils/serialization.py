@@ -0,0 +1,81 @@
+"""
+Pluggable JSON encoding for the Flask app.
+
+Deep search results and the summaries_data posted back to
+/analyze-summaries run to hundreds of KB, and the standard library encoder
+is a noticeable share of their response time. JSON-ENCODER picks the
+implementation behind jsonify(), request.get_json() and app.json:
+
+- "auto" (default): orjson when it is installed, otherwise the standard library
+- "orjson": orjson, failing at startup if it isn't installed
+- "stdlib": Flask's default provider
+
+The orjson provider keeps Flask's sorted keys and its fallbacks for dates,
+UUIDs and dataclasses. Responses differ in whitespace, and non-ASCII text is
+written as UTF-8 rather than \\u escapes (same JSON value, fewer bytes).
+"""
+import os
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+JSON_ENCODERS = ("auto", "orjson", "stdlib")
+JSON_ENCODER = os.getenv("JSON-ENCODER", "auto")
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson."""
+
+    def _dumps_bytes(self, obj):
+        # Dates and dataclasses go through Flask's default() so they encode as before
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=self.default, option=option)
+
+    def dumps(self, obj, **kwargs):
+        # Callers passing stdlib options (indent, cls, ...) get the stdlib encoder
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return self._dumps_bytes(obj).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        if self.compact is False or (self.compact is None and self._app.debug):
+            # Pretty-printed debug output: orjson only indents by 2
+            return super().response(obj)
+        return self._app.response_class(self._dumps_bytes(obj) + b"\n", mimetype=self.mimetype)
+
+
+def json_provider_class(name=None):
+    """
+    The provider class for a JSON-ENCODER name.
+
+    Raises:
+        ValueError: Unknown name, or "orjson" without orjson installed
+    """
+    name = (name or JSON_ENCODER).strip().lower()
+    if name not in JSON_ENCODERS:
+        raise ValueError(f"Unknown JSON encoder '{name}'. Choose from: {', '.join(JSON_ENCODERS)}")
+    if name == "orjson" and not ORJSON_AVAILABLE:
+        raise ValueError("JSON-ENCODER is 'orjson' but orjson is not installed")
+    if name == "stdlib" or not ORJSON_AVAILABLE:
+        return DefaultJSONProvider
+    return OrjsonProvider
+
+
+def install_json_provider(app, name=None):
+    """Use the configured JSON encoder for the app; returns the provider."""
+    app.json_provider_class = json_provider_class(name)
+    app.json = app.json_provider_class(app)
+    return app.json
@@ -0,0 +1,88 @@
+"""
+Single-flight coalescing of identical in-flight work.
+
+The first caller for a key runs the work; callers that arrive with the same
+key while it is running wait for it and get the same result (or exception)
+instead of starting their own copy. Nothing is cached once the work
+finishes; that is what the TTL caches are for.
+"""
+import threading
+
+from utils.deadline import DeadlineExceeded
+from utils.metrics import coalesced_requests
+from utils.tracing import log_event
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """
+    In-flight calls keyed by the caller.
+
+    Example:
+        flights = SingleFlight("deep_search")
+        results, shared = flights.do(key, lambda: deep_search(...))
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, timeout=None):
+        """
+        Run fn() unless a call with the same key is already running, in which
+        case wait for that call instead.
+
+        Args:
+            key: Hashable identity of the work
+            fn: Zero-argument callable doing the work
+            timeout: Seconds a follower waits for the running call (None waits indefinitely)
+
+        Returns:
+            (result, shared): shared is True when the result came from another caller's run
+
+        Raises:
+            DeadlineExceeded: A follower gave up waiting after timeout seconds
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                flight.followers += 1
+
+        if leader:
+            try:
+                flight.result = fn()
+                return flight.result, False
+            except BaseException as e:
+                flight.error = e
+                raise
+            finally:
+                with self._lock:
+                    del self._flights[key]
+                if flight.followers:
+                    log_event("coalesced", operation=self.name, followers=flight.followers)
+                flight.done.set()
+
+        coalesced_requests.inc(operation=self.name)
+        if not flight.done.wait(timeout):
+            raise DeadlineExceeded(f"Timed out waiting for an identical in-flight {self.name}")
+        if flight.error is not None:
+            raise flight.error
+        return flight.result, True
+
+    def stats(self):
+        with self._lock:
+            return {
+                "in_flight": len(self._flights),
+                "waiting": sum(flight.followers for flight in self._flights.values()),
+            }
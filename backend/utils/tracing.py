@@ -0,0 +1,128 @@
+"""
+Request ids, structured JSON logging and per-request timing breakdowns.
+
+Every request gets an id (taken from the X-Request-Id header or generated)
+that is attached to each log line. Stage timings recorded with
+metrics.timed() are also collected into the active span collector, which is
+how deep_search builds its per-link debug section.
+"""
+import contextlib
+import contextvars
+import datetime
+import json
+import logging
+import os
+import sys
+import time
+import uuid
+
+
+_request_id = contextvars.ContextVar("request_id", default=None)
+_collector = contextvars.ContextVar("span_collector", default=None)
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats each record as a single JSON object per line."""
+
+    def format(self, record):
+        payload = {
+            "ts": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(),
+            "level": record.levelname.lower(),
+            "event": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+        }
+        payload.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            payload["exception"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+logger = logging.getLogger("bouncer")
+if not logger.handlers:
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(JsonFormatter())
+    logger.addHandler(_handler)
+    logger.setLevel(os.getenv("LOG-LEVEL", "INFO").upper())
+    logger.propagate = False
+
+
+def new_request_id():
+    return uuid.uuid4().hex[:16]
+
+
+def current_request_id():
+    return _request_id.get()
+
+
+def bind_request_id(request_id=None):
+    """Bind a request id to the current context; returns a token for unbind_request_id()."""
+    return _request_id.set(request_id or new_request_id())
+
+
+def unbind_request_id(token):
+    _request_id.reset(token)
+
+
+@contextlib.contextmanager
+def request_scope(request_id=None):
+    """Bind a request id to everything logged inside the block."""
+    token = bind_request_id(request_id)
+    try:
+        yield _request_id.get()
+    finally:
+        unbind_request_id(token)
+
+
+def log_event(event, level=logging.INFO, **fields):
+    """
+    Write one structured log line.
+
+    Example:
+        log_event("text_search_done", results=10)
+    """
+    logger.log(level, event, extra={"fields": fields, "request_id": current_request_id()})
+
+
+class SpanCollector:
+    """Accumulates stage durations (ms) and extra fields for one unit of work."""
+
+    def __init__(self):
+        self.fields = {}
+
+    def add_span(self, stage, seconds):
+        key = f"{stage}_ms"
+        self.fields[key] = round(self.fields.get(key, 0) + seconds * 1000, 1)
+
+    def annotate(self, **fields):
+        self.fields.update(fields)
+
+
+@contextlib.contextmanager
+def collect_spans(collector=None):
+    """
+    Collect the spans recorded inside the block into a SpanCollector.
+    Pass an existing collector to resume it; its total_ms accumulates.
+    """
+    collector = collector or SpanCollector()
+    token = _collector.set(collector)
+    start = time.perf_counter()
+    try:
+        yield collector
+    finally:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        collector.fields["total_ms"] = round(collector.fields.get("total_ms", 0) + elapsed_ms, 1)
+        _collector.reset(token)
+
+
+def record_span(stage, seconds):
+    """Called by metrics.timed(); adds the span to the active collector, if any."""
+    collector = _collector.get()
+    if collector is not None:
+        collector.add_span(stage, seconds)
+
+
+def annotate(**fields):
+    """Attach fields (bytes, cache status, ...) to the active collector, if any."""
+    collector = _collector.get()
+    if collector is not None:
+        collector.annotate(**fields)
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the Maryland Judiciary Case Search scraper.
+
+By default the scraper is pointed at a local stand-in of the case search
+site that serves the saved pages in fixtures/maryland/, so results are
+repeatable and the court site is not hit. Pass --live to use the real site.
+
+Usage:
+  python bench_scrape_maryland.py modes --searches 5
+  python bench_scrape_maryland.py modes --modes requests --live --rate 6
+  python bench_scrape_maryland.py parse --iterations 200
+  python bench_scrape_maryland.py parse --pages saved/*.html
+  python bench_scrape_maryland.py details --workers 1,2,4 --rate 120
+"""
+import argparse
+import contextlib
+import glob
+import io
+import os
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urljoin, urlparse
+
+from bs4 import BeautifulSoup
+
+from scrape_maryland import SELENIUM_AVAILABLE, MODE_REQUESTS, MODE_SELENIUM, MarylandCourtScraper
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "maryland")
+SAMPLE_NAMES = [("John", "Smith"), ("Michael", "Smith"), ("David", "Smith"), ("James", "Smith"), ("Robert", "Smith")]
+
+
+def load_fixture(name: str) -> bytes:
+    with open(os.path.join(FIXTURES_DIR, name), "rb") as f:
+        return f.read()
+
+
+class _CourtSiteHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, body: bytes, status: int = 200):
+        time.sleep(self.latency)
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Set-Cookie", "JSESSIONID=bench; Path=/casesearch")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if url.path.endswith("inquiryDetail.jis"):
+            case_id = query.get("caseId", [""])[0]
+            self._send(load_fixture("case_detail.html").replace(b"{case_id}", case_id.encode("utf-8")))
+        elif url.path.endswith("inquirySearch.jis") and "d-16544-p" in query:
+            page = query["d-16544-p"][0]
+            self._send(load_fixture(f"results_page{page}.html"))
+        elif url.path.endswith("inquirySearch.jis"):
+            self._send(load_fixture("inquiry_form.html"))
+        else:
+            self._send(b"not found", status=404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        form = parse_qs(self.rfile.read(length).decode("utf-8"))
+        if form.get("lastName", [""])[0].upper() == "ZZYZXQ":
+            self._send(load_fixture("no_records.html"))
+        else:
+            self._send(load_fixture("results_page1.html"))
+
+
+class LocalCourtSite:
+    """Stand-in for casesearch.courts.state.md.us on 127.0.0.1."""
+
+    def __init__(self, latency: float = 0.05):
+        handler = type("CourtSiteHandler", (_CourtSiteHandler,), {"latency": latency})
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def process_tree_rss_mb(pid: int = None) -> float:
+    """RSS of a process plus all its descendants (e.g. chromedriver + Chrome), in MB"""
+    pid = pid or os.getpid()
+    children = {}
+    rss = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            with open(f"/proc/{entry}/status", "r") as f:
+                kb = next((int(line.split()[1]) for line in f if line.startswith("VmRSS:")), 0)
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+        rss[int(entry)] = kb
+
+    total, stack = 0, [pid]
+    while stack:
+        current = stack.pop()
+        total += rss.get(current, 0)
+        stack.extend(children.get(current, []))
+    return round(total / 1024.0, 1)
+
+
+def bench_mode(mode: str, base_url: str, searches: int, human_delays: bool, rate: float) -> dict:
+    """Start a scraper in one mode, run a few searches and record cost"""
+    rss_before = process_tree_rss_mb()
+    start = time.perf_counter()
+    scraper = MarylandCourtScraper(
+        use_selenium=mode == MODE_SELENIUM,
+        headless=True,
+        human_delays=human_delays,
+        min_request_interval=60.0 / rate if rate else 0.0,
+        form_state_ttl=15 * 60,
+        base_url=base_url
+    )
+    try:
+        if not scraper.ensure_form_state():
+            raise RuntimeError(f"{mode}: could not load the search form")
+        startup = time.perf_counter() - start
+        peak_rss = process_tree_rss_mb()
+
+        latencies, rows = [], 0
+        for i in range(searches):
+            first, last = SAMPLE_NAMES[i % len(SAMPLE_NAMES)]
+            t = time.perf_counter()
+            results = scraper.search_by_name(first, last)
+            latencies.append(time.perf_counter() - t)
+            rows += len(results or [])
+            peak_rss = max(peak_rss, process_tree_rss_mb())
+    finally:
+        if scraper.driver:
+            scraper.driver.quit()
+            scraper.driver = None
+
+    return {
+        "mode": mode,
+        "startup_s": startup,
+        "search_median_s": statistics.median(latencies) if latencies else None,
+        "search_max_s": max(latencies) if latencies else None,
+        "rows": rows,
+        "rss_added_mb": round(peak_rss - rss_before, 1),
+    }
+
+
+def parse_with_bs4(html_content: bytes, page_url: str) -> list:
+    """The previous BeautifulSoup parser (minus prints), kept as the baseline; links resolve against page_url"""
+    soup = BeautifulSoup(html_content, 'html.parser')
+    results = []
+    if soup.find('div', class_='bd-callout-danger') or "No records found" in soup.get_text():
+        return results
+    results_table = soup.find('table', class_='results') or soup.find('table', id='row')
+    if not results_table:
+        return results
+    soup.find('div', class_='criteria')
+    soup.find('span', class_='pagebanner')
+    tbody = results_table.find('tbody')
+    rows = tbody.find_all('tr') if tbody else results_table.find_all('tr')[1:]
+    for row in rows:
+        cells = row.find_all('td')
+        if len(cells) >= 9:
+            case_info = {}
+            link = cells[0].find('a')
+            if link:
+                case_info['case_number'] = link.get_text().strip()
+                case_info['detail_url'] = urljoin(page_url, link.get('href'))
+            else:
+                case_info['case_number'] = cells[0].get_text().strip()
+            for key, cell in zip(('name', 'date_of_birth', 'party_type', 'court', 'case_type',
+                                  'case_status', 'filing_date', 'case_caption'), cells[1:9]):
+                case_info[key] = cell.get_text().strip()
+            results.append(case_info)
+    return results
+
+
+def cmd_parse(args):
+    paths = args.pages or sorted(glob.glob(os.path.join(FIXTURES_DIR, "results_page*.html")))
+    if not paths:
+        raise SystemExit("No result pages to parse")
+    pages = []
+    for path in paths:
+        with open(path, "rb") as f:
+            pages.append(f.read())
+
+    base_url = "https://casesearch.courts.state.md.us"
+    scraper = MarylandCourtScraper(use_selenium=False, human_delays=False, base_url=base_url)
+
+    def parse_lxml(html_content, _page_url):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return scraper.parse_search_results(html_content)
+
+    parsers = [("bs4", parse_with_bs4), ("lxml", parse_lxml)]
+    # Result links resolve against the search page URL, as in MarylandCourtScraper.parse_search_results
+    outputs = {name: [parse(page, scraper.search_url) for page in pages] for name, parse in parsers}
+    if outputs["bs4"] != outputs["lxml"]:
+        print("warning: the lxml and bs4 parsers disagree on these pages")
+
+    print(f"{len(pages)} page(s), {sum(len(r) for r in outputs['lxml'])} rows per pass, "
+          f"{args.iterations} passes\n")
+    print(f"{'parser':<8} {'rows/sec':>12} {'ms/page':>10} {'speedup':>8}")
+    baseline = None
+    for name, parse in parsers:
+        rows = 0
+        start = time.perf_counter()
+        for _ in range(args.iterations):
+            for page in pages:
+                rows += len(parse(page, scraper.search_url))
+        elapsed = time.perf_counter() - start
+        rate = rows / elapsed if elapsed else 0.0
+        baseline = baseline or rate
+        print(f"{name:<8} {rate:>12,.0f} {elapsed * 1000 / (args.iterations * len(pages)):>10.2f} "
+              f"{rate / baseline:>7.1f}x")
+
+
+def cmd_details(args):
+    """Time fetching every case detail page of a search at several worker counts"""
+    with LocalCourtSite(latency=args.site_latency) as site:
+        lister = MarylandCourtScraper(use_selenium=False, human_delays=False, form_state_ttl=15 * 60,
+                                      base_url=site.url)
+        with contextlib.redirect_stdout(io.StringIO()):
+            urls = [row["detail_url"] for row in lister.search_by_name("John", "Smith") or []]
+        if not urls:
+            raise SystemExit("The stand-in search returned no detail URLs")
+
+        print(f"{len(urls)} detail pages, {args.rate or 'unlimited'} requests/min\n")
+        print(f"{'workers':>8} {'cold s':>8} {'pages/s':>8} {'cached s':>9} {'parsed':>7}")
+        for workers in (int(w) for w in args.workers.split(",")):
+            scraper = MarylandCourtScraper(
+                use_selenium=False,
+                human_delays=False,
+                min_request_interval=60.0 / args.rate if args.rate else 0.0,
+                base_url=site.url,
+                detail_workers=workers
+            )
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                details = scraper.get_case_details_batch(urls)
+                cold = time.perf_counter() - start
+                start = time.perf_counter()
+                scraper.get_case_details_batch(urls)
+                warm = time.perf_counter() - start
+            parsed = sum(1 for d in details.values() if d and d.charges and d.events)
+            print(f"{workers:>8} {cold:>8.2f} {len(urls) / cold:>8.1f} {warm:>9.4f} {parsed:>7}")
+
+
+def cmd_modes(args):
+    if args.live and not args.rate:
+        args.rate = 6.0  # stay polite toward the real site
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    if MODE_SELENIUM in modes and not SELENIUM_AVAILABLE:
+        print("Selenium is not installed; skipping selenium mode")
+        modes.remove(MODE_SELENIUM)
+
+    def run(base_url):
+        results = []
+        for mode in modes:
+            try:
+                results.append(bench_mode(mode, base_url, args.searches, args.human_delays, args.rate))
+            except Exception as e:
+                print(f"{mode} mode failed: {e}")
+        return results
+
+    if args.live:
+        results = run("https://casesearch.courts.state.md.us")
+    else:
+        with LocalCourtSite(latency=args.site_latency) as site:
+            results = run(site.url)
+
+    print(f"\n{'mode':<10} {'startup s':>10} {'median search s':>16} {'max search s':>13} {'rows':>6} {'RSS added MB':>13}")
+    for r in results:
+        print(f"{r['mode']:<10} {r['startup_s']:>10.2f} {r['search_median_s']:>16.3f} "
+              f"{r['search_max_s']:>13.3f} {r['rows']:>6} {r['rss_added_mb']:>13.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maryland case search scraper benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    modes = sub.add_parser("modes", help="Compare startup, search latency and memory of requests vs Selenium mode")
+    modes.add_argument("--modes", default=f"{MODE_REQUESTS},{MODE_SELENIUM}", help="Comma-separated modes to compare")
+    modes.add_argument("--searches", type=int, default=5, help="Searches per mode (default: 5)")
+    modes.add_argument("--human-delays", action="store_true", help="Keep human-like typing/reading delays")
+    modes.add_argument("--rate", type=float, default=0.0, help="Max requests per minute (default: unthrottled offline)")
+    modes.add_argument("--live", action="store_true", help="Use the real court site instead of the local stand-in")
+    modes.add_argument("--site-latency", type=float, default=0.05, help="Stand-in response latency in seconds")
+    modes.set_defaults(func=cmd_modes)
+
+    parse = sub.add_parser("parse", help="Rows/sec of the results page parser vs the old BeautifulSoup one")
+    parse.add_argument("--pages", nargs="*", help="Saved results pages (default: fixtures/maryland/results_page*.html)")
+    parse.add_argument("--iterations", type=int, default=100, help="Passes over the pages per parser (default: 100)")
+    parse.set_defaults(func=cmd_parse)
+
+    details = sub.add_parser("details", help="Batch case detail fetching at several worker counts")
+    details.add_argument("--workers", default="1,2,4", help="Comma-separated worker counts (default: 1,2,4)")
+    details.add_argument("--rate", type=float, default=0.0, help="Max requests per minute (default: unthrottled)")
+    details.add_argument("--site-latency", type=float, default=0.2, help="Stand-in response latency in seconds")
+    details.set_defaults(func=cmd_details)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
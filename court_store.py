@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Local SQLite store for Maryland case search results.
+
+Parsed case rows and case details are upserted as they come back from the
+court site, indexed by normalized name, date of birth and case number, with
+full-text search over case captions. A name search that was run within the
+TTL is answered from the store; only stale or unseen searches go upstream.
+"""
+
+import json
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+
+DEFAULT_TTL = 7 * 24 * 60 * 60  # one week
+
+CASE_COLUMNS = ('case_number', 'name', 'date_of_birth', 'party_type', 'court',
+                'case_type', 'case_status', 'filing_date', 'case_caption', 'detail_url')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cases (
+    id INTEGER PRIMARY KEY,
+    case_number TEXT NOT NULL,
+    name TEXT NOT NULL,
+    name_norm TEXT NOT NULL,
+    date_of_birth TEXT,
+    party_type TEXT,
+    court TEXT,
+    case_type TEXT,
+    case_status TEXT,
+    filing_date TEXT,
+    case_caption TEXT,
+    detail_url TEXT,
+    updated_at REAL NOT NULL,
+    UNIQUE (case_number, name_norm)
+);
+CREATE INDEX IF NOT EXISTS cases_name_norm ON cases (name_norm);
+CREATE INDEX IF NOT EXISTS cases_date_of_birth ON cases (date_of_birth);
+CREATE INDEX IF NOT EXISTS cases_case_number ON cases (case_number);
+
+CREATE TABLE IF NOT EXISTS searches (
+    query_key TEXT PRIMARY KEY,
+    searched_at REAL NOT NULL,
+    result_count INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS search_cases (
+    query_key TEXT NOT NULL,
+    case_id INTEGER NOT NULL REFERENCES cases (id),
+    position INTEGER NOT NULL,
+    PRIMARY KEY (query_key, case_id)
+);
+
+CREATE TABLE IF NOT EXISTS case_details (
+    case_number TEXT PRIMARY KEY,
+    url TEXT,
+    details_json TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+);
+"""
+
+# Kept in sync with cases.case_caption by triggers (external-content FTS5 table)
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS cases_fts USING fts5(
+    case_caption, content='cases', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS cases_fts_insert AFTER INSERT ON cases BEGIN
+    INSERT INTO cases_fts (rowid, case_caption) VALUES (new.id, new.case_caption);
+END;
+CREATE TRIGGER IF NOT EXISTS cases_fts_delete AFTER DELETE ON cases BEGIN
+    INSERT INTO cases_fts (cases_fts, rowid, case_caption) VALUES ('delete', old.id, old.case_caption);
+END;
+CREATE TRIGGER IF NOT EXISTS cases_fts_update AFTER UPDATE OF case_caption ON cases BEGIN
+    INSERT INTO cases_fts (cases_fts, rowid, case_caption) VALUES ('delete', old.id, old.case_caption);
+    INSERT INTO cases_fts (rowid, case_caption) VALUES (new.id, new.case_caption);
+END;
+"""
+
+
+def normalize_name(name: str) -> str:
+    """'Smith,  John B.' -> 'SMITH JOHN B' (the results table lists 'LAST, FIRST M')"""
+    return " ".join(re.sub(r"[^A-Z0-9 ]", " ", (name or "").upper()).split())
+
+
+def search_key(first_name: str, last_name: str, middle_name: str = "", county: str = "") -> str:
+    """Stable key for one name search"""
+    return "|".join(normalize_name(part) for part in (last_name, first_name, middle_name, county))
+
+
+class CourtCaseStore:
+    """
+    SQLite-backed store of case rows and details.
+
+    Example:
+        store = CourtCaseStore("court_cases.db")
+        results = store.lookup("John", "Smith")
+        if results is None:
+            results = scraper.search_by_name("John", "Smith")
+            store.record_search("John", "Smith", results=results)
+    """
+
+    def __init__(self, path: str = "court_cases.db", ttl: float = DEFAULT_TTL):
+        """
+        Args:
+            path: SQLite database file (":memory:" for a throwaway store)
+            ttl: Seconds a stored search or case detail counts as fresh
+        """
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.executescript(SCHEMA)
+            try:
+                self._conn.executescript(FTS_SCHEMA)
+                self.has_fts = True
+            except sqlite3.OperationalError:
+                # SQLite built without FTS5; caption search falls back to LIKE
+                self.has_fts = False
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _is_fresh(self, timestamp: Optional[float]) -> bool:
+        return timestamp is not None and time.time() - timestamp <= self.ttl
+
+    # Name searches
+
+    def lookup(self, first_name: str, last_name: str, middle_name: str = "",
+               county: str = "") -> Optional[List[Dict]]:
+        """
+        Case rows from the last time this exact search ran, or None if it has
+        never run or is older than the TTL (i.e. it needs to go upstream).
+        """
+        key = search_key(first_name, last_name, middle_name, county)
+        with self._lock:
+            search = self._conn.execute(
+                "SELECT searched_at FROM searches WHERE query_key = ?", (key,)).fetchone()
+            if search is None or not self._is_fresh(search["searched_at"]):
+                return None
+            rows = self._conn.execute(
+                f"SELECT {', '.join(CASE_COLUMNS)} FROM search_cases JOIN cases ON cases.id = search_cases.case_id "
+                "WHERE query_key = ? ORDER BY position", (key,)).fetchall()
+        return [_row_to_case(row) for row in rows]
+
+    def record_search(self, first_name: str, last_name: str, middle_name: str = "",
+                      county: str = "", results: Iterable[Dict] = ()):
+        """Upsert the case rows of a completed search and mark the search fresh"""
+        key = search_key(first_name, last_name, middle_name, county)
+        now = time.time()
+        with self._lock, self._conn:
+            case_ids = [self._upsert_case(case, now) for case in results]
+            self._conn.execute("DELETE FROM search_cases WHERE query_key = ?", (key,))
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO search_cases (query_key, case_id, position) VALUES (?, ?, ?)",
+                [(key, case_id, position) for position, case_id in enumerate(case_ids)])
+            self._conn.execute(
+                "INSERT INTO searches (query_key, searched_at, result_count) VALUES (?, ?, ?) "
+                "ON CONFLICT (query_key) DO UPDATE SET searched_at = excluded.searched_at, "
+                "result_count = excluded.result_count",
+                (key, now, len(case_ids)))
+
+    def upsert_cases(self, results: Iterable[Dict]) -> int:
+        """Upsert case rows that did not come from a tracked name search"""
+        now = time.time()
+        with self._lock, self._conn:
+            return len([self._upsert_case(case, now) for case in results])
+
+    def _upsert_case(self, case: Dict, now: float) -> int:
+        values = {column: case.get(column, "") or "" for column in CASE_COLUMNS}
+        values["name_norm"] = normalize_name(values["name"])
+        values["updated_at"] = now
+        columns = list(values)
+        self._conn.execute(
+            f"INSERT INTO cases ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)}) "
+            "ON CONFLICT (case_number, name_norm) DO UPDATE SET "
+            + ", ".join(f"{c} = excluded.{c}" for c in columns if c not in ("case_number", "name_norm")),
+            [values[c] for c in columns])
+        # Looked up rather than RETURNING, which needs SQLite 3.35+
+        return self._conn.execute(
+            "SELECT id FROM cases WHERE case_number = ? AND name_norm = ?",
+            (values["case_number"], values["name_norm"])).fetchone()[0]
+
+    # Indexed queries over everything stored
+
+    def cases_by_name(self, last_name: str, first_name: str = "") -> List[Dict]:
+        """Stored rows whose name starts with 'LAST FIRST' (prefix match on the index)"""
+        prefix = normalize_name(f"{last_name} {first_name}")
+        if not prefix:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(CASE_COLUMNS)} FROM cases WHERE name_norm >= ? AND name_norm < ? "
+                "ORDER BY name_norm, case_number", (prefix, prefix + "\uffff")).fetchall()
+        return [_row_to_case(row) for row in rows]
+
+    def cases_by_date_of_birth(self, date_of_birth: str) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(CASE_COLUMNS)} FROM cases WHERE date_of_birth = ? ORDER BY case_number",
+                (date_of_birth,)).fetchall()
+        return [_row_to_case(row) for row in rows]
+
+    def cases_by_number(self, case_number: str) -> List[Dict]:
+        """Every stored party row of one case"""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(CASE_COLUMNS)} FROM cases WHERE case_number = ?", (case_number,)).fetchall()
+        return [_row_to_case(row) for row in rows]
+
+    def search_captions(self, query: str, limit: int = 50) -> List[Dict]:
+        """
+        Full-text search over case captions.
+
+        Example:
+            store.search_captions('"harbor view" apartments')
+        """
+        with self._lock:
+            if self.has_fts:
+                rows = self._conn.execute(
+                    f"SELECT {', '.join('cases.' + c for c in CASE_COLUMNS)} FROM cases_fts "
+                    "JOIN cases ON cases.id = cases_fts.rowid WHERE cases_fts MATCH ? ORDER BY rank LIMIT ?",
+                    (query, limit)).fetchall()
+            else:
+                rows = self._conn.execute(
+                    f"SELECT {', '.join(CASE_COLUMNS)} FROM cases WHERE case_caption LIKE ? LIMIT ?",
+                    (f"%{query.strip(chr(34))}%", limit)).fetchall()
+        return [_row_to_case(row) for row in rows]
+
+    # Case details
+
+    def get_details(self, case_number: str) -> Optional[Dict]:
+        """Stored case details (as CaseDetails.to_dict()), or None if missing or stale"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT details_json, fetched_at FROM case_details WHERE case_number = ?",
+                (case_number,)).fetchone()
+        if row is None or not self._is_fresh(row["fetched_at"]):
+            return None
+        return json.loads(row["details_json"])
+
+    def save_details(self, case_number: str, details: Dict):
+        """Upsert one case's details (a CaseDetails.to_dict())"""
+        fetched_at = details.get("fetched_at") or time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO case_details (case_number, url, details_json, fetched_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (case_number) DO UPDATE SET url = excluded.url, "
+                "details_json = excluded.details_json, fetched_at = excluded.fetched_at",
+                (case_number, details.get("url", ""), json.dumps(details), fetched_at))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counts = {
+                table: self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in ("cases", "searches", "case_details")
+            }
+            stale = self._conn.execute(
+                "SELECT COUNT(*) FROM searches WHERE searched_at < ?", (time.time() - self.ttl,)).fetchone()[0]
+        counts["stale_searches"] = stale
+        return counts
+
+
+def _row_to_case(row: sqlite3.Row) -> Dict:
+    case = {column: row[column] for column in CASE_COLUMNS}
+    if not case["detail_url"]:
+        del case["detail_url"]
+    return case
@@ -5,43 +5,333 @@ A human-like web scraper that searches for court cases by first and last name.
 """
 
 import requests
+from requests.adapters import DEFAULT_POOLSIZE, HTTPAdapter
 from bs4 import BeautifulSoup
+import lxml.html
+from lxml import etree
+import os
+import threading
 import time
 import random
 import re
 from urllib.parse import urljoin
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Generator, Iterable, Iterator, List, Optional, Tuple
 import json
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.action_chains import ActionChains
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.chrome.service import Service
+import argparse
+import csv
+import sys
 import base64
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+
+from court_store import CourtCaseStore
+
+# Selenium is only needed for browser mode; the requests fast path works without it
+try:
+    from selenium import webdriver
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.common.action_chains import ActionChains
+    from selenium.common.exceptions import TimeoutException, NoSuchElementException
+    from webdriver_manager.chrome import ChromeDriverManager
+    from selenium.webdriver.chrome.service import Service
+    SELENIUM_AVAILABLE = True
+except ImportError:
+    SELENIUM_AVAILABLE = False
+
+try:
+    import brotli  # noqa: F401  (lets requests decode 'br' responses)
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    ACCEPT_ENCODING = 'gzip, deflate'
+
+MODE_SELENIUM = "selenium"
+MODE_REQUESTS = "requests"
+DETAIL_CACHE_MAX_ENTRIES = 1000
+
+# Results page selectors, compiled once. The table is class="results" on
+# current pages and id="row" on older ones; header rows only have <th> cells.
+_HAS_CLASS = "contains(concat(' ', normalize-space(@class), ' '), ' {} ')"
+_ERROR_CALLOUT = etree.XPath(f"//div[{_HAS_CLASS.format('bd-callout-danger')}]")
+_RESULTS_TABLE = etree.XPath(f"//table[{_HAS_CLASS.format('results')}]")
+_RESULTS_TABLE_FALLBACK = etree.XPath("//table[@id='row']")
+_CASE_ROWS = etree.XPath("./tbody/tr[td] | ./tr[td]")
+_CRITERIA_TEXT = etree.XPath(f"string(//div[{_HAS_CLASS.format('criteria')}])")
+_PAGE_BANNER_TEXT = etree.XPath(f"string(//span[{_HAS_CLASS.format('pagebanner')}])")
+_NEXT_PAGE_HREF = etree.XPath(f"string(//span[{_HAS_CLASS.format('pagelinks')}]//a[normalize-space()='Next']/@href)")
+
+RESULT_COLUMNS = ('case_number', 'name', 'date_of_birth', 'party_type', 'court',
+                  'case_type', 'case_status', 'filing_date', 'case_caption')
+
+
+def parse_html(html_content: bytes):
+    """Parse a page into an lxml document, or None if it is empty/unparseable"""
+    try:
+        return lxml.html.document_fromstring(html_content)
+    except (etree.ParserError, ValueError):
+        return None
+
+
+def find_results_table(doc):
+    """The case results table of a parsed results page, or None"""
+    tables = _RESULTS_TABLE(doc) or _RESULTS_TABLE_FALLBACK(doc)
+    return tables[0] if tables else None
+
+
+# Case detail pages are blocks of "Prompt:" / "Value" spans under <h5>/<h6>
+# section headings, plus header-row tables for the event history
+_DETAIL_NODES = etree.XPath("//h5 | //h6 | //tr")
+_DETAIL_SPANS = etree.XPath(".//span[contains(@class, 'Prompt') or contains(@class, 'Value')]")
+_PARTY_SECTION_WORDS = ('plaintiff', 'defendant', 'respondent', 'petitioner', 'party', 'attorney', 'complainant')
+
+
+@dataclass
+class CaseParty:
+    role: str
+    name: str
+    address: str = ""
+    fields: Dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class CaseCharge:
+    number: str
+    description: str
+    statute: str = ""
+    disposition: str = ""
+    disposition_date: str = ""
+    fields: Dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class CaseEvent:
+    date: str
+    event_type: str
+    description: str = ""
+    fields: Dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class CaseDetails:
+    """
+    Parsed case detail page. `sections` keeps every record under its page
+    heading, so fields the typed lists do not model are still available.
+    """
+    url: str
+    case_number: str
+    case_info: Dict[str, str]
+    parties: List[CaseParty]
+    charges: List[CaseCharge]
+    events: List[CaseEvent]
+    sections: Dict[str, List[Dict[str, str]]]
+    fetched_at: float = 0.0
+    
+    def to_dict(self) -> Dict:
+        return asdict(self)
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'CaseDetails':
+        return cls(
+            url=data.get('url', ''),
+            case_number=data.get('case_number', ''),
+            case_info=data.get('case_info', {}),
+            parties=[CaseParty(**party) for party in data.get('parties', [])],
+            charges=[CaseCharge(**charge) for charge in data.get('charges', [])],
+            events=[CaseEvent(**event) for event in data.get('events', [])],
+            sections=data.get('sections', {}),
+            fetched_at=data.get('fetched_at', 0.0)
+        )
+
+
+def _detail_sections(doc) -> Dict[str, List[Dict[str, str]]]:
+    """
+    Group a detail page into {heading: [record, ...]}. A record is one set of
+    label/value pairs; a label repeating within a section starts a new record
+    (second defendant, next charge), so nothing is overwritten.
+    """
+    sections = {}
+    records, headers = sections.setdefault("Case", []), None
+    for node in _DETAIL_NODES(doc):
+        if node.tag in ('h5', 'h6'):
+            heading = " ".join(node.text_content().split())
+            records, headers = sections.setdefault(heading, []), None
+            continue
+        
+        header_cells = node.findall('th')
+        if header_cells:
+            headers = [cell.text_content().strip() for cell in header_cells]
+            continue
+        
+        pairs, label = [], None
+        for span in _DETAIL_SPANS(node):
+            text = span.text_content().strip()
+            if 'Prompt' in span.get('class', ''):
+                label = text.rstrip(':').strip()
+            elif label:
+                pairs.append((label, text))
+                label = None
+        if not pairs:
+            cells = [cell.text_content().strip() for cell in node.findall('td')]
+            if headers and len(cells) == len(headers):
+                records.append(dict(zip(headers, cells)))
+                continue
+            if len(cells) == 2 and cells[0]:
+                pairs = [(cells[0].rstrip(':').strip(), cells[1])]
+        
+        for label, value in pairs:
+            if not records or label in records[-1]:
+                records.append({})
+            records[-1][label] = value
+    return {heading: records for heading, records in sections.items() if records}
+
+
+def parse_case_details(html_content: bytes, url: str = "") -> Optional[CaseDetails]:
+    """Parse a case detail page into parties, charges and events"""
+    doc = parse_html(html_content)
+    if doc is None:
+        return None
+    sections = _detail_sections(doc)
+    
+    case_info, parties, charges, events = {}, [], [], []
+    for heading, records in sections.items():
+        lowered = heading.lower()
+        if 'charge' in lowered:
+            charges.extend(CaseCharge(
+                number=r.get('Charge No', ''),
+                description=r.get('Charge Description', r.get('Description', '')),
+                statute=r.get('Statute Code', r.get('Statute', '')),
+                disposition=r.get('Disposition', ''),
+                disposition_date=r.get('Disposition Date', ''),
+                fields=r
+            ) for r in records)
+        elif 'event' in lowered or 'docket' in lowered:
+            events.extend(CaseEvent(
+                date=r.get('Date', r.get('Event Date', '')),
+                event_type=r.get('Event Type', r.get('Event', '')),
+                description=r.get('Comment', r.get('Description', '')),
+                fields=r
+            ) for r in records)
+        elif any(word in lowered for word in _PARTY_SECTION_WORDS):
+            parties.extend(CaseParty(
+                role=r.get('Party Type') or heading,
+                name=r.get('Name', ''),
+                address=", ".join(r[key] for key in ('Address', 'City', 'State', 'Zip Code') if r.get(key)),
+                fields=r
+            ) for r in records)
+        else:
+            for record in records:
+                for key, value in record.items():
+                    case_info.setdefault(key, value)
+    
+    return CaseDetails(
+        url=url,
+        case_number=case_info.get('Case Number', ''),
+        case_info=case_info,
+        parties=parties,
+        charges=charges,
+        events=events,
+        sections=sections
+    )
+
+
+def next_page_url(doc, page_url: str) -> Optional[str]:
+    """Absolute URL of the results page after this one, or None on the last page"""
+    href = _NEXT_PAGE_HREF(doc).strip()
+    return urljoin(page_url, href) if href else None
+
+
+def iter_case_rows(results_table, page_url: str) -> Iterator[Dict]:
+    """Yield one dict per case row, reading the nine columns in a single pass"""
+    for row in _CASE_ROWS(results_table):
+        cells = row.findall('td')
+        if len(cells) < len(RESULT_COLUMNS):
+            continue
+        case_info = {column: cell.text_content().strip() for column, cell in zip(RESULT_COLUMNS, cells)}
+        # Column 0 links to the case detail page
+        link = cells[0].find('.//a')
+        if link is not None:
+            case_info['case_number'] = link.text_content().strip()
+            case_info['detail_url'] = urljoin(page_url, link.get('href'))
+        yield case_info
 
 class MarylandCourtScraper:
-    def __init__(self, use_selenium=True, headless=False):
+    def __init__(self, use_selenium=True, headless=False,
+                 min_request_interval: float = 0.0,
+                 form_state_ttl: Optional[float] = None,
+                 human_delays: bool = True,
+                 base_url: str = "https://casesearch.courts.state.md.us",
+                 debug_dir: Optional[str] = None,
+                 detail_workers: int = 2,
+                 detail_cache_ttl: Optional[float] = 24 * 60 * 60):
+        """
+        Args:
+            use_selenium: Default mode; drive a real browser instead of a requests session
+            headless: Run the browser without a window (Selenium only)
+            min_request_interval: Minimum seconds between requests to the court site
+            form_state_ttl: Seconds the scraped inquiryForm hidden fields stay valid
+                            (None re-loads the form before every search)
+            human_delays: Add human-like pauses and per-character typing delays
+            base_url: Case search site root
+            debug_dir: Directory to save results pages that could not be parsed
+            detail_workers: Case detail pages fetched at once (still spaced by min_request_interval)
+            detail_cache_ttl: Seconds parsed case details are reused (None disables the cache)
+        """
         self.use_selenium = use_selenium
-        self.base_url = "https://casesearch.courts.state.md.us"
-        self.search_url = "https://casesearch.courts.state.md.us/casesearch/inquirySearch.jis"
+        self.headless = headless
+        self.base_url = base_url.rstrip('/')
+        self.search_url = f"{self.base_url}/casesearch/inquirySearch.jis"
+        self.min_request_interval = min_request_interval
+        self.form_state_ttl = form_state_ttl
+        self.human_delays = human_delays
+        self.debug_dir = debug_dir
+        self.detail_workers = max(1, detail_workers)
+        self.detail_cache_ttl = detail_cache_ttl
+        self._last_request_at = 0.0
+        self._throttle_lock = threading.Lock()
+        self._detail_cache = OrderedDict()  # url -> CaseDetails
+        self._detail_cache_lock = threading.Lock()
+        # Hidden fields + load time per mode; a browser and a requests session
+        # each have their own cookies, so their form state is not interchangeable
+        self._form_states = {MODE_SELENIUM: ({}, None), MODE_REQUESTS: ({}, None)}
         
-        if use_selenium:
-            self.driver = None
-            self.headless = headless
-            self._setup_selenium()
-        else:
-            # Fallback to requests with enhanced headers
-            self.session = requests.Session()
-            self._setup_requests_session()
+        # The requests session is cheap, so it always exists (case details use it too)
+        self.session = requests.Session()
+        self._setup_requests_session()
         
-        self.search_form_data = {}
+        # The browser is started on first use (ensure_form_state / get_initial_page)
+        # so requests-only callers never pay for it
+        self.driver = None
+    
+    @property
+    def mode(self) -> str:
+        return MODE_SELENIUM if self.use_selenium else MODE_REQUESTS
+    
+    def _browser(self, use_browser: Optional[bool]) -> bool:
+        """The mode of one call: its own use_browser argument, else the instance default"""
+        return self.use_selenium if use_browser is None else use_browser
+    
+    def _form_state(self, use_browser: Optional[bool] = None):
+        return self._form_states[MODE_SELENIUM if self._browser(use_browser) else MODE_REQUESTS]
+    
+    @property
+    def search_form_data(self) -> Dict:
+        return self._form_state()[0]
+    
+    @property
+    def form_state_loaded_at(self) -> Optional[float]:
+        return self._form_state()[1]
+    
+    @form_state_loaded_at.setter
+    def form_state_loaded_at(self, value: Optional[float]):
+        self._form_states[self.mode] = (self._form_state()[0], value)
     
     def _setup_selenium(self):
         """Setup Selenium webdriver with stealth options"""
+        if not SELENIUM_AVAILABLE:
+            raise Exception("Selenium is not installed; use requests mode or pip install selenium webdriver-manager")
         try:
             # Try Safari first (available on macOS)
             print("Setting up Safari driver...")
@@ -104,7 +394,7 @@ class MarylandCourtScraper:
             'User-Agent': random.choice(user_agents),
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
             'Accept-Language': 'en-US,en;q=0.9',
-            'Accept-Encoding': 'gzip, deflate, br',
+            'Accept-Encoding': ACCEPT_ENCODING,
             'DNT': '1',
             'Connection': 'keep-alive',
             'Upgrade-Insecure-Requests': '1',
@@ -117,20 +407,71 @@ class MarylandCourtScraper:
             'sec-ch-ua-mobile': '?0',
             'sec-ch-ua-platform': '"macOS"'
         })
+        
+        # One pooled connection per detail worker, reused across requests
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(DEFAULT_POOLSIZE, self.detail_workers))
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
     
     def __del__(self):
         """Cleanup selenium driver"""
         if hasattr(self, 'driver') and self.driver:
             self.driver.quit()
         
+    def _throttle(self):
+        """
+        Wait until at least min_request_interval has passed since the last site
+        request. Safe to call from several threads: each caller reserves the
+        next free slot, so concurrent fetches still go out one interval apart.
+        """
+        with self._throttle_lock:
+            now = time.monotonic()
+            slot = max(now, self._last_request_at + self.min_request_interval)
+            self._last_request_at = slot
+        if slot > now:
+            time.sleep(slot - now)
+    
+    def form_state_expired(self, use_browser: Optional[bool] = None) -> bool:
+        """Whether the cached inquiryForm hidden fields need to be re-scraped"""
+        loaded_at = self._form_state(use_browser)[1]
+        if loaded_at is None or self.form_state_ttl is None:
+            return True
+        return time.monotonic() - loaded_at > self.form_state_ttl
+    
+    def ensure_form_state(self, force: bool = False, use_browser: Optional[bool] = None) -> bool:
+        """
+        Make sure the search form is ready to submit, loading the initial page
+        only when the cached hidden fields are missing or expired.
+        """
+        use_browser = self._browser(use_browser)
+        if force or self.form_state_expired(use_browser):
+            return self.get_initial_page(use_browser)
+        
+        if use_browser and (self.driver is None or 'name="inquiryForm"' not in self.driver.page_source):
+            if self.driver is None:
+                self._setup_selenium()
+            # The browser still has to be on the form page to fill it in
+            self._throttle()
+            self.driver.get(self.search_url)
+            WebDriverWait(self.driver, 10).until(
+                EC.presence_of_element_located((By.NAME, "inquiryForm"))
+            )
+        return True
+    
+    def _looks_like_expired_form(self, html: str) -> bool:
+        """The site answers a stale form submission with the blank search form again"""
+        return 'name="inquiryForm"' in html and 'class="results"' not in html and "No records found" not in html
+    
     def human_delay(self, min_seconds: float = 0.5, max_seconds: float = 2.0):
         """Add random delay to mimic human behavior"""
+        if not self.human_delays:
+            return
         delay = random.uniform(min_seconds, max_seconds)
         time.sleep(delay)
     
-    def detect_captcha(self, page_source: str = None) -> bool:
+    def detect_captcha(self, page_source: str = None, use_browser: Optional[bool] = None) -> bool:
         """Detect if there's a captcha on the page"""
-        if self.use_selenium:
+        if self._browser(use_browser):
             page_source = self.driver.page_source if not page_source else page_source
         
         captcha_indicators = [
@@ -142,9 +483,9 @@ class MarylandCourtScraper:
         page_lower = page_source.lower()
         return any(indicator in page_lower for indicator in captcha_indicators)
     
-    def handle_captcha_manual(self) -> bool:
+    def handle_captcha_manual(self, use_browser: Optional[bool] = None) -> bool:
         """Handle captcha manually - wait for user to solve it"""
-        if not self.use_selenium:
+        if not self._browser(use_browser):
             print("Manual captcha handling requires Selenium mode")
             return False
         
@@ -161,7 +502,7 @@ class MarylandCourtScraper:
         self.human_delay(2.0, 4.0)
         
         # Check if captcha is still present
-        if self.detect_captcha():
+        if self.detect_captcha(use_browser=True):
             print("Captcha still detected. Please try again or check if it was solved correctly.")
             return False
         
@@ -174,9 +515,9 @@ class MarylandCourtScraper:
         print("2captcha integration not implemented. Use manual captcha solving for now.")
         return None
     
-    def handle_cloudflare_challenge(self) -> bool:
+    def handle_cloudflare_challenge(self, use_browser: Optional[bool] = None) -> bool:
         """Handle Cloudflare challenge if detected"""
-        if not self.use_selenium:
+        if not self._browser(use_browser):
             return False
         
         try:
@@ -192,22 +533,28 @@ class MarylandCourtScraper:
             print("Cloudflare challenge timed out. Manual intervention may be required.")
             return False
         
-    def get_initial_page(self) -> bool:
+    def get_initial_page(self, use_browser: Optional[bool] = None) -> bool:
         """Load the initial search page and extract form data"""
+        use_browser = self._browser(use_browser)
+        form_data = self._form_state(use_browser)[0]
+        if use_browser and self.driver is None:
+            # Outside the try: a missing browser is the caller's to handle, not a failed page load
+            self._setup_selenium()
         try:
             print("Loading Maryland Judiciary Case Search page...")
             
-            if self.use_selenium:
-                self.driver.get("https://casesearch.courts.state.md.us/casesearch/inquirySearch.jis")
+            self._throttle()
+            if use_browser:
+                self.driver.get(self.search_url)
                 
                 # Handle potential Cloudflare challenge
-                if self.detect_captcha():
+                if self.detect_captcha(use_browser=True):
                     print("Captcha/Challenge detected on initial page load...")
                     if "cloudflare" in self.driver.page_source.lower():
-                        if not self.handle_cloudflare_challenge():
+                        if not self.handle_cloudflare_challenge(use_browser=True):
                             return False
                     else:
-                        if not self.handle_captcha_manual():
+                        if not self.handle_captcha_manual(use_browser=True):
                             return False
                 
                 # Wait for page to load completely
@@ -219,10 +566,12 @@ class MarylandCourtScraper:
                 soup = BeautifulSoup(self.driver.page_source, 'html.parser')
                 
             else:
-                # Fallback to requests
-                response = self.session.get("https://casesearch.courts.state.md.us/casesearch/inquirySearch.jis")
+                # Plain HTTP: the session keeps the site's cookies between requests
+                response = self.session.get(self.search_url)
                 response.raise_for_status()
                 soup = BeautifulSoup(response.content, 'html.parser')
+                if not soup.find('form', {'name': 'inquiryForm'}):
+                    soup = self._accept_disclaimer(soup, response.url) or soup
             
             # Extract hidden form fields and other necessary data
             inquiry_form = soup.find('form', {'name': 'inquiryForm'})
@@ -236,12 +585,14 @@ class MarylandCourtScraper:
                 name = field.get('name')
                 value = field.get('value', '')
                 if name:
-                    self.search_form_data[name] = value
+                    form_data[name] = value
                     
             print(f"Extracted {len(hidden_fields)} hidden form fields")
+            mode = MODE_SELENIUM if use_browser else MODE_REQUESTS
+            self._form_states[mode] = (form_data, time.monotonic())
             
             # Add default form values
-            self.search_form_data.update({
+            form_data.update({
                 'company': 'N',  # Person search
                 'searchBasicAdvanced': 'basic',
                 'submitButtonType': 'submit',
@@ -257,15 +608,14 @@ class MarylandCourtScraper:
             return False
     
     def simulate_typing(self, element_or_text, text: str = None) -> None:
-        """Simulate human typing with random pauses"""
-        if self.use_selenium and text is None:
-            # element_or_text is actually the element, text is the second parameter
-            text = element_or_text
-            
-        if self.use_selenium and hasattr(element_or_text, 'clear'):
+        """Simulate human typing with random pauses (into a Selenium element, or just the delay)"""
+        if hasattr(element_or_text, 'clear'):
             # Selenium element typing
             element = element_or_text
             element.clear()
+            if not self.human_delays:
+                element.send_keys(text)
+                return
             for char in text:
                 element.send_keys(char)
                 time.sleep(random.uniform(0.05, 0.2))
@@ -275,6 +625,8 @@ class MarylandCourtScraper:
                     time.sleep(random.uniform(0.3, 0.8))
         else:
             # Regular delay for non-selenium
+            if not self.human_delays:
+                return
             text = text or element_or_text
             for char in text:
                 time.sleep(random.uniform(0.05, 0.2))
@@ -286,9 +638,11 @@ class MarylandCourtScraper:
     def search_by_name(self, first_name: str, last_name: str, 
                       middle_name: str = "", 
                       county: str = "",
-                      case_type: str = "00") -> Optional[List[Dict]]:
+                      case_type: str = "00",
+                      mode: Optional[str] = None,
+                      max_pages: Optional[int] = None) -> Optional[List[Dict]]:
         """
-        Search for cases by person's name
+        Search for cases by person's name, following every results page
         
         Args:
             first_name: First name to search
@@ -296,9 +650,118 @@ class MarylandCourtScraper:
             middle_name: Optional middle name
             county: Optional county filter
             case_type: Case type filter (00=All, CIVIL, CRIMINAL, TRAFFIC, CP)
+            mode: "requests" or "selenium" for this call (default: the instance's mode)
+            max_pages: Stop after this many results pages (default: all)
+        
+        Returns:
+            All case rows, or None if the search could not be submitted
+        """
+        results, _ = self.search_pages(first_name, last_name, middle_name, county, case_type, mode, max_pages)
+        return results
+    
+    def search_pages(self, first_name: str, last_name: str,
+                     middle_name: str = "",
+                     county: str = "",
+                     case_type: str = "00",
+                     mode: Optional[str] = None,
+                     max_pages: Optional[int] = None) -> Tuple[Optional[List[Dict]], bool]:
+        """
+        search_by_name(), also telling whether the rows are the complete result
+        
+        Returns:
+            (case rows or None, False if max_pages or a failed page load stopped it early)
+        """
+        use_browser = self._resolve_mode(mode)
+        first_page = self._search_by_name(use_browser, first_name, last_name, middle_name, county, case_type)
+        if first_page is None:
+            return None, False
+        results = []
+        pages = self._iter_result_pages(first_page, use_browser, max_pages)
+        while True:
+            try:
+                results.append(next(pages))
+            except StopIteration as stop:
+                complete = stop.value
+                break
+        print(f"Found {len(results)} case(s) in total" + ("" if complete else " (more pages not loaded)"))
+        return results, complete
+    
+    def iter_search_results(self, first_name: str, last_name: str,
+                            middle_name: str = "",
+                            county: str = "",
+                            case_type: str = "00",
+                            mode: Optional[str] = None,
+                            max_pages: Optional[int] = None) -> Iterator[Dict]:
         """
+        Search for cases by name and yield case rows as each results page is
+        parsed. The next page is only requested once the caller has consumed
+        the current one, so breaking out of the loop (e.g. on a date of birth
+        match) saves the remaining page loads.
+        
+        Takes the same arguments as search_by_name(). Yields nothing if the
+        search could not be submitted.
         
-        if not self.get_initial_page():
+        Example:
+            for case in scraper.iter_search_results("John", "Smith"):
+                if case['date_of_birth'] == "04/17/1984":
+                    break
+        """
+        use_browser = self._resolve_mode(mode)
+        first_page = self._search_by_name(use_browser, first_name, last_name, middle_name, county, case_type)
+        if first_page is not None:
+            yield from self._iter_result_pages(first_page, use_browser, max_pages)
+    
+    def _resolve_mode(self, mode: Optional[str]) -> bool:
+        """Whether a call with this mode argument should use the browser"""
+        if mode not in (None, MODE_SELENIUM, MODE_REQUESTS):
+            raise ValueError(f"Unknown search mode '{mode}'")
+        return self.use_selenium if mode is None else mode == MODE_SELENIUM
+    
+    def _iter_result_pages(self, html_content: bytes, use_browser: bool,
+                           max_pages: Optional[int] = None) -> Generator[Dict, None, bool]:
+        """
+        Yield the rows of a results page, then of each following page. Returns
+        False when max_pages or a failed page load left pages unread.
+        """
+        seen_urls = set()
+        page = 1
+        while True:
+            doc, results_table = self._find_results(html_content)
+            if results_table is None:
+                return True
+            next_url = next_page_url(doc, self.search_url)
+            yield from iter_case_rows(results_table, self.search_url)
+            
+            if not next_url or next_url in seen_urls:
+                return True
+            if max_pages and page >= max_pages:
+                return False
+            seen_urls.add(next_url)
+            page += 1
+            print(f"Loading results page {page}...")
+            html_content = self._get_results_page(next_url, use_browser)
+            if html_content is None:
+                return False
+    
+    def _get_results_page(self, url: str, use_browser: bool) -> Optional[bytes]:
+        """Load a further results page in the session that ran the search"""
+        self.human_delay(0.5, 1.5)  # Simulate reading the page before clicking Next
+        self._throttle()
+        try:
+            if use_browser:
+                self.driver.get(url)
+                return self.driver.page_source.encode('utf-8')
+            response = self.session.get(url, headers={'Referer': self.search_url})
+            response.raise_for_status()
+            return response.content
+        except Exception as e:
+            print(f"Error loading results page: {e}")
+            return None
+    
+    def _search_by_name(self, use_browser: bool, first_name: str, last_name: str, middle_name: str,
+                        county: str, case_type: str) -> Optional[bytes]:
+        """Submit the search in the given mode and return the first results page"""
+        if not self.ensure_form_state(use_browser=use_browser):
             return None
             
         print(f"Searching for: {first_name} {middle_name} {last_name}".strip())
@@ -308,9 +771,9 @@ class MarylandCourtScraper:
         self.human_delay(0.5, 1.5)
         
         # Prepare form data
-        form_data = self.search_form_data.copy()
+        form_data = self._form_state(use_browser)[0].copy()
         
-        if self.use_selenium:
+        if use_browser:
             return self._search_with_selenium(first_name, last_name, middle_name, county, case_type)
         else:
             return self._search_with_requests(form_data, first_name, last_name, middle_name, county, case_type)
@@ -356,19 +819,20 @@ class MarylandCourtScraper:
             self.human_delay(0.5, 1.0)
             
             # Click submit button
+            self._throttle()
             submit_button.click()
             
             # Wait for results page to load
             WebDriverWait(self.driver, 15).until(
                 lambda driver: "Search Results" in driver.page_source or 
                               "No records found" in driver.page_source or
-                              self.detect_captcha(driver.page_source)
+                              self.detect_captcha(driver.page_source, use_browser=True)
             )
             
             # Handle captcha if it appears after submission
-            if self.detect_captcha():
+            if self.detect_captcha(use_browser=True):
                 print("Captcha detected after form submission...")
-                if not self.handle_captcha_manual():
+                if not self.handle_captcha_manual(use_browser=True):
                     return None
                     
                 # Wait for results after captcha
@@ -377,8 +841,8 @@ class MarylandCourtScraper:
                                   "No records found" in driver.page_source
                 )
             
-            # Parse results from current page
-            return self.parse_search_results(self.driver.page_source.encode('utf-8'))
+            # Hand back the first results page
+            return self.driver.page_source.encode('utf-8')
             
         except Exception as e:
             print(f"Error during Selenium search: {e}")
@@ -417,149 +881,434 @@ class MarylandCourtScraper:
         
         try:
             # Submit the search
-            response = self.session.post(
-                self.search_url,
-                data=form_data,
-                headers={
-                    'Referer': 'https://casesearch.courts.state.md.us/casesearch/inquirySearch.jis',
-                    'Content-Type': 'application/x-www-form-urlencoded',
-                    'Origin': 'https://casesearch.courts.state.md.us'
-                }
-            )
-            response.raise_for_status()
+            response = self._post_search(form_data)
+            
+            if self._looks_like_expired_form(response.text):
+                # Hidden fields went stale; reload them once and resubmit
+                print("Search form state expired, reloading...")
+                if not self.ensure_form_state(force=True, use_browser=False):
+                    return None
+                form_data.update({k: v for k, v in self._form_state(False)[0].items()
+                                  if k not in ('firstName', 'middleName', 'lastName', 'countyName', 'site')})
+                response = self._post_search(form_data)
             
-            # Parse results
-            return self.parse_search_results(response.content)
+            # Hand back the first results page
+            return response.content
             
         except Exception as e:
             print(f"Error during search: {e}")
             return None
     
+    def _post_search(self, form_data: dict) -> requests.Response:
+        """Submit the inquiry form over the requests session"""
+        self._throttle()
+        response = self.session.post(
+            self.search_url,
+            data=form_data,
+            headers={
+                'Referer': self.search_url,
+                'Content-Type': 'application/x-www-form-urlencoded',
+                'Origin': self.base_url
+            }
+        )
+        response.raise_for_status()
+        return response
+    
+    def _accept_disclaimer(self, soup: BeautifulSoup, page_url: str) -> Optional[BeautifulSoup]:
+        """
+        Accept the terms-of-use page the site shows to new sessions, then
+        reload the search page. Returns the search page soup, or None if the
+        page was not a disclaimer.
+        """
+        form = None
+        for candidate in soup.find_all('form'):
+            action = (candidate.get('action') or '').lower()
+            if 'disclaimer' in action or candidate.find('input', {'name': 'disclaimer'}):
+                form = candidate
+                break
+        if form is None:
+            return None
+        
+        print("Accepting case search disclaimer...")
+        data = {}
+        for field in form.find_all('input'):
+            name = field.get('name')
+            if not name:
+                continue
+            field_type = (field.get('type') or 'text').lower()
+            if field_type in ('checkbox', 'radio'):
+                data[name] = field.get('value', 'Y')
+            elif field_type == 'submit':
+                data.setdefault(name, field.get('value', ''))
+            else:
+                data[name] = field.get('value', '')
+        
+        self._throttle()
+        response = self.session.post(
+            urljoin(page_url, form.get('action') or page_url),
+            data=data,
+            headers={'Referer': page_url, 'Origin': self.base_url}
+        )
+        response.raise_for_status()
+        
+        if 'name="inquiryForm"' not in response.text:
+            self._throttle()
+            response = self.session.get(self.search_url)
+            response.raise_for_status()
+        return BeautifulSoup(response.content, 'html.parser')
+    
     def parse_search_results(self, html_content: bytes) -> List[Dict]:
-        """Parse the search results page"""
-        soup = BeautifulSoup(html_content, 'html.parser')
-        results = []
+        """Parse one search results page"""
+        doc, results_table = self._find_results(html_content)
+        if results_table is None:
+            return []
+        results = list(iter_case_rows(results_table, self.search_url))
+        print(f"Found {len(results)} case(s)")
+        return results
+    
+    def _find_results(self, html_content: bytes):
+        """
+        Parse a results page and locate its table.
         
-        # Look for results table or error messages
-        error_div = soup.find('div', class_='bd-callout-danger')
-        if error_div:
-            print(f"Search error: {error_div.get_text().strip()}")
-            return results
-            
-        # Look for "No records found" message
-        if "No records found" in soup.get_text():
+        Returns:
+            (document, results table), or (None, None) when the page has no
+            results (no records, a search error or an unexpected page)
+        """
+        if isinstance(html_content, str):
+            html_content = html_content.encode('utf-8')
+        
+        # Cheap byte checks first; no tree is needed for an empty result
+        if b"No records found" in html_content:
             print("No records found for the search criteria")
-            return results
+            return None, None
         
-        # Find results table - based on actual HTML structure
-        results_table = soup.find('table', class_='results')
-        if not results_table:
-            # Try alternative table selectors
-            results_table = soup.find('table', id='row')
-            
-        if results_table:
-            # Get search criteria info
-            criteria_div = soup.find('div', class_='criteria')
-            if criteria_div:
-                print(f"Search performed: {criteria_div.get_text().strip()}")
-            
-            # Get result count
-            page_banner = soup.find('span', class_='pagebanner')
-            if page_banner:
-                print(f"Results: {page_banner.get_text().strip()}")
-            
-            tbody = results_table.find('tbody')
-            if tbody:
-                rows = tbody.find_all('tr')
-            else:
-                rows = results_table.find_all('tr')[1:]  # Skip header if no tbody
-            
-            for row in rows:
-                cells = row.find_all('td')
-                if len(cells) >= 9:  # Expected 9 columns based on HTML
-                    
-                    # Extract case information based on actual column structure
-                    case_info = {}
-                    
-                    # Column 0: Case Number (with link)
-                    case_number_cell = cells[0]
-                    link = case_number_cell.find('a')
-                    if link:
-                        case_info['case_number'] = link.get_text().strip()
-                        case_info['detail_url'] = urljoin(self.base_url, link.get('href'))
-                    else:
-                        case_info['case_number'] = case_number_cell.get_text().strip()
-                    
-                    # Column 1: Name
-                    case_info['name'] = cells[1].get_text().strip()
-                    
-                    # Column 2: Date of Birth  
-                    case_info['date_of_birth'] = cells[2].get_text().strip()
-                    
-                    # Column 3: Party Type
-                    case_info['party_type'] = cells[3].get_text().strip()
-                    
-                    # Column 4: Court
-                    case_info['court'] = cells[4].get_text().strip()
-                    
-                    # Column 5: Case Type
-                    case_info['case_type'] = cells[5].get_text().strip()
-                    
-                    # Column 6: Case Status
-                    case_info['case_status'] = cells[6].get_text().strip()
-                    
-                    # Column 7: Filing Date
-                    case_info['filing_date'] = cells[7].get_text().strip()
-                    
-                    # Column 8: Case Caption
-                    case_info['case_caption'] = cells[8].get_text().strip()
-                    
-                    results.append(case_info)
-            
-            print(f"Found {len(results)} case(s)")
-        else:
+        doc = parse_html(html_content)
+        if doc is None:
             print("Could not find results table")
-            # Save HTML for debugging
-            with open('debug_results.html', 'w', encoding='utf-8') as f:
-                f.write(soup.prettify())
-            print("Saved debug HTML to debug_results.html")
+            self._save_debug_page(html_content)
+            return None, None
         
-        return results
+        # Look for error messages
+        error_div = _ERROR_CALLOUT(doc)
+        if error_div:
+            print(f"Search error: {error_div[0].text_content().strip()}")
+            return None, None
+        
+        results_table = find_results_table(doc)
+        if results_table is None:
+            print("Could not find results table")
+            self._save_debug_page(html_content)
+            return None, None
+        
+        # Get search criteria info and result count
+        criteria = _CRITERIA_TEXT(doc).strip()
+        if criteria:
+            print(f"Search performed: {criteria}")
+        page_banner = _PAGE_BANNER_TEXT(doc).strip()
+        if page_banner:
+            print(f"Results: {page_banner}")
+        return doc, results_table
+    
+    def _save_debug_page(self, html_content: bytes):
+        """Keep an unparseable results page for inspection, if debug_dir is set"""
+        if not self.debug_dir:
+            return
+        os.makedirs(self.debug_dir, exist_ok=True)
+        path = os.path.join(self.debug_dir, f"results_{int(time.time() * 1000)}.html")
+        with open(path, 'wb') as f:
+            f.write(html_content)
+        print(f"Saved debug HTML to {path}")
     
-    def get_case_details(self, case_url: str) -> Optional[Dict]:
+    def get_case_details(self, case_url: str) -> Optional[CaseDetails]:
         """Get detailed information for a specific case"""
+        cached = self._cached_case_details(case_url)
+        if cached is not None:
+            return cached
+        return self._fetch_case_details(case_url)
+    
+    def get_case_details_batch(self, case_urls: Iterable[str],
+                               max_workers: Optional[int] = None) -> Dict[str, Optional[CaseDetails]]:
+        """
+        Fetch the detail pages of many cases (e.g. every detail_url from a search).
+        
+        Cached cases are not re-fetched. The rest are fetched by up to
+        max_workers threads (default: detail_workers) over the pooled session,
+        with every request still going through the shared politeness throttle.
+        
+        Returns:
+            {url: CaseDetails or None if the page could not be fetched}, in input order
+        """
+        urls = list(dict.fromkeys(url for url in case_urls if url))
+        found = {}
+        pending = []
+        for url in urls:
+            cached = self._cached_case_details(url)
+            if cached is not None:
+                found[url] = cached
+            else:
+                pending.append(url)
+        
+        if pending:
+            print(f"Fetching {len(pending)} case detail page(s), {len(found)} cached")
+            workers = min(max_workers or self.detail_workers, len(pending))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                found.update(zip(pending, pool.map(self._fetch_case_details, pending)))
+        return {url: found.get(url) for url in urls}
+    
+    def _fetch_case_details(self, case_url: str) -> Optional[CaseDetails]:
         try:
             print(f"Fetching case details from: {case_url}")
             self.human_delay(1.0, 2.0)  # Simulate reading results before clicking
             
-            response = self.session.get(case_url)
+            self._throttle()
+            response = self.session.get(case_url, headers={'Referer': self.search_url})
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Extract case details - this will vary based on the actual page structure
-            details = {}
-            
-            # Look for case information tables or divs
-            # This is a basic example - you'll need to adjust based on actual page structure
-            info_tables = soup.find_all('table')
-            for table in info_tables:
-                rows = table.find_all('tr')
-                for row in rows:
-                    cells = row.find_all(['td', 'th'])
-                    if len(cells) == 2:
-                        key = cells[0].get_text().strip().lower().replace(' ', '_')
-                        value = cells[1].get_text().strip()
-                        details[key] = value
-            
+            details = parse_case_details(response.content, case_url)
+            if details is None:
+                print(f"Could not parse case details from: {case_url}")
+                return None
+            details.fetched_at = time.time()
+            self._store_case_details(case_url, details)
             return details
             
         except Exception as e:
             print(f"Error fetching case details: {e}")
             return None
+    
+    def _cached_case_details(self, case_url: str) -> Optional[CaseDetails]:
+        if not self.detail_cache_ttl:
+            return None
+        with self._detail_cache_lock:
+            details = self._detail_cache.get(case_url)
+            if details is None:
+                return None
+            if time.time() - details.fetched_at > self.detail_cache_ttl:
+                del self._detail_cache[case_url]
+                return None
+            self._detail_cache.move_to_end(case_url)
+            return details
+    
+    def _store_case_details(self, case_url: str, details: CaseDetails):
+        if not self.detail_cache_ttl:
+            return
+        with self._detail_cache_lock:
+            self._detail_cache[case_url] = details
+            self._detail_cache.move_to_end(case_url)
+            while len(self._detail_cache) > DETAIL_CACHE_MAX_ENTRIES:
+                self._detail_cache.popitem(last=False)
+
+SearchQuery = Tuple[str, str, str, str]  # (first, last, middle, county)
+
+
+class MarylandCourtSearchService:
+    """
+    Long-lived wrapper around one MarylandCourtScraper for screening many names.
+    
+    The search form state is loaded once and only refreshed when it expires,
+    and every request to the court site is spaced by a polite minimum interval,
+    so batches go faster by skipping redundant page loads rather than by
+    hitting the site harder. With a CourtCaseStore attached, searches and
+    case details seen within the store's TTL are not requested again at all.
+    """
+    
+    def __init__(self, use_selenium: bool = False, headless: bool = True,
+                 requests_per_minute: float = 12.0,
+                 form_state_ttl: float = 15 * 60,
+                 human_delays: bool = False,
+                 debug_dir: Optional[str] = None,
+                 detail_workers: int = 2,
+                 store: Optional[CourtCaseStore] = None):
+        """
+        Args:
+            use_selenium: Default to a browser instead of a requests session
+            headless: Run the browser without a window (Selenium only)
+            requests_per_minute: Upper bound on requests sent to the court site
+            form_state_ttl: Seconds before the search form is re-scraped
+            human_delays: Keep typing/reading pauses on top of the rate limit
+            debug_dir: Directory to save results pages that could not be parsed
+            detail_workers: Case detail pages fetched at once, within the same rate limit
+            store: Local case store to answer fresh searches from and write results to
+        """
+        self.store = store
+        min_interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self.scraper = MarylandCourtScraper(
+            use_selenium=use_selenium,
+            headless=headless,
+            min_request_interval=min_interval,
+            form_state_ttl=form_state_ttl,
+            human_delays=human_delays,
+            debug_dir=debug_dir,
+            detail_workers=detail_workers
+        )
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def close(self):
+        """Release the browser and the store, if any"""
+        if getattr(self.scraper, 'driver', None):
+            self.scraper.driver.quit()
+            self.scraper.driver = None
+        if self.store is not None:
+            self.store.close()
+    
+    def search(self, first_name: str, last_name: str, middle_name: str = "",
+               county: str = "", mode: Optional[str] = None,
+               max_pages: Optional[int] = None) -> Optional[List[Dict]]:
+        """
+        Search one name, answering from the store when it has a fresh copy.
+        A search cut short by max_pages keeps its rows in the store but is not
+        recorded as fresh, so later callers don't take it as complete.
+        """
+        if self.store is not None:
+            stored = self.store.lookup(first_name, last_name, middle_name, county)
+            if stored is not None:
+                print(f"Using stored results for: {first_name} {middle_name} {last_name}".strip())
+                return stored
+        
+        results, complete = self.scraper.search_pages(
+            first_name=first_name,
+            last_name=last_name,
+            middle_name=middle_name,
+            county=county,
+            mode=mode,
+            max_pages=max_pages
+        )
+        if results is not None and self.store is not None:
+            if complete:
+                self.store.record_search(first_name, last_name, middle_name, county, results)
+            elif results:
+                self.store.upsert_cases(results)
+        return results
+    
+    def find_by_date_of_birth(self, first_name: str, last_name: str, date_of_birth: str,
+                              middle_name: str = "", county: str = "",
+                              mode: Optional[str] = None) -> Optional[Dict]:
+        """
+        First case row whose date of birth matches (MM/DD/YYYY), or None.
+        Stops loading results pages as soon as a match is found.
+        """
+        if self.store is not None:
+            stored = self.store.lookup(first_name, last_name, middle_name, county)
+            if stored is not None:
+                return next((case for case in stored if case.get('date_of_birth') == date_of_birth), None)
+        
+        seen = []
+        try:
+            for case in self.scraper.iter_search_results(
+                first_name=first_name,
+                last_name=last_name,
+                middle_name=middle_name,
+                county=county,
+                mode=mode
+            ):
+                seen.append(case)
+                if case.get('date_of_birth') == date_of_birth:
+                    return case
+            return None
+        finally:
+            # A partial scan does not make the search fresh, but its rows are still worth keeping
+            if seen and self.store is not None:
+                self.store.upsert_cases(seen)
+    
+    def fetch_case_details(self, results: Iterable[Dict]) -> Dict[str, Optional[CaseDetails]]:
+        """Fetch the detail pages for search result rows, keyed by case number"""
+        rows = [row for row in results if row.get('detail_url')]
+        found = {}
+        if self.store is not None:
+            for row in rows:
+                stored = self.store.get_details(row['case_number'])
+                if stored is not None:
+                    found[row['case_number']] = CaseDetails.from_dict(stored)
+        
+        pending = [row for row in rows if row['case_number'] not in found]
+        fetched = self.scraper.get_case_details_batch(row['detail_url'] for row in pending)
+        for row in pending:
+            details = fetched.get(row['detail_url'])
+            found[row['case_number']] = details
+            if details is not None and self.store is not None:
+                self.store.save_details(row['case_number'], details.to_dict())
+        return {row['case_number']: found.get(row['case_number']) for row in rows}
+    
+    def search_batch(self, queries: Iterable[SearchQuery]) -> Iterator[Tuple[SearchQuery, Optional[List[Dict]]]]:
+        """
+        Run many name searches in order, yielding (query, results) as each completes.
+        Results are None when a search failed.
+        """
+        for query in queries:
+            first_name, last_name, middle_name, county = (tuple(query) + ("", "", "", ""))[:4]
+            if not last_name:
+                print(f"Skipping query without last name: {query}")
+                yield query, None
+                continue
+            yield query, self.search(first_name, last_name, middle_name or "", county or "")
+
+
+def read_batch_queries(path: str) -> List[SearchQuery]:
+    """
+    Read (first, last, middle, county) rows from a CSV file.
+    A header row with those column names is optional.
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        rows = [row for row in csv.reader(f) if row and any(cell.strip() for cell in row)]
+    
+    if rows and [cell.strip().lower() for cell in rows[0][:2]] == ['first', 'last']:
+        rows = rows[1:]
+    return [tuple((cell.strip() for cell in (row + ['', '', '', ''])[:4])) for row in rows]
+
+
+def run_batch(args):
+    """Screen every name in a CSV file and print one JSON line per query"""
+    queries = read_batch_queries(args.batch)
+    print(f"Loaded {len(queries)} queries from {args.batch}", file=sys.stderr)
+    
+    with MarylandCourtSearchService(
+        use_selenium=args.selenium,
+        headless=not args.visible,
+        requests_per_minute=args.rate,
+        form_state_ttl=args.form_ttl,
+        debug_dir=args.debug_dir,
+        detail_workers=args.detail_workers,
+        store=CourtCaseStore(args.store, ttl=args.store_ttl) if args.store else None
+    ) as service:
+        for query, results in service.search_batch(queries):
+            first_name, last_name, middle_name, county = query
+            line = {
+                "first_name": first_name,
+                "last_name": last_name,
+                "middle_name": middle_name,
+                "county": county,
+                "ok": results is not None,
+                "results": results or []
+            }
+            if args.details and results:
+                line["details"] = {case_number: details.to_dict() if details else None
+                                   for case_number, details in service.fetch_case_details(results).items()}
+            print(json.dumps(line), flush=True)
 
 def main():
     """Example usage of the scraper"""
+    parser = argparse.ArgumentParser(description="Maryland Judiciary Case Search scraper")
+    parser.add_argument("--batch", help="CSV of first,last,middle,county rows to screen non-interactively")
+    parser.add_argument("--rate", type=float, default=12.0, help="Max requests per minute to the court site (batch mode)")
+    parser.add_argument("--form-ttl", type=float, default=15 * 60, help="Seconds before the search form is reloaded (batch mode)")
+    parser.add_argument("--selenium", action="store_true", help="Use a browser in batch mode (default: requests)")
+    parser.add_argument("--visible", action="store_true", help="Show the browser window in batch mode")
+    parser.add_argument("--debug-dir", help="Save results pages that could not be parsed to this directory")
+    parser.add_argument("--details", action="store_true", help="Also fetch case detail pages (batch mode)")
+    parser.add_argument("--detail-workers", type=int, default=2, help="Case detail pages fetched at once (batch mode)")
+    parser.add_argument("--store", help="SQLite file of stored results; fresh searches are not re-run (batch mode)")
+    parser.add_argument("--store-ttl", type=float, default=7 * 24 * 60 * 60, help="Seconds stored results stay fresh (batch mode)")
+    args = parser.parse_args()
+    
+    if args.batch:
+        run_batch(args)
+        return
+    
     print("🏛️  Maryland Judiciary Case Search Bot")
     print("="*40)
     
@@ -573,7 +1322,7 @@ def main():
         headless = headless == 'y'
     
     try:
-        scraper = MarylandCourtScraper(use_selenium=use_selenium, headless=headless)
+        scraper = MarylandCourtScraper(use_selenium=use_selenium, headless=headless, debug_dir=args.debug_dir)
         
         print(f"\n{'🤖 Using Selenium' if use_selenium else '📡 Using requests'}")
         print(f"{'👻 Headless mode' if headless else '🖥️  Visible browser'}")
@@ -622,8 +1371,13 @@ def main():
                         print(f"\n{'='*30}")
                         print("CASE DETAILS")
                         print(f"{'='*30}")
-                        for key, value in details.items():
-                            print(f"{key.replace('_', ' ').title()}: {value}")
+                        for key, value in details.case_info.items():
+                            print(f"{key}: {value}")
+                        for party in details.parties:
+                            print(f"Party: {party.role} - {party.name}")
+                        for charge in details.charges:
+                            print(f"Charge {charge.number}: {charge.description} ({charge.disposition or 'no disposition'})")
+                        print(f"Events: {len(details.events)}")
         else:
             print("No results found or an error occurred.")
     
@@ -6,6 +6,8 @@ import { createClient } from 'https://esm.sh/@supabase/supabase-js@2'
 const RENDER_API_URL = 'https://bouncer-backend-t8m1.onrender.com'
 const SUPABASE_URL = Deno.env.get('SUPABASE_URL')!
 const SUPABASE_SERVICE_ROLE_KEY = Deno.env.get('SUPABASE_SERVICE_ROLE_KEY')!
+// This project's ref, so the backend can share pipeline slots fairly between databases
+const TENANT_ID = new URL(SUPABASE_URL).hostname.split('.')[0]
 
 // CORS headers
 const corsHeaders = {
@@ -112,8 +114,10 @@ Respond with ONLY a JSON object in this exact format:
     formData.append('text', userText);
 
     // Call your Render API
+    // Insert-triggered checks are background work; let interactive requests go first
     const renderResponse = await fetch(`${RENDER_API_URL}/analyze-summaries`, {
       method: 'POST',
+      headers: { 'X-Priority': 'batch', 'X-Tenant-Id': TENANT_ID },
       body: formData
     });
 